@@ -43,7 +43,7 @@ from core.tracing import get_tracer
 
 import traceback
 
-__all__ = ["scheduler"]
+__all__ = ["scheduler", "lazy_scheduler", "BACKENDS"]
 
 class scheduler:
     """
@@ -138,6 +138,14 @@ class scheduler:
         """Check whether the queue is empty."""
         return not self.queue
 
+    def pending(self):
+        """Return a copy of the list of events still in the queue."""
+        self.__preemption_condition.acquire()
+        try:
+            return list(self.queue)
+        finally:
+            self.__preemption_condition.release()
+
     def run(self):
         """Execute events until the queue is empty.
 
@@ -196,3 +204,146 @@ class scheduler:
                         heapq.heappush(q, event)
                 finally:
                     self.__preemption_condition.release()
+
+
+class lazy_scheduler:
+    """
+    A variant of :class:`scheduler` with constant time cancellation.
+
+    The interface is identical to :class:`scheduler`.  Rather than
+    removing a canceled event from the heap and re-heapifying the
+    whole queue, :meth:`cancel` marks the event as a tombstone which
+    is discarded when it reaches the head of the queue.  When the
+    number of tombstones grows beyond half of the queue, the heap is
+    compacted in a single pass, so the amortized cost of a cancel
+    stays O(1) and memory use remains bounded.
+
+    Events are lists of the form [time, priority, sequence, action,
+    argument].  The sequence number keeps ordering stable between
+    events with equal time and priority.  The action of an event is
+    replaced by None once it has been canceled or dispatched.
+    """
+
+    COMPACT_MIN = 64
+
+    def __init__(self):
+        """Initialize a new instance"""
+        self.queue = []
+        self.__sequence = 0
+        self.__tombstones = 0
+        self.__preemption_condition = Condition()
+
+        self.__tracer = get_tracer('digi_sched')
+
+    def enterabs(self, time, priority, action, argument):
+        """Enter a new event in the queue at an absolute time.
+
+        See :meth:`scheduler.enterabs`.
+        """
+        self.__preemption_condition.acquire()
+        try:
+            self.__sequence += 1
+            event = [time, priority, self.__sequence, action, argument]
+            heapq.heappush(self.queue, event)
+            self.__preemption_condition.notify()
+        finally:
+            self.__preemption_condition.release()
+
+        return event # The ID
+
+    def enter(self, delay, priority, action, argument):
+        """A variant that specifies the time as a relative time.
+
+        See :meth:`scheduler.enter`.
+        """
+        time = timefunc() + delay
+        return self.enterabs(time, priority, action, argument)
+
+    def cancel(self, event):
+        """Remove an event from the queue.
+
+        This must be presented the ID as returned by enter().
+        If the event has already run or been canceled, this raises
+        ValueError.
+
+        """
+        self.__preemption_condition.acquire()
+        try:
+            if event[3] is None:
+                raise ValueError("event not in queue")
+            event[3] = None
+            event[4] = None
+            self.__tombstones += 1
+            if (self.__tombstones > self.COMPACT_MIN and
+                self.__tombstones * 2 > len(self.queue)):
+                self.__compact()
+        finally:
+            self.__preemption_condition.release()
+
+    def __compact(self):
+        # Must be called with the preemption condition held.  The
+        # queue is modified in place as run() holds a reference to it.
+        self.queue[:] = [ e for e in self.queue if e[3] is not None ]
+        heapq.heapify(self.queue)
+        self.__tombstones = 0
+
+    def empty(self):
+        """Check whether the queue is empty."""
+        return len(self.queue) == self.__tombstones
+
+    def pending(self):
+        """Return a list of the events which have not yet been canceled."""
+        self.__preemption_condition.acquire()
+        try:
+            return [ e for e in self.queue if e[3] is not None ]
+        finally:
+            self.__preemption_condition.release()
+
+    def run(self):
+        """Execute events until the queue is empty.
+
+        See :meth:`scheduler.run`.  Canceled events are discarded as
+        they reach the head of the queue.
+        """
+        q = self.queue
+        while True:
+            self.__preemption_condition.acquire()
+            if not q:
+                self.__preemption_condition.release()
+                break
+
+            event = q[0]
+            if event[3] is None:
+                heapq.heappop(q)
+                self.__tombstones -= 1
+                self.__preemption_condition.release()
+                continue
+
+            now = timefunc()
+            if now < event[0]:
+                self.__preemption_condition.wait(event[0] - now)
+                self.__preemption_condition.release()
+                continue
+
+            heapq.heappop(q)
+            action, argument = event[3], event[4]
+            event[3] = None
+            event[4] = None
+            self.__preemption_condition.release()
+            try:
+                action(*argument)
+            except Exception:
+                self.__tracer.error(
+                    ('Exception calling %s with args: \'%s\'.' +
+                     '\n\tDeleting scheduled event.')
+                     % (action, argument))
+
+                self.__tracer.debug(traceback.format_exc())
+
+
+# Scheduler implementations selectable by name, see
+# :py:class:`~common.sched_async.SchedAsync`.
+BACKENDS = {
+    'heap': scheduler,
+    'lazy': lazy_scheduler,
+}
@@ -94,7 +94,7 @@ class ChannelCallbackNotFound(KeyError):
 
 # classes
 
-class Channel:
+class Channel(object):
     """
     Channels are the means that the Dia uses to communicate values 
     to different parts of itself, as well as the outside world.
@@ -102,14 +102,30 @@ class Channel:
     A channel contains the current sample value and a list of
     callbacks.
 
+    A channel created with a `change_log` records every update in it
+    and remembers the sequence number it was given, see
+    :meth:`sequence` and
+    :meth:`~channels.channel_database.ChannelDatabase.changed_since`.
+
     """
-    def __init__(self, name, channel_source):
+    # A gateway may hold thousands of channels: slots keep them small,
+    # channels without callbacks share the empty tuple and names are
+    # interned, so the copy held as a dictionary key is shared.
+    __slots__ = ['__name', '__channel_source', '__new_sample_cbs',
+                 '__change_log', '__sequence']
+
+    def __init__(self, name, channel_source, change_log=None):
+        if type(name) is str:
+            name = intern(name)
         self.__name = name
         self.__channel_source = channel_source
-        self.__new_sample_cbs = [ ]
+        self.__new_sample_cbs = ()
+        self.__change_log = change_log
+        self.__sequence = 0
         if not isinstance(channel_source,ChannelSource):
             raise ValueError, \
             "channel_source must be a ChannelSource instance"
+        self.__record_change()
 
     ## Class Internal functions
     def __dispatch_cbs(self, cb_list, *args, **kwargs):
@@ -119,6 +135,10 @@ class Channel:
             except:
                 pass
 
+    def __record_change(self):
+        if self.__change_log is not None:
+            self.__sequence = self.__change_log.record(self.__name)
+
     ## Events
     def __on_new_sample(self):
         """called by the data source when a new sample is available."""
@@ -157,9 +177,18 @@ class Channel:
         providing the channel, it should not be used by presentations
         or other modules in the system intending to use the value.
 
+        Samples rejected by the channel source's sample filter are
+        dropped silently and are not published.
+
         """
-        
+        sample_filter = self.__channel_source.sample_filter
+        if sample_filter is not None and \
+           not sample_filter.accept(self.__channel_source.producer_get(),
+                                    sample):
+            return
+
     	self.__channel_source.producer_set(sample)
+        self.__record_change()
     	self.__on_new_sample()
 
     def consumer_get(self):
@@ -178,7 +207,9 @@ class Channel:
         """
         
         self.__on_new_sample()
-    	return self.__channel_source.consumer_set(sample)
+    	result = self.__channel_source.consumer_set(sample)
+        self.__record_change()
+        return result
 
     def consumer_refresh(self):
         """
@@ -196,6 +227,18 @@ class Channel:
         """Returns the options in effect upon this :class:`Channel`"""
         return self.__channel_source.options
 
+    def sequence(self):
+        """
+        Returns the sequence number of the last update of this
+        :class:`Channel`, 0 if it has no change log.
+
+        """
+        return self.__sequence
+
+    def sample_filter(self):
+        """Returns the sample filter of this :class:`Channel`, or None"""
+        return self.__channel_source.sample_filter
+
     # Aliases for consumer functions:
     get = consumer_get
     set = consumer_set
@@ -216,7 +259,7 @@ class Channel:
             
     	"""
         if not f in self.__new_sample_cbs:
-            self.__new_sample_cbs.append(f)
+            self.__new_sample_cbs += (f,)
 
     def remove_new_sample_cb(self, f):
         """Remove a function f from the updated call back list."""
@@ -224,6 +267,7 @@ class Channel:
         if f not in self.__new_sample_cbs:
             raise ChannelCallbackNotFound, "Callback function not found."
 
-        self.__new_sample_cbs.remove(f)
+        self.__new_sample_cbs = tuple([ cb for cb in self.__new_sample_cbs
+                                        if cb != f ])
 
 # internal functions & classes
@@ -26,6 +26,10 @@
 ############################################################################
 
 # imports
+import threading
+from bisect import bisect_left, insort
+from collections import deque
+
 from channels.channel import Channel
 from channels.channel_publisher import ChannelPublisher
 from channels.logging.logging_manager import LoggingManager
@@ -34,6 +38,9 @@ from channels.channel_database_interface import \
 
 # constants
 
+# Number of updates remembered by ChannelDatabase.changed_since()
+CHANGE_LOG_SIZE = 4096
+
 # exception classes
 
 
@@ -56,10 +63,27 @@ class ChannelDatabase(ChannelDatabaseInterface):
 
     The core :class:`ChannelDatabase` object in the system is the
     latest published state of the channels.
+
+    Channel names are also kept in sorted order, and grouped by
+    device, as channels are added and removed.  :meth:`channel_list`
+    therefore returns a sorted list, and :meth:`channel_list_prefix`
+    and :meth:`channels_of_device` cost O(log n + k) for k results
+    rather than a scan of every channel.
+
+    Every update of a channel is numbered from a sequence shared by
+    all channels of the database.  Periodic consumers such as
+    uploaders remember the number returned by :meth:`changed_since`
+    and pass it to the next call to learn which channels changed in
+    between.
     """
 
     def __init__(self, core_services):
         self.__channels = { }
+        self.__sorted_names = [ ]
+        self.__devices = { }  # device name -> sorted channel names
+        self.__sorted_devices = [ ]
+        self.__lock = threading.Lock()
+        self.__change_log = _ChangeLog(CHANGE_LOG_SIZE)
 
         self.__core = core_services
 
@@ -70,12 +94,22 @@ class ChannelDatabase(ChannelDatabaseInterface):
 
     # ChannelDatabaseInterface functions
     def channel_add(self, channel_name, channel_source):
-        if self.channel_exists(channel_name):
-            raise ChannelAlreadyExists, "channel '%s' already exists" % \
-                (channel_name)
-
-        channel = Channel(name=channel_name, channel_source=channel_source)
-        self.__channels[channel_name] = channel
+        self.__lock.acquire()
+        try:
+            # Check before creating the channel: creating it records a
+            # change, which must not happen for a rejected duplicate.
+            if self.channel_exists(channel_name):
+                raise ChannelAlreadyExists, "channel '%s' already exists" % \
+                    (channel_name)
+            channel = Channel(name=channel_name,
+                              channel_source=channel_source,
+                              change_log=self.__change_log)
+            # key on the channel's interned copy of the name
+            channel_name = channel.name()
+            self.__channels[channel_name] = channel
+            self.__index_add(channel_name)
+        finally:
+            self.__lock.release()
         
         self.__channel_publisher.new_channel(channel)
         
@@ -91,7 +125,13 @@ class ChannelDatabase(ChannelDatabaseInterface):
                 self.__channel_publisher.remove_channel(chan)
             except:
                 pass
-            del self.__channels[channel_name]
+            self.__lock.acquire()
+            try:
+                del self.__channels[channel_name]
+                self.__index_remove(channel_name)
+                self.__change_log.forget(channel_name)
+            finally:
+                self.__lock.release()
         return chan
 
     def channel_get(self, channel_name):
@@ -103,13 +143,61 @@ class ChannelDatabase(ChannelDatabaseInterface):
 
     def channel_list(self):
         '''
-        Returns the name of every channel in the database.
+        Returns the name of every channel in the database, sorted.
+        '''
+        return self.__sorted_names[:]
+
+    def channel_list_prefix(self, prefix):
+        '''
+        Returns the sorted names of the channels starting with `prefix`.
         '''
-        return [cn for cn in self.__channels]
+        self.__lock.acquire()
+        try:
+            names = self.__sorted_names
+            start = end = bisect_left(names, prefix)
+            count = len(names)
+            while end < count and names[end].startswith(prefix):
+                end += 1
+            return names[start:end]
+        finally:
+            self.__lock.release()
+
+    def device_list(self):
+        '''
+        Returns the sorted names of the devices owning channels.
+        '''
+        return self.__sorted_devices[:]
+
+    def channels_of_device(self, device_name):
+        '''
+        Returns the sorted names of the channels of `device_name`.
+        '''
+        return self.__devices.get(device_name, [ ])[:]
 
     def channel_exists(self, name):
         return name in self.__channels
 
+    def sequence(self):
+        '''
+        Returns the sequence number of the latest channel update.
+        '''
+        return self.__change_log.sequence()
+
+    def changed_since(self, sequence):
+        '''
+        Returns the channels updated after `sequence`.
+
+        The result is a tuple of the current sequence number, to be
+        passed to the next call, and the sorted names of the channels
+        added or updated since `sequence`.  Pass 0 to get every
+        channel.
+
+        The cost is proportional to the number of updates since
+        `sequence`, as long as there were fewer than
+        `CHANGE_LOG_SIZE`; otherwise every channel is checked.
+        '''
+        return self.__change_log.changed_since(sequence)
+
     ## Additional accessor functions:
     def channel_publisher_get(self):
         """
@@ -131,5 +219,93 @@ class ChannelDatabase(ChannelDatabaseInterface):
 
     # We are not interacting with a logger in this interface, so leave
     # those functions un-implemented
+
+    def __index_add(self, channel_name):
+        # Must be called with self.__lock held.
+        insort(self.__sorted_names, channel_name)
+
+        device_name = _device_name(channel_name)
+        if device_name not in self.__devices:
+            self.__devices[device_name] = [ ]
+            insort(self.__sorted_devices, device_name)
+        insort(self.__devices[device_name], channel_name)
+
+    def __index_remove(self, channel_name):
+        # Must be called with self.__lock held.
+        _sorted_remove(self.__sorted_names, channel_name)
+
+        device_name = _device_name(channel_name)
+        channels = self.__devices[device_name]
+        _sorted_remove(channels, channel_name)
+        if not channels:
+            del self.__devices[device_name]
+            _sorted_remove(self.__sorted_devices, device_name)
     
 # internal functions & classes
+
+def _device_name(channel_name):
+    return channel_name.rsplit('.', 1)[0]
+
+def _sorted_remove(items, item):
+    i = bisect_left(items, item)
+    if i < len(items) and items[i] == item:
+        del items[i]
+
+class _ChangeLog(object):
+    # Numbers channel updates and remembers the most recent ones.
+    # Sequence numbers are handed out under the lock, in the same
+    # order as they are logged, so a reader never sees a number before
+    # the updates numbered below it.
+
+    def __init__(self, size):
+        self.__size = size
+        self.__lock = threading.Lock()
+        self.__sequence = 0
+        self.__log = deque()     # (sequence, channel name), oldest first
+        self.__log_start = 0     # updates up to this one were dropped
+        self.__latest = {}       # channel name -> latest sequence
+
+    def record(self, channel_name):
+        self.__lock.acquire()
+        try:
+            self.__sequence += 1
+            sequence = self.__sequence
+            self.__log.append((sequence, channel_name))
+            self.__latest[channel_name] = sequence
+            if len(self.__log) > self.__size:
+                self.__log_start = self.__log.popleft()[0]
+            return sequence
+        finally:
+            self.__lock.release()
+
+    def forget(self, channel_name):
+        self.__lock.acquire()
+        try:
+            self.__latest.pop(channel_name, None)
+        finally:
+            self.__lock.release()
+
+    def sequence(self):
+        return self.__sequence
+
+    def changed_since(self, sequence):
+        self.__lock.acquire()
+        try:
+            latest = self.__latest
+            if sequence < self.__log_start:
+                names = [ name for name, seq in latest.iteritems()
+                          if seq > sequence ]
+            else:
+                names = []
+                for seq, name in reversed(self.__log):
+                    if seq <= sequence:
+                        break
+                    # only the latest update of each channel counts
+                    if latest.get(name) == seq:
+                        names.append(name)
+            current = self.__sequence
+        finally:
+            self.__lock.release()
+
+        names.sort()
+        return current, names
@@ -41,6 +41,7 @@ LOG_SEEK_SET = 0x0
 LOG_SEEK_CUR = 0x1
 LOG_SEEK_END = 0x2
 LOG_SEEK_REC = 0x3
+LOG_SEEK_TIME = 0x4
 
 # exception classes
 
@@ -122,6 +123,49 @@ class ChannelDatabaseInterface:
 
         raise NotImplementedError, "virtual function"
 
+    def channel_list_prefix(self, prefix):
+        """
+        Get the sorted list of :class:`~channels.channel.Channel`
+        names starting with `prefix`.
+
+        This default implementation filters :meth:`channel_list`.
+
+        """
+
+        channel_list = [ cn for cn in self.channel_list()
+                         if cn.startswith(prefix) ]
+        channel_list.sort()
+        return channel_list
+
+    def device_list(self):
+        """
+        Get the sorted list of device names having channels in the
+        channel database.
+
+        The device name is the part of a channel name before its last
+        dot.  This default implementation scans :meth:`channel_list`.
+
+        """
+
+        devices = {}
+        for channel_name in self.channel_list():
+            devices[_device_name(channel_name)] = None
+        devices = devices.keys()
+        devices.sort()
+        return devices
+
+    def channels_of_device(self, device_name):
+        """
+        Get the sorted list of :class:`~channels.channel.Channel`
+        names belonging to the device `device_name`.
+
+        This default implementation filters :meth:`channel_list`.
+
+        """
+
+        return [ cn for cn in self.channel_list_prefix(device_name + '.')
+                 if _device_name(cn) == device_name ]
+
     def log_next(self):
         """Progress the state of this database one event in time."""
 
@@ -160,15 +204,33 @@ class ChannelDatabaseInterface:
                set the position of the database 'offset' records from
                absolute record number 'record_index'.
 
+            LOG_SEEK_TIME
+               set the position of the database 'offset' records from
+               the first record with a timestamp at or after the time
+               given as 'record_index'.
+
         """
         raise NotImplementedError, "virtual function"
 
+    def log_seek_time(self, timestamp):
+        """
+        Seek to the first record with a timestamp at or after
+        `timestamp` and return its record number.
+
+        Alias for `log_seek(offset=0, whence=LOG_SEEK_TIME,
+        record_index=timestamp)`.
+
+        """
+        self.log_seek(offset=0, whence=LOG_SEEK_TIME, record_index=timestamp)
+        return self.log_position()
+
     def log_position(self):
         """Return time of the last processed log event."""
         
         raise NotImplementedError, "virtual function"
 
-    def log_event_iterator(self, from_record, to_record=None):
+    def log_event_iterator(self, from_record=None, to_record=None,
+                           from_time=None, to_time=None):
         """
         Return an iterator for
         :class:`~channels.logging.logging_events.LoggingEvent`
@@ -177,6 +239,10 @@ class ChannelDatabaseInterface:
         `from_record` and `to_record` are absolute record numbers to
         seek from/to inclusively.  If `to_record` is omitted, the log
         will continue seeking to the last record.
+
+        Alternatively, `from_time` and `to_time` select the records
+        with timestamps from `from_time` up to but not including
+        `to_time`, as located by :meth:`log_seek_time`.
                 
         Calling this method has the side-effect of modifying the
         logger state as logger records are retrieved.
@@ -186,3 +252,6 @@ class ChannelDatabaseInterface:
 
 
 # internal functions & classes
+
+def _device_name(channel_name):
+    return channel_name.rsplit('.', 1)[0]
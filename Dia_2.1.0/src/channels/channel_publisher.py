@@ -28,14 +28,28 @@
 # imports
 import sys, traceback
 import threading
+import fnmatch
+import re
 from copy import copy
+from collections import deque
 
 from channels.channel import Channel, OPT_DONOTLOG
 from channels.logging.logging_events import \
-    LoggingEventNewSample, LoggingEventChannelNew, LoggingEventChannelRemove
+    LoggingEventNewSample, LoggingEventNewSamples, LoggingEventChannelNew, \
+    LoggingEventChannelRemove
+from common.worker_pool import WorkerPool
 
 # constants
 
+# Subscriber dispatch modes, see ChannelPublisher.subscribe():
+DISPATCH_SYNC = None      # called in the producer's thread (default)
+DISPATCH_LATEST = 'latest' # queued, only the latest sample per channel
+DISPATCH_EVERY = 'every'   # queued, every sample in order
+
+DISPATCH_THREADS = 2
+DISPATCH_QUEUE_SIZE = 64
+DISPATCH_BATCH_SIZE = 32   # updates delivered per turn on the pool
+
 # exception classes
 class SubscriberNotFound(KeyError):
     """
@@ -74,25 +88,97 @@ class ChannelPublisher:
     * :meth:`unsubscribe`
     * :meth:`subscribe_to_all`
     * :meth:`unsubscribe_from_all`
+    * :meth:`subscribe_pattern`
+    * :meth:`unsubscribe_pattern`
     * :meth:`subscribe_new_channels`
     * :meth:`unsubscribe_new_channels`
 
     All other routines help integrate the :class:`ChannelPublisher`
     into other components in the system
+
+    By default a subscriber is called synchronously, in the thread of
+    the driver producing the sample.  A slow subscriber therefore
+    delays the driver and every other subscriber.  Subscribers which
+    may be slow should instead pass a `dispatch` mode when
+    subscribing:
+
+    * ``DISPATCH_LATEST`` - updates are queued per subscriber and only
+      the most recent update of each channel is delivered.  Use this
+      for consumers interested in the current state, e.g. uploaders.
+    * ``DISPATCH_EVERY`` - every update is queued and delivered in
+      order.  The queue holds at most `queue_size` updates; when it is
+      full the oldest update is dropped and counted.
+
+    Queued subscribers are serviced by a small pool of dispatcher
+    threads shared by the publisher.  Each subscriber is called by at
+    most one thread at a time.  The channel passed to a
+    ``DISPATCH_EVERY`` subscriber returns the sample as it was when
+    the update was published.
+
+    A producer updating several channels at once may group the
+    updates between :meth:`begin_batch` and :meth:`end_batch`.  The
+    batch is published when it ends: loggers receive a single
+    :class:`~channels.logging.logging_events.LoggingEventNewSamples`
+    event, and subscribers registered with ``batch=True`` are called
+    once with the list of their channels updated by the batch, instead
+    of once per channel.  Subscribers with ``batch=True`` are always
+    called with a list, holding a single channel outside of a batch.
      
     """
 
     def __init__(self, core_services):
         self.__core = core_services
-        self.__new_channel_listeners = set()
+        # The listener tables are copy-on-write: every value is an
+        # immutable tuple which is replaced, under self.__rlock, when a
+        # subscription changes.  This lets the notification path read
+        # them without locking or copying.
+        self.__new_channel_listeners = ()
         self.__channel_listeners = {}
+        # callback -> the _AsyncSubscriber or _BatchSubscriber
+        # registered in the listener tables in its place
+        self.__subscribers = {}
+        self.__pattern_index = _PatternIndex()
+        self.__pattern_listeners = {}
+        self.__dispatch_pool = None
         self.__rlock = threading.RLock()
+        self.__batch = threading.local()
         self.__logging_manager = None
+        # One bound method shared by every channel, rather than one each
+        self.__new_sample_cb = self.new_sample_cb
 		
         from core.tracing import get_tracer
         self.__tracer = get_tracer("ChannelPublisher")
 
-    def subscribe(self, channel_name, callback):
+    def __wrap(self, callback, dispatch, queue_size, batch):
+        # Return the object to register in the listener tables for
+        # callback.  Must be called with self.__rlock held.
+        if callback in self.__subscribers:
+            return self.__subscribers[callback]
+
+        if dispatch not in (DISPATCH_SYNC, DISPATCH_LATEST, DISPATCH_EVERY):
+            raise ValueError, "unknown dispatch mode '%s'" % (dispatch)
+
+        subscriber = callback
+        if batch:
+            subscriber = _BatchSubscriber(callback)
+        if dispatch is DISPATCH_SYNC:
+            if batch:
+                self.__subscribers[callback] = subscriber
+            return subscriber
+
+        if self.__dispatch_pool is None:
+            # Each subscriber has at most one pending request on the
+            # pool, so its queue need not be bounded.
+            self.__dispatch_pool = WorkerPool("ChannelPublisher_dispatch",
+                                              DISPATCH_THREADS, 0)
+
+        subscriber = _AsyncSubscriber(subscriber, dispatch, queue_size,
+                                      self.__dispatch_pool, self.__tracer)
+        self.__subscribers[callback] = subscriber
+        return subscriber
+
+    def subscribe(self, channel_name, callback, dispatch=DISPATCH_SYNC,
+                  queue_size=DISPATCH_QUEUE_SIZE, batch=False):
         """
         Subscribe to the :class:`~channels.channel.Channel` specified
         by `channel_name`.  Subscribers may only have one callback per
@@ -107,19 +193,38 @@ class ChannelPublisher:
 
         * `channel_name`: Name of channel to subscribe to 
         * `callback`: Callable object to be called
+        * `dispatch`: ``DISPATCH_SYNC`` (default), ``DISPATCH_LATEST``
+          or ``DISPATCH_EVERY``, see :class:`ChannelPublisher`.  The
+          mode chosen the first time `callback` is subscribed applies
+          to all of its subscriptions.
+        * `queue_size`: the queue length for ``DISPATCH_EVERY``
+        * `batch`: if True, `callback` is called with a list of
+          channels, see :meth:`begin_batch`.  Queued subscribers
+          receive one channel per list.
 
         """
 
         self.__rlock.acquire()
         
         try:
-            if channel_name not in self.__channel_listeners:
-                self.__channel_listeners[channel_name] = set()
-        
-            self.__channel_listeners[channel_name].add(callback)
+            callback = self.__wrap(callback, dispatch, queue_size, batch)
+            self.__add_listener(channel_name, callback)
         finally:
             self.__rlock.release()
 
+    def __add_listener(self, channel_name, callback):
+        # Must be called with self.__rlock held.
+        listeners = self.__channel_listeners.get(channel_name, ())
+        if callback not in listeners:
+            self.__channel_listeners[channel_name] = listeners + (callback,)
+
+    def __remove_listener(self, channel_name, callback):
+        # Must be called with self.__rlock held.
+        listeners = self.__channel_listeners.get(channel_name, ())
+        if callback in listeners:
+            self.__channel_listeners[channel_name] = \
+                _tuple_remove(listeners, callback)
+
     def unsubscribe(self, channel_name, callback):
         """
         Unsubscribe from the :class:`~channels.channel.Channel` specified
@@ -138,16 +243,20 @@ class ChannelPublisher:
             if channel_name not in self.__channel_listeners:
                 raise ChannelDoesNotExist, "channel '%s' does not exist" % \
                       (channel_name)
-        
-            if callback not in self.__channel_listeners[channel_name]:
+
+            callback = self.__subscribers.get(callback, callback)
+            listeners = self.__channel_listeners[channel_name]
+            if callback not in listeners:
                 raise SubscriberNotFound, "Subscriber not found."
-        
-            self.__channel_listeners[channel_name].remove(callback)
+
+            self.__channel_listeners[channel_name] = \
+                _tuple_remove(listeners, callback)
         
         finally:
             self.__rlock.release()
 
-    def subscribe_to_all(self, callback):
+    def subscribe_to_all(self, callback, dispatch=DISPATCH_SYNC,
+                         queue_size=DISPATCH_QUEUE_SIZE, batch=False):
         """
         Subscribe to all currently existing channels.  Subscribers may only have
         one callback per channel, so calls to this method will replace
@@ -165,6 +274,7 @@ class ChannelPublisher:
         Parameters:
         
         * `callback`:  Callable object to register
+        * `dispatch`, `queue_size`, `batch`: see :meth:`subscribe`
 
         """
 
@@ -174,7 +284,8 @@ class ChannelPublisher:
             cdb = self.__core.get_service("channel_manager").channel_database_get()
             channel_list = cdb.channel_list()
             for channel_name in channel_list:
-                self.subscribe(channel_name, callback)
+                self.subscribe(channel_name, callback, dispatch, queue_size,
+                               batch)
         finally:
             self.__rlock.release()
 
@@ -188,12 +299,95 @@ class ChannelPublisher:
     	self.__rlock.acquire()
     
         try:
-            for channel_name in self.__channel_listeners:
-                if callback in self.__channel_listeners[channel_name]:
-                    self.__channel_listeners[channel_name].remove(callback)
+            callback = self.__subscribers.pop(callback, callback)
+            for channel_name, listeners in self.__channel_listeners.items():
+                if callback in listeners:
+                    self.__channel_listeners[channel_name] = \
+                        _tuple_remove(listeners, callback)
+            for pattern, listeners in self.__pattern_listeners.items():
+                if callback in listeners:
+                    self.__remove_pattern_listener(pattern, callback)
+        finally:
+            self.__rlock.release()
+
+    def subscribe_pattern(self, pattern, callback, dispatch=DISPATCH_SYNC,
+                          queue_size=DISPATCH_QUEUE_SIZE, batch=False):
+        """
+        Subscribe to every channel whose name matches `pattern`.
+
+        `pattern` uses shell-style wildcards: ``*`` matches any
+        string, ``?`` any single character and ``[seq]`` any character
+        in `seq`, e.g. ``"zone1.*"`` or ``"thermostat*.temperature"``.
+
+        Unlike :meth:`subscribe_to_all`, the subscription also applies
+        to matching channels created afterwards, so ``"*"`` subscribes
+        to every present and future channel.  Patterns are matched when
+        a channel is created, not when a sample is published, so a
+        pattern subscription costs no more per sample than subscribing
+        to each channel individually.
+
+        Parameters:
+
+        * `pattern`: Channel name pattern
+        * `callback`: Callable object to be called
+        * `dispatch`, `queue_size`, `batch`: see :meth:`subscribe`
+
+        """
+
+        self.__rlock.acquire()
+
+        try:
+            callback = self.__wrap(callback, dispatch, queue_size, batch)
+            listeners = self.__pattern_listeners.get(pattern, ())
+            if callback in listeners:
+                return
+            self.__pattern_listeners[pattern] = listeners + (callback,)
+            self.__pattern_index.add(pattern)
+
+            cdb = self.__core.get_service("channel_manager").channel_database_get()
+            for channel_name in cdb.channel_list():
+                if _pattern_match(pattern, channel_name):
+                    self.__add_listener(channel_name, callback)
         finally:
             self.__rlock.release()
 
+    def unsubscribe_pattern(self, pattern, callback):
+        """
+        Remove a subscription made with :meth:`subscribe_pattern`.
+
+        `callback` is removed from every channel matching `pattern`,
+        including any it was subscribed to individually.
+
+        Parameters:
+
+        * `pattern`: The pattern registered previously
+        * `callback`: The callback registered previously
+
+        """
+
+        self.__rlock.acquire()
+
+        try:
+            callback = self.__subscribers.get(callback, callback)
+            if callback not in self.__pattern_listeners.get(pattern, ()):
+                raise SubscriberNotFound, "Subscriber not found."
+
+            self.__remove_pattern_listener(pattern, callback)
+            for channel_name in self.__channel_listeners.keys():
+                if _pattern_match(pattern, channel_name):
+                    self.__remove_listener(channel_name, callback)
+        finally:
+            self.__rlock.release()
+
+    def __remove_pattern_listener(self, pattern, callback):
+        # Must be called with self.__rlock held.
+        listeners = _tuple_remove(self.__pattern_listeners[pattern], callback)
+        if listeners:
+            self.__pattern_listeners[pattern] = listeners
+        else:
+            del self.__pattern_listeners[pattern]
+            self.__pattern_index.remove(pattern)
+
 
     def subscribe_new_channels(self, callback):
         """
@@ -210,7 +404,8 @@ class ChannelPublisher:
         self.__rlock.acquire()
 
         try:
-            self.__new_channel_listeners.add(callback)
+            if callback not in self.__new_channel_listeners:
+                self.__new_channel_listeners += (callback,)
         finally:
             self.__rlock.release()
 
@@ -228,7 +423,10 @@ class ChannelPublisher:
         self.__rlock.acquire()
 
         try:
-            self.__new_channel_listeners.remove(callback)
+            if callback not in self.__new_channel_listeners:
+                raise KeyError(callback)
+            self.__new_channel_listeners = \
+                _tuple_remove(self.__new_channel_listeners, callback)
 
         finally:
             self.__rlock.release()
@@ -269,7 +467,8 @@ class ChannelPublisher:
     def __dispatch_logging_event(self, logging_event):
         # dispatches all events to the logging manager.
 
-        if logging_event.channel.options_mask() & OPT_DONOTLOG:
+        if logging_event.channel is not None and \
+           logging_event.channel.options_mask() & OPT_DONOTLOG:
             return
         
         if self.__logging_manager is None:
@@ -295,9 +494,17 @@ class ChannelPublisher:
         * `channel`:  the new channel
         
         """
+        self.__rlock.acquire()
+        try:
+            for pattern in self.__pattern_index.match(channel.name()):
+                for callback in self.__pattern_listeners[pattern]:
+                    self.__add_listener(channel.name(), callback)
+        finally:
+            self.__rlock.release()
+
         self.__notify_new_channel(channel)
         self.__dispatch_logging_event(LoggingEventChannelNew(channel))
-    	channel.add_new_sample_cb(self.new_sample_cb)
+    	channel.add_new_sample_cb(self.__new_sample_cb)
 
     def remove_channel(self, channel):
     	"""
@@ -327,35 +534,318 @@ class ChannelPublisher:
         * `channel`:  the channel with a new sample
         
         """
+        pending = getattr(self.__batch, 'channels', None)
+        if pending is not None:
+            # Keep the sample too: the channel may be set again before
+            # the batch ends.
+            pending.append((channel, channel.producer_get()))
+            return
+
         self.__dispatch_logging_event(LoggingEventNewSample(channel))
         self.__notify(channel)
 
-    def __notify(self, channel):
+    def begin_batch(self):
+        """
+        Start a batch of channel updates in the calling thread.
+
+        Until the matching :meth:`end_batch`, new samples produced by
+        this thread are held back and published together when the
+        batch ends.  A channel set more than once is published once
+        for each of its samples, in order.  Batches may be nested, the
+        outermost :meth:`end_batch` publishes.  Other threads are not
+        affected.
+
+        Drivers normally use
+        :meth:`~devices.device_base.DeviceBase.property_set_many`
+        rather than calling this directly.
+
+        """
+        batch = self.__batch
+        if getattr(batch, 'channels', None) is None:
+            batch.channels = []
+            batch.depth = 0
+        batch.depth += 1
+
+    def end_batch(self):
+        """
+        End a batch started with :meth:`begin_batch` and publish it.
+
+        """
+        batch = self.__batch
+        if getattr(batch, 'channels', None) is None:
+            raise ValueError, "end_batch() without begin_batch()"
+
+        batch.depth -= 1
+        if batch.depth:
+            return
+
+        pending = batch.channels
+        batch.channels = None
+        if not pending:
+            return
+
+        # A channel set more than once in the batch is published once
+        # per sample, in order; the earlier samples through snapshots.
+        channels = []
+        for channel, sample in pending:
+            if channel.producer_get() is not sample:
+                channel = ChannelSnapshot(channel, sample)
+            channels.append(channel)
+
+        loggable = [ channel for channel in channels
+                     if not channel.options_mask() & OPT_DONOTLOG ]
+        if loggable:
+            self.__dispatch_logging_event(LoggingEventNewSamples(loggable))
+        self.__notify_batch(channels)
+
+    def dispatch_stats(self):
+        """
+        Returns a dictionary describing each queued subscriber.
+
+        The dictionary is keyed by the subscribed callback.  Each value
+        is a dictionary with the `dispatch` mode, the current
+        `queue_depth`, and the number of updates `delivered`,
+        `coalesced` into a later update and `dropped` because the
+        queue was full.
+
+        """
         self.__rlock.acquire()
         try:
-            channel_listeners = copy(self.__channel_listeners)
+            subscribers = self.__subscribers.items()
         finally:
             self.__rlock.release()
-        try:
-            if channel.name() in channel_listeners:
-                for callback in copy(channel_listeners[channel.name()]):
+
+        return dict([ (callback, subscriber.stats())
+                      for callback, subscriber in subscribers
+                      if isinstance(subscriber, _AsyncSubscriber) ])
+
+    def __notify(self, channel):
+        for callback in self.__channel_listeners.get(channel.name(), ()):
+            try:
+                callback(channel)
+            except Exception, e:
+                self.__tracer.error("exception during channel" +
+                                    " notification: %s",
+                                    traceback.format_exc())
+
+    def __notify_batch(self, channels):
+        # Channel-at-a-time listeners are called as the channels are
+        # visited, batch listeners once at the end with their share.
+        batches = {}
+        order = []
+        for channel in channels:
+            for callback in self.__channel_listeners.get(channel.name(), ()):
+                if isinstance(callback, _BatchSubscriber):
+                    if callback not in batches:
+                        batches[callback] = []
+                        order.append(callback)
+                    batches[callback].append(channel)
+                    continue
+                try:
                     callback(channel)
-        except Exception, e:
-            self.__tracer.error("exception during channel" +
-								" notification: %s", traceback.format_exc())
+                except Exception, e:
+                    self.__tracer.error("exception during channel" +
+                                        " notification: %s",
+                                        traceback.format_exc())
+
+        for callback in order:
+            try:
+                callback.deliver(batches[callback])
+            except Exception, e:
+                self.__tracer.error("exception during channel" +
+                                    " notification: %s",
+                                    traceback.format_exc())
 
     def __notify_new_channel(self, channel):
-        self.__rlock.acquire()
-        try:
-            new_channel_listeners = copy(self.__new_channel_listeners)
-        finally:
-            self.__rlock.release()
-
         try:
-            for callback in new_channel_listeners:
+            for callback in self.__new_channel_listeners:
                 callback(channel.name())
         except Exception, e:
             self.__tracer.error("exception during channel" + 
 			"notification: %s", traceback.format_exc())
 
+class ChannelSnapshot(object):
+    """
+    Stands in for a :class:`~channels.channel.Channel` when an update
+    is delivered after the fact, returning the sample captured when
+    the update was queued.  All other methods are those of the channel.
+
+    Used for ``DISPATCH_EVERY`` subscribers and by the
+    :class:`~channels.logging.logging_manager.LoggingManager` when
+    dispatching asynchronously.
+
+    """
+
+    __slots__ = ['_channel', '_sample']
+
+    def __init__(self, channel, sample):
+        self._channel = channel
+        self._sample = sample
+
+    def producer_get(self):
+        return self._sample
+
+    def consumer_get(self):
+        return copy(self._sample)
+
+    get = consumer_get
+
+    def __getattr__(self, name):
+        return getattr(self._channel, name)
+
 # internal functions & classes
+
+def _tuple_remove(items, item):
+    return tuple([ i for i in items if i != item ])
+
+_MAGIC = re.compile('[*?[]')
+
+def _pattern_match(pattern, name):
+    return fnmatch.fnmatchcase(name, pattern)
+
+
+class _PatternIndex(object):
+    # Finds the subscribed patterns which match a channel name.
+    # Patterns of the form "prefix*" are kept in a dictionary keyed by
+    # prefix and found with one lookup per prefix of the name; any
+    # other pattern is compiled to a regular expression.
+
+    def __init__(self):
+        self.__prefixes = {}   # prefix -> pattern
+        self.__globs = {}      # pattern -> compiled regular expression
+
+    def add(self, pattern):
+        prefix = pattern[:-1]
+        if pattern.endswith('*') and not _MAGIC.search(prefix):
+            self.__prefixes[prefix] = pattern
+        else:
+            self.__globs[pattern] = re.compile(fnmatch.translate(pattern))
+
+    def remove(self, pattern):
+        prefix = pattern[:-1]
+        if self.__prefixes.get(prefix) == pattern:
+            del self.__prefixes[prefix]
+        else:
+            self.__globs.pop(pattern, None)
+
+    def match(self, name):
+        matches = []
+        prefixes = self.__prefixes
+        if prefixes:
+            for i in xrange(len(name) + 1):
+                pattern = prefixes.get(name[:i])
+                if pattern is not None:
+                    matches.append(pattern)
+        for pattern, regex in self.__globs.iteritems():
+            if regex.match(name):
+                matches.append(pattern)
+        return matches
+
+class _BatchSubscriber(object):
+    # Registered in place of a callback subscribed with batch=True,
+    # which always receives a list of channels.
+
+    __slots__ = ['_callback']
+
+    def __init__(self, callback):
+        self._callback = callback
+
+    def __call__(self, channel):
+        self._callback([ channel ])
+
+    def deliver(self, channels):
+        self._callback(channels)
+
+
+class _AsyncSubscriber(object):
+    # Queues channel updates for one subscriber and delivers them from
+    # the publisher's dispatch pool.
+
+    def __init__(self, callback, dispatch, queue_size, pool, tracer):
+        self.__callback = callback
+        self.__dispatch = dispatch
+        self.__queue_size = queue_size
+        self.__pool = pool
+        self.__tracer = tracer
+
+        self.__lock = threading.Lock()
+        self.__queue = deque()
+        self.__latest = {}      # DISPATCH_LATEST: channel name -> channel
+        self.__scheduled = False
+
+        self.__delivered = 0
+        self.__coalesced = 0
+        self.__dropped = 0
+
+    def __call__(self, channel):
+        # Runs in the producer's thread: queue the update and make
+        # sure the subscriber is scheduled on the dispatch pool.
+        self.__lock.acquire()
+        try:
+            if self.__dispatch is DISPATCH_LATEST:
+                name = channel.name()
+                if name in self.__latest:
+                    self.__coalesced += 1
+                else:
+                    self.__queue.append(name)
+                self.__latest[name] = channel
+            else:
+                if len(self.__queue) >= self.__queue_size:
+                    self.__queue.popleft()
+                    self.__dropped += 1
+                self.__queue.append(
+                    ChannelSnapshot(channel, channel.producer_get()))
+
+            if self.__scheduled:
+                return
+            self.__scheduled = True
+        finally:
+            self.__lock.release()
+
+        self.__schedule()
+
+    def __schedule(self):
+        if not self.__pool.submit(self.__drain):
+            self.__lock.acquire()
+            self.__scheduled = False
+            self.__lock.release()
+            self.__tracer.error("unable to schedule delivery to %s",
+                                self.__callback)
+
+    def __drain(self):
+        # Deliver at most a batch, then go to the back of the pool's
+        # queue so that busy subscribers cannot hold its threads.
+        for i in xrange(DISPATCH_BATCH_SIZE):
+            self.__lock.acquire()
+            try:
+                if not self.__queue:
+                    self.__scheduled = False
+                    return
+                item = self.__queue.popleft()
+                if self.__dispatch is DISPATCH_LATEST:
+                    item = self.__latest.pop(item)
+            finally:
+                self.__lock.release()
+
+            try:
+                self.__callback(item)
+            except Exception:
+                self.__tracer.error("exception during channel" +
+                                    " notification: %s",
+                                    traceback.format_exc())
+            self.__delivered += 1
+
+        self.__schedule()
+
+    def stats(self):
+        self.__lock.acquire()
+        try:
+            return {
+                'dispatch': self.__dispatch,
+                'queue_depth': len(self.__queue),
+                'delivered': self.__delivered,
+                'coalesced': self.__coalesced,
+                'dropped': self.__dropped,
+            }
+        finally:
+            self.__lock.release()
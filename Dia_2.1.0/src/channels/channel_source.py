@@ -51,10 +51,15 @@ class ChannelSource(object):
       (:mod:`~channels.channel`.py)
     - `options`: a list of channel :ref:`options <options>`
       (:mod:`~channels.channel`.py)
+    - `sample_filter`: an optional
+      :class:`~channels.sample_filter.SampleFilter` applied to
+      samples set by the producer, None when unfiltered
 
     """
     __slots__ = ["type", "perms_mask", "options"]
 
+    sample_filter = None
+
     def __init__(self, type, perms_mask, options):
         self.type = type
         self.perms_mask = perms_mask
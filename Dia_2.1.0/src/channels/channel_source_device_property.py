@@ -80,6 +80,10 @@ from channels.channel import \
 # constants
 BUILTIN_TYPE = type
 
+# Guards the creation of the per-property locks, see
+# ChannelSourceDeviceProperty.consumer_set().
+_LOCK_CREATE = threading.Lock()
+
 # exception classes
 class DevicePropertyPermError(Exception):
     """Permissions Error"""
@@ -96,13 +100,15 @@ class ChannelSourceDeviceProperty(ChannelSource):
     """
     Create a ChannelSourceDeviceProperty.
     """    
-    __slots__ = ['name', 'type', 'perms_mask', 'options', 'device_set_cb', 
-                 'device_refresh_cb', '__rlock', '__sample']
+    # type, perms_mask and options are slots of ChannelSource.
+    __slots__ = ['name', 'device_set_cb', 'device_refresh_cb',
+                 'sample_filter', '__rlock', '__sample']
 
     def __init__(self, name, type, initial=Sample(timestamp=0, value=0),
                     perms_mask=DPROP_PERM_NONE,
                     options=DPROP_OPT_NONE,
-                    set_cb=lambda s: None, refresh_cb=lambda: None):
+                    set_cb=lambda s: None, refresh_cb=lambda: None,
+                    sample_filter=None):
         """
         Create a DevicePropertyItem.
 
@@ -114,6 +120,9 @@ class ChannelSourceDeviceProperty(ChannelSource):
         * **options:** a mask of options (constants DPROP_OPT_*)
         * **set_cb:** function called with sample argument for a set request
         * **refresh_cb:** function called when this property should be updated
+        * **sample_filter:** optional
+          :class:`~channels.sample_filter.SampleFilter` deciding which
+          samples set by the driver are published
 
         """
 
@@ -137,15 +146,21 @@ class ChannelSourceDeviceProperty(ChannelSource):
             raise ValueError, "set_cb must be callable"
         if not callable(refresh_cb):
             raise ValueError, "refresh_cb must be callable"
+        if sample_filter is not None and \
+           not callable(getattr(sample_filter, 'accept', None)):
+            raise ValueError, "sample_filter must have an accept method"
 
         # attributes of this property:
+        if name.__class__ is str: # the type argument hides type()
+            name = intern(name)
         self.name = name
         self.type = ChannelSource._type_remap(self, type)
         self.perms_mask = perms_mask
         self.options = options
         self.device_set_cb = set_cb
         self.device_refresh_cb = refresh_cb
-        self.__rlock = threading.RLock()
+        self.sample_filter = sample_filter
+        self.__rlock = None
 
         # the current sample for this channel:
         self.__sample = initial
@@ -165,13 +180,10 @@ class ChannelSourceDeviceProperty(ChannelSource):
         This function should only be called by a DeviceProperties object.
         """
         sample = ChannelSource._type_remap_and_check(self, self.type, sample)
-        self.__rlock.acquire()
-        try:
-            if sample.timestamp == 0 and self.options & DPROP_OPT_AUTOTIMESTAMP:
-                sample.timestamp = digitime.time()
-            self.__sample = copy(sample)
-        finally:
-            self.__rlock.release()
+        if sample.timestamp == 0 and self.options & DPROP_OPT_AUTOTIMESTAMP:
+            sample.timestamp = digitime.time()
+        # Replacing the reference is atomic, no lock is needed here.
+        self.__sample = copy(sample)
 
 
     def consumer_get(self):
@@ -204,6 +216,16 @@ class ChannelSourceDeviceProperty(ChannelSource):
 
         sample = ChannelSource._type_remap_and_check(self, self.type, sample)
 
+        # Only settable properties need a lock, to serialize the set
+        # callbacks, so it is created on first use.
+        if self.__rlock is None:
+            _LOCK_CREATE.acquire()
+            try:
+                if self.__rlock is None:
+                    self.__rlock = threading.RLock()
+            finally:
+                _LOCK_CREATE.release()
+
         self.__rlock.acquire()
         try:
             if self.device_set_cb is not None:
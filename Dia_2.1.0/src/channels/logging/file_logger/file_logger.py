@@ -36,11 +36,13 @@ from settings.settings_base import SettingsBase, Setting
 from channels.channel import OPT_DONOTLOG
 from channels.logging.logger_base import LoggerBase
 from channels.logging.logging_events import \
-    LoggingEventNewSample, LoggingEventChannelNew, LoggingEventChannelRemove
+    LoggingEventNewSample, LoggingEventNewSamples, LoggingEventChannelNew, \
+    LoggingEventChannelRemove
 from channels.logging.file_logger.file_logger_channel_dbi import \
     FileLoggerChannelDBI
 from channels.logging.file_logger.file_logger_storage_manager import \
     FileLoggerStorageManager, VolumeInit, \
+    DEFAULT_WRITE_BATCH_SIZE, DEFAULT_WRITE_INTERVAL, \
     StoreNewSample, StoreChannelNew, StoreChannelRemove, \
     StoreChannelDump
 from common.path_utils import create_full_path
@@ -81,6 +83,14 @@ class FileLogger(LoggerBase):
             Setting(
                 name='sample_index_frequency', type=int, required=False,
                 default_value=DEFAULT_SAMPLE_INDEX_FREQUENCY),
+            Setting(
+                name='write_batch_size', type=int, required=False,
+                default_value=DEFAULT_WRITE_BATCH_SIZE,
+                verify_function=lambda x: x > 0),
+            Setting(
+                name='write_interval', type=int, required=False,
+                default_value=DEFAULT_WRITE_INTERVAL,
+                verify_function=lambda x: x >= 0),
         ]
 
         # State information:
@@ -144,7 +154,9 @@ class FileLogger(LoggerBase):
     def start(self):
         self.__log_storage_mgr = FileLoggerStorageManager(
                                     self.__name, self.__core_services, self,
-                                    OP_Q_DEPTH, FILE_WRITE_Q_DEPTH)
+                                    OP_Q_DEPTH, FILE_WRITE_Q_DEPTH,
+                                    self.get_setting('write_batch_size'),
+                                    self.get_setting('write_interval'))
         self.__log_storage_mgr.start()
 
         if self.__log_storage_mgr is not None and not self.__logging_started:
@@ -200,12 +212,18 @@ class FileLogger(LoggerBase):
         Returns a tuple of FileLoggerStorageManagerOperations.
         '''
 
-        op = None
+        ops = None
 
-        if not self._should_log_channel(logging_event.channel):
+        if isinstance(logging_event, LoggingEventNewSamples):
+            ops = [ StoreNewSample(channel_name=channel.name(),
+                                   sample=channel.producer_get())
+                    for channel in logging_event.channels
+                    if self._should_log_channel(channel) ]
+            if not ops:
+                return ()
+        elif not self._should_log_channel(logging_event.channel):
             return ()
-
-        if isinstance(logging_event, LoggingEventNewSample):
+        elif isinstance(logging_event, LoggingEventNewSample):
             op = StoreNewSample(channel_name=logging_event.channel.name(),
                                 sample=logging_event.channel.producer_get())
         elif isinstance(logging_event, LoggingEventChannelNew):
@@ -224,7 +242,10 @@ class FileLogger(LoggerBase):
                 logging_event.__class__.__name__)
             return ()
 
-        self.__ops_since_last_dump += 1
+        if ops is None:
+            ops = [ op ]
+
+        self.__ops_since_last_dump += len(ops)
         if (self.__ops_since_last_dump >=
             SettingsBase.get_setting(self, 'sample_index_frequency')):
             cdb = (self.__core_services.get_service("channel_manager")
@@ -236,6 +257,6 @@ class FileLogger(LoggerBase):
                                         cdb.channel_get(cn).producer_get())
                                             for cn in channel_list])
             self.__ops_since_last_dump = 0
-            return (op, StoreChannelDump(channel_dump_dict))
+            ops.append(StoreChannelDump(channel_dump_dict))
 
-        return (op,)
+        return tuple(ops)
@@ -35,7 +35,7 @@ from channels.logging.logging_events import \
     LoggingEventNewSample, LoggingEventChannelNew, LoggingEventChannelRemove, \
     LoggingEventMeta
 from channels.logging.file_logger.file_logger_storage_manager import \
-    RetrieveSeek, RetrieveNext, RetrievePrevious, \
+    RetrieveSeek, RetrieveNext, RetrievePrevious, RetrieveHistory, \
     DBIEventBase, DBIEventChannelNew, DBIEventChannelRemove, \
     DBIEventNewSample, DBIEventChannelDump, \
     NoEvent, FlushOperation
@@ -223,7 +223,56 @@ class FileLoggerChannelDBI(ChannelDatabaseInterface):
     def log_position(self):
         return self.__position
 
-    def log_event_iterator(self, from_record, to_record=None):
+    def history(self, channel_name, start=None, end=None, max_points=None):
+        """
+        Return the samples logged for the channel 'channel_name' with
+        timestamps from 'start' up to but not including 'end'.  Either
+        bound may be None.
+
+        Only the events of the given channel are read from the log.
+        If 'max_points' is None the list of samples is returned in the
+        order they were logged.  Otherwise the range is divided into
+        'max_points' buckets of equal width and a list of tuples
+        (bucket_start, min, max, avg, count) is returned for each bucket
+        holding samples; avg is None if the values are not numeric.
+        """
+        if max_points is not None and max_points < 1:
+            raise ValueError, "max_points must be at least 1"
+
+        op = RetrieveHistory(channel_name, start, end)
+        samples = self.__perform_operation(op)
+
+        if max_points is None or not samples:
+            return samples
+
+        if start is None:
+            start = min([ s.timestamp for s in samples ])
+        if end is None:
+            end = max([ s.timestamp for s in samples ])
+        width = float(end - start) / max_points
+        buckets = { }
+        for sample in samples:
+            if width > 0:
+                i = min(int((sample.timestamp - start) / width),
+                        max_points - 1)
+            else:
+                i = 0
+            buckets.setdefault(i, []).append(sample.value)
+
+        points = [ ]
+        for i in sorted(buckets):
+            values = buckets[i]
+            try:
+                avg = float(sum(values)) / len(values)
+            except (TypeError, ValueError):
+                avg = None
+            points.append((start + i * width, min(values), max(values),
+                           avg, len(values)))
+
+        return points
+
+    def log_event_iterator(self, from_record=None, to_record=None,
+                           from_time=None, to_time=None):
         # If you wish to terminate iteration of the log early the user MUST
         # call the close() method of the iterator in order to release
         # internal mutual exclusion locks.  Not calling close() on the
@@ -231,6 +280,23 @@ class FileLoggerChannelDBI(ChannelDatabaseInterface):
         # in a locked state; making it impossible to perform other operations
         # on the context.
 
+        # Translate a time range to the records it covers; a step of
+        # zero marks an empty range:
+        step = None
+        if from_time is not None:
+            try:
+                from_record = self.log_seek_time(from_time)
+            except NoEvent:
+                step = 0
+        if to_time is not None and step is None:
+            try:
+                to_record = self.log_seek_time(to_time) - 1
+            except NoEvent:
+                to_record = None
+            else:
+                if from_record is not None and to_record < from_record:
+                    step = 0
+
         def get_last_event():
             return self.__last_logging_event
 
@@ -260,6 +326,9 @@ class FileLoggerChannelDBI(ChannelDatabaseInterface):
                     pass
 
             def __log_event_generator(self):
+                if self.__step == 0:
+                    return
+
                 self.__lock.acquire()
                 self.__islocked = True
 
@@ -314,10 +383,11 @@ class FileLoggerChannelDBI(ChannelDatabaseInterface):
 
 
         # take the lock in order to block other operations:
-        step = 1
-        # this works even if from_record or to_record is None:
-        if (to_record is not None and from_record > to_record):
-            step = -1
+        if step is None:
+            step = 1
+            # this works even if from_record or to_record is None:
+            if (to_record is not None and from_record > to_record):
+                step = -1
 
         return LogEventIterator(from_record, to_record, step,
                                 self.__op_req_lock, self.__perform_operation,
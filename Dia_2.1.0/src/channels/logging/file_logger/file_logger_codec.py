@@ -0,0 +1,242 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, Digi International (Digi). All Rights Reserved.       #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice, and the following   #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+"""\
+Serialization of samples stored by the FileLogger.
+
+Two sample record formats exist.  Version 1 volumes store the unit
+offset and a whole-second timestamp followed by the value pickled
+with protocol 1.  Version 2 volumes store the timestamp with
+millisecond resolution and the value as a one-byte type tag followed
+by a fixed-width or length-prefixed encoding; only values of other
+types are pickled.
+
+Version 2 sample record:
+
+Offset    Item
+     0    Unit offset (offset of unit string in nameDB)
+     4    Timestamp, whole seconds (uint32)
+     8    Timestamp, milliseconds (uint16)
+    10    Value tag
+    11    Value encoding, as given by the tag:
+
+Tag       Encoding
+  0       None, no data
+  1, 2    False, True, no data
+  3       int8
+  4       int32
+  5       int64
+  6       float64
+  7       str: uint16 length, bytes
+  8       unicode: uint16 length, UTF-8 bytes
+255       other: uint32 length, pickle protocol 1
+"""
+
+# imports
+import struct
+import pickle
+import StringIO
+
+try:
+    Struct = struct.Struct
+except AttributeError:
+    # Python 2.4 has no precompiled structs; slice the data instead.
+    class Struct(object):
+        def __init__(self, format):
+            self.format = format
+            self.size = struct.calcsize(format)
+
+        def pack(self, *args):
+            return struct.pack(self.format, *args)
+
+        def unpack(self, data):
+            return struct.unpack(self.format, data)
+
+        def unpack_from(self, data, offset=0):
+            return struct.unpack(self.format,
+                                 data[offset:offset + self.size])
+
+# constants
+FORMAT_PICKLE = 1
+FORMAT_TAGGED = 2
+FORMAT_VERSIONS = (FORMAT_PICKLE, FORMAT_TAGGED)
+
+SAMPLE_V1 = Struct(">II")
+SAMPLE_V2 = Struct(">IIHB")
+OFFSET = Struct(">I")
+TIMESTAMP = Struct(">IH")
+_INT8 = Struct(">b")
+_INT32 = Struct(">i")
+_INT64 = Struct(">q")
+_FLOAT64 = Struct(">d")
+_LENGTH16 = Struct(">H")
+
+TAG_NONE    = 0
+TAG_FALSE   = 1
+TAG_TRUE    = 2
+TAG_INT8    = 3
+TAG_INT32   = 4
+TAG_INT64   = 5
+TAG_FLOAT64 = 6
+TAG_STR     = 7
+TAG_UNICODE = 8
+TAG_PICKLE  = 255
+
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+INT64_MIN, INT64_MAX = -2**63, 2**63 - 1
+STR_MAX = 0xffff
+
+# exception classes
+
+# interface functions
+
+def encode_sample(unit_off, sample, version=FORMAT_TAGGED):
+    '''
+    Return the record for 'sample' in the given format 'version' with
+    its unit stored at nameDB offset 'unit_off'.
+    '''
+    if version == FORMAT_PICKLE:
+        return (SAMPLE_V1.pack(unit_off, int(sample.timestamp)) +
+                pickle.dumps(sample.value, protocol=1))
+
+    seconds, msec = _split_timestamp(sample.timestamp)
+    pack = SAMPLE_V2.pack
+
+    value = sample.value
+    vtype = type(value)
+
+    if value is None:
+        return pack(unit_off, seconds, msec, TAG_NONE)
+    elif vtype is bool:
+        return pack(unit_off, seconds, msec, value and TAG_TRUE or TAG_FALSE)
+    elif vtype is int or vtype is long:
+        if -128 <= value <= 127:
+            return pack(unit_off, seconds, msec, TAG_INT8) + _INT8.pack(value)
+        if INT32_MIN <= value <= INT32_MAX:
+            return pack(unit_off, seconds, msec, TAG_INT32) + \
+                   _INT32.pack(value)
+        if INT64_MIN <= value <= INT64_MAX:
+            return pack(unit_off, seconds, msec, TAG_INT64) + \
+                   _INT64.pack(value)
+    elif vtype is float:
+        return pack(unit_off, seconds, msec, TAG_FLOAT64) + \
+               _FLOAT64.pack(value)
+    elif vtype is str:
+        if len(value) <= STR_MAX:
+            return pack(unit_off, seconds, msec, TAG_STR) + \
+                   _LENGTH16.pack(len(value)) + value
+    elif vtype is unicode:
+        data = value.encode('utf-8')
+        if len(data) <= STR_MAX:
+            return pack(unit_off, seconds, msec, TAG_UNICODE) + \
+                   _LENGTH16.pack(len(data)) + data
+
+    data = pickle.dumps(value, protocol=1)
+    return pack(unit_off, seconds, msec, TAG_PICKLE) + \
+           OFFSET.pack(len(data)) + data
+
+def encode_timestamp(timestamp):
+    ''' Return 'timestamp' as stored by version 2 records. '''
+    return TIMESTAMP.pack(*_split_timestamp(timestamp))
+
+def decode_timestamp(data, offset):
+    ''' Decode a timestamp written by encode_timestamp(). '''
+    seconds, msec = TIMESTAMP.unpack_from(data, offset)
+    if msec:
+        return seconds + msec / 1000.0
+    return seconds
+
+def sample_timestamp(data, offset, version=FORMAT_TAGGED):
+    '''
+    Return only the timestamp of the sample record starting at
+    'offset' in the string 'data'.
+    '''
+    if version == FORMAT_PICKLE:
+        return SAMPLE_V1.unpack_from(data, offset)[1]
+    return decode_timestamp(data, offset + OFFSET.size)
+
+def decode_sample(data, offset, version=FORMAT_TAGGED):
+    '''
+    Decode the sample record starting at 'offset' in the string
+    'data'.
+
+    Returns a tuple of (unit_off, timestamp, value, next_offset).
+    '''
+    if version == FORMAT_PICKLE:
+        unit_off, timestamp = SAMPLE_V1.unpack_from(data, offset)
+        sio = StringIO.StringIO(data)
+        sio.seek(offset + SAMPLE_V1.size)
+        value = pickle.load(sio)
+        return unit_off, timestamp, value, sio.tell()
+
+    unit_off, seconds, msec, tag = SAMPLE_V2.unpack_from(data, offset)
+    offset += SAMPLE_V2.size
+    timestamp = seconds
+    if msec:
+        timestamp += msec / 1000.0
+
+    if tag == TAG_INT8:
+        return unit_off, timestamp, _INT8.unpack_from(data, offset)[0], \
+               offset + 1
+    elif tag == TAG_INT32:
+        return unit_off, timestamp, _INT32.unpack_from(data, offset)[0], \
+               offset + 4
+    elif tag == TAG_FLOAT64:
+        return unit_off, timestamp, _FLOAT64.unpack_from(data, offset)[0], \
+               offset + 8
+    elif tag == TAG_TRUE:
+        return unit_off, timestamp, True, offset
+    elif tag == TAG_FALSE:
+        return unit_off, timestamp, False, offset
+    elif tag == TAG_NONE:
+        return unit_off, timestamp, None, offset
+    elif tag == TAG_INT64:
+        return unit_off, timestamp, _INT64.unpack_from(data, offset)[0], \
+               offset + 8
+    elif tag == TAG_STR or tag == TAG_UNICODE:
+        length = _LENGTH16.unpack_from(data, offset)[0]
+        offset += 2
+        value = data[offset:offset + length]
+        if tag == TAG_UNICODE:
+            value = value.decode('utf-8')
+        return unit_off, timestamp, value, offset + length
+    elif tag == TAG_PICKLE:
+        length = OFFSET.unpack_from(data, offset)[0]
+        offset += 4
+        value = pickle.loads(data[offset:offset + length])
+        return unit_off, timestamp, value, offset + length
+
+    raise ValueError("unknown value tag: 0x%02x" % tag)
+
+# internal functions & classes
+
+def _split_timestamp(timestamp):
+    seconds = int(timestamp)
+    msec = int(round((timestamp - seconds) * 1000))
+    if msec >= 1000:
+        seconds, msec = seconds + 1, 0
+    return seconds, msec
@@ -34,20 +34,27 @@ import threading
 import Queue
 import struct
 import os
-import pickle
 import operator
-import StringIO
 import bisect
 import traceback
 from copy import deepcopy
 
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
 import digitime
 from core.tracing import get_tracer
 
 from collections import deque
 
 from channels.channel_database_interface import \
-    LOG_SEEK_SET, LOG_SEEK_CUR, LOG_SEEK_END, LOG_SEEK_REC
+    LOG_SEEK_SET, LOG_SEEK_CUR, LOG_SEEK_END, LOG_SEEK_REC, LOG_SEEK_TIME
+from channels.logging.file_logger.file_logger_codec import \
+    FORMAT_PICKLE, FORMAT_TAGGED, OFFSET, TIMESTAMP, Struct, \
+    encode_sample, decode_sample, encode_timestamp, decode_timestamp, \
+    sample_timestamp
 from samples.sample import Sample
 
 # constants
@@ -70,13 +77,24 @@ from samples.sample import Sample
 
 # The header contains the following elements
 # Offset     Item
-#      0     Magic 'FL'
+#      0     Magic, 'FL', 'F2' or 'F3' (see below)
 #      2     ERB offset
 #      6     nameDB offset
 #      10     Instance name length
 #      11     File_Logger name when log file was created
 
-MAGIC = 'FL'
+# The magic also identifies the sample record format used throughout
+# the volume and whether its events are chained per channel (see
+# below).  New volumes are always created with the latest format;
+# existing volumes keep the format they were created with.
+MAGIC_V1 = 'FL'
+MAGIC_V2 = 'F2'
+MAGIC_V3 = 'F3'
+MAGIC = MAGIC_V3
+MAGIC_FORMATS = {MAGIC_V1: FORMAT_PICKLE,
+                 MAGIC_V2: FORMAT_TAGGED,
+                 MAGIC_V3: FORMAT_TAGGED}
+MAGIC_CHAINED = (MAGIC_V3,)
 LOG_HDR_FMT = '>2sIIH'
 LOG_HDR_SIZE = struct.calcsize(LOG_HDR_FMT)
 
@@ -94,6 +112,11 @@ LOG_HDR_SIZE = struct.calcsize(LOG_HDR_FMT)
 # convenient with POSIX file seek behavior), or 0xffffffff (Erase
 # state of flash). Choice of either/both deferred until implementation.
 
+# Each CDORB entry also carries the checkpoint of its channel dump: the
+# latest sample timestamp logged up to and including the dump.  The
+# checkpoints never decrease with the record number, which makes the
+# CDORB a sparse timestamp index that can be bisected to seek by time.
+
 # ERB elements
 
 # Events stored to the log have the general header format of
@@ -108,6 +131,7 @@ LOG_HDR_SIZE = struct.calcsize(LOG_HDR_FMT)
 # interest.
 EVENT_HEADER_FMT = ">HIII"
 EVENT_HEADER_SIZE = struct.calcsize(EVENT_HEADER_FMT)
+EVENT_HEADER = Struct(EVENT_HEADER_FMT) # for parsing mapped events
 
 
 class EventHeader(object):
@@ -153,9 +177,19 @@ class EventApplicationException(Exception):
 
 
 def read_event_hdr(fobj):
-    ''' parse a hex string into an event hdr object '''
+    ''' read and parse an event hdr object from a file '''
     hdr = EventHeader(struct.unpack(EVENT_HEADER_FMT,
                                     fobj.read(EVENT_HEADER_SIZE)))
+    return _check_event_hdr(hdr)
+
+
+def unpack_event_hdr(data, offset=0):
+    ''' parse the event hdr object at 'offset' in a mapped ERB '''
+    hdr = EventHeader(EVENT_HEADER.unpack_from(data, offset))
+    return _check_event_hdr(hdr)
+
+
+def _check_event_hdr(hdr):
     if hdr.type == 0x0 or hdr.type == 0xffff:
         raise NoEvent("NoEvent on event header read (0x%04x)" % hdr.type)
     elif hdr.type >= MAX_TYPE:
@@ -182,23 +216,47 @@ EVENT_NAMES = ["NONE", "CHANNEL_NEW", "CHANNEL_REMOVE", "NEW_SAMPLE",
 #      0   Channel Name offset from nameDB
 #      4   Serialization of Sample
 
+# In version 2 and 3 volumes the ChannelDump begins with its checkpoint
+# timestamp (whole seconds, then milliseconds) ahead of the repeated
+# samples.  Version 1 dumps have no checkpoint; it is taken from the
+# samples of the dump when the volume is scanned.
+
+# Version 3 volumes also chain the events of each channel together so
+# that the history of one channel can be read without visiting the
+# events of all the others.  Every ChannelNew, ChannelRemove and
+# NewSample event stores the ERB offset of the previous event of the
+# same channel (zero if none), and the ChannelDump stores the offset
+# of the latest event of each channel, the head of its chain:
+
+# Offset   Item
+#      0   Channel Name offset from nameDB
+#      4   Offset of previous event of the channel (ChannelDump: latest)
+#      8   Serialization of Sample
+
+# A chain ends where the event it points to has been overwritten,
+# which is detected by the record number or channel of the event found
+# there.
+CHAIN = Struct('>II') # channel name offset, previous event offset
+
 # Sample serializing
 # Samples as currently existing in the system contain three members
-# (unit, value, timestamp).  When an event writes sample(s) to disk it
-# uses a combination of the 'struct' (for unit and timestamp), and
-# 'pickle' (for value) modules to do so.
-
-# We will always pickle with protocol=1 currently because that
-# provides the best overhead for the simple data that is intended to
-# be primarily stored in Sample objects.
+# (unit, value, timestamp).  The record format for a sample depends
+# on the version of the volume and is implemented by the
+# file_logger_codec module:
 
+# Version 1 ('FL' volumes)
 # Offset    Item
 #      0    Unit offset (offset of unit string in nameDB)
-#      4    Timestamp
-#      8    Value (pickled)
+#      4    Timestamp (whole seconds)
+#      8    Value (pickled, protocol 1)
 
-SAMPLE_FMT = ">II"
-SAMPLE_SIZE = struct.calcsize(SAMPLE_FMT)
+# Version 2 and 3 ('F2' and 'F3' volumes)
+# Offset    Item
+#      0    Unit offset (offset of unit string in nameDB)
+#      4    Timestamp, whole seconds
+#      8    Timestamp, milliseconds
+#     10    Value type tag
+#     11    Value, fixed-width or length prefixed as given by the tag
 
 # nameDB elements
 # Offset    Item
@@ -206,6 +264,13 @@ SAMPLE_SIZE = struct.calcsize(SAMPLE_FMT)
 #      1    Name
 # List of nameDB objects MUST be terminated with a final NULL byte
 
+# Group commit policy.  Queued events are written to the ERB in one
+# write per batch once this many events are pending, or once this many
+# seconds have passed since the last write.  New names referenced by a
+# batch are appended to the nameDB in a single write ahead of it.
+DEFAULT_WRITE_BATCH_SIZE = 100
+DEFAULT_WRITE_INTERVAL = 60
+
 
 ########
 # interface
@@ -340,6 +405,24 @@ class RetrievePrevious(RetrievalOperationBase):
     pass
 
 
+class RetrieveHistory(RetrievalOperationBase):
+    '''
+    Instructs the FileLoggerStoreManager to retrieve the samples logged
+    for the channel 'channel_name' with timestamps from 'start' up to
+    but not including 'end'.  Either bound may be None.
+
+    Calls the given callback upon completion with a list of Sample
+    objects in the order they were logged.
+    '''
+    def __init__(self, channel_name, start=None, end=None,
+                 completion_cb=None):
+        self.channel_name = channel_name
+        self.start = start
+        self.end = end
+        RetrievalOperationBase.__init__(self,
+            completion_cb=completion_cb)
+
+
 class FlushOperation(RetrievalOperationBase):
     '''
     Instructs the FileLoggerStoreManager to flush any pending data
@@ -453,6 +536,7 @@ class DBIEventChannelDump(StoreChannelDump, DBIEventBase):
 SINGLE_EVENT_MAP = {StoreChannelNew: CHANNEL_NEW,
                     StoreNewSample: NEW_SAMPLE,
                     StoreChannelRemove: CHANNEL_REMOVE}
+SINGLE_EVENT_TYPES = SINGLE_EVENT_MAP.values()
 
 
 def do_nothing(*args):
@@ -464,7 +548,10 @@ class FileLoggerStorageManager(threading.Thread):
     ''' presents a logger interface backed by a file '''
 
     def __init__(self, name, core_services, file_logger,
-                    op_q_depths, file_write_q_depth):
+                    op_q_depths, file_write_q_depth,
+                    write_batch_size=DEFAULT_WRITE_BATCH_SIZE,
+                    write_interval=DEFAULT_WRITE_INTERVAL,
+                    use_mmap=True):
         self.__name = name
         self.__core_services = core_services
         self.__file_logger = file_logger
@@ -476,7 +563,9 @@ class FileLoggerStorageManager(threading.Thread):
 
         ## Storage Operations queue initialization
         self.__op_q_depths = op_q_depths
-        self.__op_q_semaphore = threading.Semaphore(0)
+        # One token per queued operation; a Queue rather than a
+        # Semaphore so that the thread can wake up for timed flushes:
+        self.__op_q_signal = Queue.Queue()
         self.__op_q_pri_high = Queue.Queue(op_q_depths)
         self.__op_q_pri_low = Queue.Queue(op_q_depths)
 
@@ -484,12 +573,30 @@ class FileLoggerStorageManager(threading.Thread):
         self.__file_write_q_depth = file_write_q_depth
         self.__file_write_q = deque()
         self.__last_write = digitime.time()
+        self.__write_batch_size = max(1, min(write_batch_size,
+                                             file_write_q_depth))
+        self.__write_interval = max(0, write_interval)
+
+        ## Write statistics:
+        self.__batches = 0
+        self.__writes = 0
+        self.__bytes_written = 0
 
         ## Scanned state from log file
         self._logfile = None
-        self.__cdorb = deque() # List of ChannelDump offsets in ERB
+        self.__use_mmap = use_mmap
+        self.__map = None # read-only map of the header and ERB, if any
+        self.__format = FORMAT_TAGGED # sample record format of the volume
+        self.__chained = True # events carry channel chain offsets
+        self.__sample_off = 2 * OFFSET.size # sample offset in single events
+        self.__chains = {} # channel name offset -> offset of latest event
+        self.__cdorb = deque() # (offset, record, checkpoint) of ChannelDumps
+        self.__checkpoint = 0 # latest sample timestamp written
+        self.__dump_checkpoint = 0 # checkpoint of the last generated dump
         self.__names = {} # Maps channel names to offsets
-        self.__offset_to_name_cache = {} # maps offsets to names on retrieval
+        self.__names_by_offset = {} # Maps offsets back to names
+        self.__names_end = None # offset at which the next name is placed
+        self.__pending_names = [] # names not yet written to the nameDB
 
         self.__record = -1
         self.__lastrecord = None
@@ -514,6 +621,7 @@ class FileLoggerStorageManager(threading.Thread):
                        RetrieveSeek: self.do_retrieve_seek,
                        RetrieveNext: self.do_retrieve_next,
                        RetrievePrevious: self.do_retrieve_prev,
+                       RetrieveHistory: self.do_retrieve_history,
                        FlushOperation: self.do_flush_operation,
                        StopOperation: do_nothing}
 
@@ -561,9 +669,30 @@ class FileLoggerStorageManager(threading.Thread):
             return
 
         # Notify thread of new operation:
-        # NOTE: This is not being used to protect a critical section,
-        # and does not need to match an acquire in this method
-        self.__op_q_semaphore.release()
+        self.__op_q_signal.put_nowait(None)
+
+    def write_stats(self):
+        '''
+        Return a dictionary describing the write activity to the log
+        file: the number of batches committed, the number of writes
+        issued to the file system and the number of bytes written.
+        '''
+        return {'batches': self.__batches,
+                'writes': self.__writes,
+                'bytes': self.__bytes_written,
+                'pending': len(self.__file_write_q)}
+
+    def __write_due(self):
+        pending = len(self.__file_write_q)
+        if not pending:
+            return False
+        if pending >= self.__file_write_q_depth:
+            # Never drop events for the sake of deferring a write:
+            return True
+        if not (self.__op_q_pri_high.empty() and self.__op_q_pri_low.empty()):
+            return False
+        return (pending >= self.__write_batch_size or
+                digitime.time() - self.__last_write >= self.__write_interval)
 
     def run(self):
         """FileLoggerStorageManager thread execution beings here."""
@@ -577,15 +706,11 @@ class FileLoggerStorageManager(threading.Thread):
 
             # Case 2: if there are no pending operations and there
             #         are items in our file write queue, go and service
-            #         the file write queue.  We must have more than 100
-            #         entries in the queue, or not have written for at
-            #         least a minute.  This helps us to use the flash
-            #         file system effectively.:
-            if (self.__op_q_pri_high.empty() \
-                and self.__op_q_pri_low.empty() \
-                and len(self.__file_write_q) \
-                and (len(self.__file_write_q) > 100
-                     or digitime.time() - self.__last_write > 60)):
+            #         the file write queue.  We must have at least
+            #         write_batch_size entries in the queue, or not
+            #         have written for write_interval seconds.  This
+            #         helps us to use the flash file system effectively.:
+            if self.__write_due():
 
                 self.__tracer.info("Writing %d items at time %.2f",
                                    len(self.__file_write_q), digitime.time())
@@ -616,8 +741,18 @@ class FileLoggerStorageManager(threading.Thread):
                 self.__last_write = digitime.time()
                 continue
 
-            # Case 3: wait for an operation to show up in one of our queues:
-            self.__op_q_semaphore.acquire(True)
+            # Case 3: wait for an operation to show up in one of our
+            #         queues, waking up for the next timed write if
+            #         events are pending:
+            try:
+                if len(self.__file_write_q):
+                    timeout = max(0.1, self.__write_interval -
+                                  (digitime.time() - self.__last_write))
+                    self.__op_q_signal.get(True, timeout)
+                else:
+                    self.__op_q_signal.get(True)
+            except Queue.Empty:
+                continue
 
             # Get the operation:
             opr = None
@@ -640,29 +775,29 @@ class FileLoggerStorageManager(threading.Thread):
         self.__record += 1
 
     def empty_write_q(self):
-        ''' write all queued entries '''
+        '''
+        write all queued entries
+
+        Each pass over the ERB is committed as a group: any new names
+        are appended to the nameDB in a single write, followed by a
+        single write of the padded event stream.
+        '''
         dq = self.__file_write_q
 
         while dq:
-            #self.__tracer.info("dq: %s", dq)
             tmpcursor = self.__recordcursor
             tmplast = self.__lastrecord
             wrap = False
 
-            writebuf = ''
+            events = []
             totallength = 0
-            eventspan = 0
 
             while dq: # Can't decide we need to stop until we've serialized
-                #self.__tracer.info("writebuf: %s", repr(writebuf))
                 # pop an op
                 record, op = dq.popleft()
-                #self.__tracer.info("record: %s op: %s", record, op)
 
                 # serialize event
                 event, length = self._generate_event(op, record, tmplast)
-                #self.__tracer.info("event: %s", repr(event))
-                #self.__tracer.info("length: %s", length)
 
                 # if it will fit place in write stream, else push back op
                 newcursor = tmpcursor + length
@@ -671,79 +806,82 @@ class FileLoggerStorageManager(threading.Thread):
                     self._clear_cdorb(tmpcursor, newcursor)
 
                     if isinstance(op, StoreChannelDump):
-                        #self.__tracer.info("Append: ", (tmpcursor, record))
-                        self.__cdorb.append((tmpcursor, record))
+                        self.__cdorb.append((tmpcursor, record,
+                                             self.__dump_checkpoint))
+                    elif self.__chained:
+                        self.__chains[self._get_name_offset(
+                            op.channel_name)] = tmpcursor
 
-                    writebuf = writebuf + event
+                    events.append(event)
                     tmplast = tmpcursor
                     tmpcursor = newcursor
                     totallength += length
-                    eventspan += length
                 else:
-                    #self.__tracer.warning("Can't fit another, break")
                     # Process later
                     dq.appendleft((record, op))
                     break # Time to write
 
-#                self.__tracer.info("totallength: %s tmpcursor: %s tmplast: %s",
-#                                   totallength, hex(tmpcursor), hex(tmplast))
-
-#            self.__tracer.info("totallength: %s tmpcursor: %s tmplast: %s",
-#                               totallength, hex(tmpcursor), hex(tmplast))
-
+            pad = ""
             endpad = False
             if len(dq) == 0:
                 # Pad until next event
                 try:
-                    pad = self._pad_write(writebuf, totallength, tmplast)
-                    writebuf = writebuf + pad
+                    pad = self._pad_write(totallength, tmplast)
                 except self.PlaceError:
                     endpad = True
             else:
                 endpad = True
 
-            #self.__tracer.info("endpad: %s", endpad)
-
             if endpad:
                 # Pad until end of buffer (de facto next event)
                 pad = EventHeader((PAD_EVENT,
                                    0,
                                    self.__nameDB_off - tmpcursor,
-                                   tmplast))
-
-                writebuf = writebuf + pad.bin_repr()
+                                   tmplast)).bin_repr()
                 wrap = True
 
-            #self.__tracer.info("writebuf: %s", repr(writebuf))
-
-            padhdr = struct.unpack(EVENT_HEADER_FMT, pad)
-            padhdr = EventHeader(padhdr)
-            eventspan += padhdr.length
+            if pad:
+                events.append(pad)
+                padlength = struct.unpack(EVENT_HEADER_FMT, pad)[2]
 
-            # Keep CDORB up to date
+                # Keep CDORB up to date
+                self.__tracer.info("Clearing pad: %d - %d",
+                                   tmpcursor, tmpcursor + padlength)
+                self._clear_cdorb(tmpcursor, tmpcursor + padlength)
 
-            self.__tracer.info("Clearing pad: %d - %d",
-                               tmpcursor, tmpcursor + padhdr.length)
-            self._clear_cdorb(tmpcursor,
-                              tmpcursor + padhdr.length)
+            # Names must reach the file before the events that refer
+            # to them:
+            self._write_names()
 
             # Write out padded event stream
             self._erb_seek(self.__recordcursor)
-            self._logfile.write(writebuf)
+            self.__write(''.join(events))
             self._logfile.flush()
+            self.__batches += 1
 
             if wrap:
-                #self.__tracer.info("Wrapping")
                 self.__wraps += 1
-                # self.__tracer.info("Wrapped.  This was wrap number
-                # %s", self.__wraps)
                 self.__recordcursor = self.__erb_off
             else:
-                #self.__tracer.info("NOT wrapping")
                 self.__recordcursor += totallength
 
             self.__lastrecord = tmplast
 
+    def __write(self, data):
+        self._logfile.write(data)
+        self.__writes += 1
+        self.__bytes_written += len(data)
+
+    def _write_names(self):
+        ''' append any names allocated since the last write '''
+        if not self.__pending_names:
+            return
+
+        data = ''.join(self.__pending_names)
+        self._logfile.seek(self.__names_end - len(data))
+        self.__write(data)
+        self.__pending_names = []
+
     def _clear_cdorb(self, before, after):
         while (self.__cdorb and
                   self.__cdorb[0][0] >= before and
@@ -767,7 +905,14 @@ class FileLoggerStorageManager(threading.Thread):
             raise BadEvent('_generate_single_event passed '
                            'bad op type %s' % (str(opr)))
         channel_off = self._get_name_offset(opr.channel_name)
-        channel_off = struct.pack('>I', channel_off)
+        if self.__chained:
+            channel_off = CHAIN.pack(channel_off,
+                                     self.__chains.get(channel_off, 0))
+        else:
+            channel_off = struct.pack('>I', channel_off)
+
+        if opr.sample.timestamp > self.__checkpoint:
+            self.__checkpoint = opr.sample.timestamp
 
         sample = self._format_sample(opr.sample)
 
@@ -778,16 +923,29 @@ class FileLoggerStorageManager(threading.Thread):
         return event, size
 
     def _generate_dump_event(self, op, record, lastrecord):
-        body = ""
+        body = []
 
         for name in op.channel_dict:
             channel_off = self._get_name_offset(name)
-            channel_off = struct.pack('>I', channel_off)
-
-            sample = self._format_sample(op.channel_dict[name])
-
-            body += channel_off + sample
+            if self.__chained:
+                body.append(CHAIN.pack(channel_off,
+                                       self.__chains.get(channel_off, 0)))
+            else:
+                body.append(struct.pack('>I', channel_off))
+            sample = op.channel_dict[name]
+            body.append(self._format_sample(sample))
+            if sample.timestamp > self.__checkpoint:
+                self.__checkpoint = sample.timestamp
+
+        if self.__format == FORMAT_PICKLE:
+            self.__dump_checkpoint = self.__checkpoint
+        else:
+            checkpoint = encode_timestamp(self.__checkpoint)
+            body.insert(0, checkpoint)
+            # Index the value as it will be read back from the log:
+            self.__dump_checkpoint = decode_timestamp(checkpoint, 0)
 
+        body = ''.join(body)
         size = EVENT_HEADER_SIZE + len(body)
         header = EventHeader((CHANNEL_DUMP,
                               record, size,
@@ -799,7 +957,7 @@ class FileLoggerStorageManager(threading.Thread):
     class PlaceError(Exception):
         pass
 
-    def _pad_write(self, event, length, lastrecord):
+    def _pad_write(self, length, lastrecord):
         # If we can find another valid event before the end of the
         # buffer, we will create a pad event to bring us to it.
         # Otherwise, we will just stick a sentinal on the end to stop
@@ -837,19 +995,17 @@ class FileLoggerStorageManager(threading.Thread):
         return ""
 
     def _next_event(self, cursor, wrap=False):
-        self._erb_seek(cursor)
-        hdr = read_event_hdr(self._logfile)
+        hdr = self._read_event_hdr(cursor)
         return cursor +  hdr.length
 
     def _format_sample(self, sample):
         unit_off = self._get_name_offset(sample.unit)
-        hdr = struct.pack(SAMPLE_FMT, unit_off, int(sample.timestamp))
-        return hdr + pickle.dumps(sample.value, protocol=1)
+        return encode_sample(unit_off, sample, self.__format)
 
     def _get_name_offset(self, name):
         # Keep names less than 256 bytes
         if len(name) > 255:
-            name = name[:256]
+            name = name[:255]
 
         if len(name) == 0:
             name = " " # Can't store the empty string
@@ -858,25 +1014,30 @@ class FileLoggerStorageManager(threading.Thread):
         if name in self.__names:
             return self.__names[name]
 
-        # If not found, insert it into the log file and return the new offset
-        self._logfile.seek(0, 2) # End of file, should be \x00
-        offset = self._logfile.tell()
-        self._logfile.write(chr(len(name)))
-        self._logfile.write(name)
-        self._logfile.flush()
+        # If not found, allocate it at the end of the nameDB and return
+        # the new offset.  It is written ahead of the next event batch
+        # by _write_names().
+        offset = self.__names_end
+        self.__pending_names.append(chr(len(name)) + name)
+        self.__names_end += len(name) + 1
         self.__names[name] = offset
+        self.__names_by_offset[offset] = name
 
         return offset
 
     def _get_name_by_offset(self, name_offset):
-        if name_offset in self.__offset_to_name_cache:
-            return self.__offset_to_name_cache[name_offset]
+        # The table holds every name scanned at startup or allocated
+        # since, so replaying events does not need to touch the nameDB:
+        try:
+            return self.__names_by_offset[name_offset]
+        except KeyError:
+            pass
 
         self._logfile.seek(name_offset)
         name_len = ord(self._logfile.read(1))
         name = self._logfile.read(name_len)
 
-        self.__offset_to_name_cache[name_offset] = name
+        self.__names_by_offset[name_offset] = name
         return name
 
     def do_volume_init(self, op):
@@ -888,6 +1049,7 @@ class FileLoggerStorageManager(threading.Thread):
             # If we encounter an error during the scanning of the log,
             # we will delete it and start anew.  Of course, if that
             # fails the world will end so we can't loop.
+            self._unmap_erb()
             if self._logfile:
                 self._logfile.close()
                 self._logfile = None
@@ -936,13 +1098,24 @@ class FileLoggerStorageManager(threading.Thread):
         magic, self.__erb_off, self.__nameDB_off, name_length = \
                struct.unpack(LOG_HDR_FMT, hdr)
 
-        if magic != MAGIC:
+        if magic not in MAGIC_FORMATS:
             raise IOError("%s(%s): : Bad log file" %
                           (self.__class__.__name__, self.__name))
+        self.__format = MAGIC_FORMATS[magic]
+        self.__chained = magic in MAGIC_CHAINED
+        if self.__chained:
+            self.__sample_off = 2 * OFFSET.size
+        else:
+            self.__sample_off = OFFSET.size
 
         self.__tracer.info("Log self identifies as instance: ")
         self.__tracer.info(self._logfile.read(name_length))
 
+        # Where mmap is available, events are parsed straight out of a
+        # shared read-only map.  Writes through the file object are
+        # visible in it, so it stays valid for the life of the volume:
+        self._map_erb()
+
         self._scan_erb()
         self._scan_names()
 
@@ -951,6 +1124,11 @@ class FileLoggerStorageManager(threading.Thread):
         self._logfile.close()
         self._logfile = file(op.filename, "rb+", 0)
 
+        # New names are appended at the end of the file:
+        self._logfile.seek(0, 2)
+        self.__names_end = self._logfile.tell()
+        self.__pending_names = []
+
     def _create_logfile(self, op):
         self._logfile = file(op.filename, "wb+", 0)
         length = len(self.__name)
@@ -981,6 +1159,25 @@ class FileLoggerStorageManager(threading.Thread):
         self._logfile.close()
         self._logfile = None
 
+    def _map_erb(self):
+        ''' map the header and ERB of the open log file for reading '''
+        self._unmap_erb()
+        if mmap is None or not self.__use_mmap:
+            return
+
+        try:
+            self.__map = mmap.mmap(self._logfile.fileno(), self.__nameDB_off,
+                                   access=mmap.ACCESS_READ)
+        except (EnvironmentError, ValueError), e:
+            self.__tracer.warning("unable to map log file, "
+                                  "reading through the file: %s", str(e))
+            self.__map = None
+
+    def _unmap_erb(self):
+        if self.__map is not None:
+            self.__map.close()
+            self.__map = None
+
     def _scan_erb(self):
         # Traverse the entire ERB building the __cdorb list in memory
         # by adding a new offset value each time we encounter a
@@ -993,34 +1190,50 @@ class FileLoggerStorageManager(threading.Thread):
         records = 0
         dumps = 0
 
+        # Every event is visited, so with a mapped ERB the header fields
+        # are unpacked in place and an EventHeader is only built for
+        # the channel dumps:
+        erb = self.__map
+        unpack_from = EVENT_HEADER.unpack_from
+
         while offset < self.__nameDB_off:
             # Read in an event header
-            self._erb_seek(offset)
-
             try:
-                hdr = read_event_hdr(self._logfile)
+                if erb is None:
+                    hdr = self._read_event_hdr(offset)
+                    fields = (hdr.type, hdr.record, hdr.length, hdr.previous)
+                else:
+                    hdr = None
+                    fields = unpack_from(erb, offset)
+                    if fields[0] in (0x0, 0xffff) or fields[0] >= MAX_TYPE:
+                        unpack_event_hdr(erb, offset) # raises
             except NoEvent:
                 # Hit the end of events in the ERB
                 break
+            event_type, record, length = fields[:3]
 
             records += 1
 
             #self.__tracer.info("0x%x: %s" % (offset, repr(hdr)))
 
-            if hdr.type == CHANNEL_DUMP:
+            if event_type == CHANNEL_DUMP:
                 # Add this offset to cdorb
-                self.__cdorb.append((offset, hdr.record))
+                if hdr is None:
+                    hdr = EventHeader(fields)
+                self.__cdorb.append((offset, record,
+                                     self.__read_dump_checkpoint(offset,
+                                                                 hdr)))
                 dumps += 1
 
-            if hdr.record >= self.__record:
-                self.__record = hdr.record + 1
+            if record >= self.__record:
+                self.__record = record + 1
                 self.__lastrecord = offset
-                self.__recordcursor = offset + hdr.length
+                self.__recordcursor = offset + length
 
                 if self.__recordcursor == self.__nameDB_off:
                     self.__recordcursor = self.__erb_off
 
-            offset += hdr.length
+            offset += length
 
         self.__tracer.info("Found %d channel dump events", dumps)
         self.__tracer.info("Starting at record %d", self.__record)
@@ -1043,10 +1256,74 @@ class FileLoggerStorageManager(threading.Thread):
             while self.__cdorb[0][0] < self.__recordcursor:
                 self.__cdorb.rotate(-1)
 
+        self.__scan_checkpoints()
+
+    def __read_dump_checkpoint(self, offset, hdr):
+        # Read the checkpoint of the channel dump at 'offset' whose
+        # header has just been read.  Version 1 dumps do not store one,
+        # so the latest timestamp among their samples is used instead.
+        if self.__format != FORMAT_PICKLE:
+            return decode_timestamp(
+                self._read_event_body(offset, hdr, TIMESTAMP.size), 0)
+
+        data = self._read_event_body(offset, hdr)
+        checkpoint = 0
+        offset = 0
+        while offset < len(data):
+            timestamp, offset = decode_sample(data, offset + OFFSET.size,
+                                              FORMAT_PICKLE)[1::2]
+            checkpoint = max(checkpoint, timestamp)
+        return checkpoint
+
+    def __scan_checkpoints(self):
+        # Make the checkpoints non-decreasing in record order (version
+        # 1 dumps only know about their own samples) and recover the
+        # latest timestamp written and the channel chain heads,
+        # including the events logged after the last channel dump.
+        checkpoint = 0
+        fixed = {}
+        for cdo in sorted(self.__cdorb, key=operator.itemgetter(1)):
+            checkpoint = max(checkpoint, cdo[2])
+            fixed[cdo[1]] = checkpoint
+        for i in xrange(len(self.__cdorb)):
+            offset, record, _ = self.__cdorb[i]
+            self.__cdorb[i] = (offset, record, fixed[record])
+
+        self.__chains.clear()
+        if self.__cdorb:
+            cur_off = sorted(self.__cdorb, key=operator.itemgetter(1))[-1][0]
+            if self.__chained:
+                self.__read_dump_chains(cur_off)
+            for cur_off, hdr, data in self.__walk_forward(cur_off):
+                checkpoint = max(checkpoint, self.__event_time(data))
+                if self.__chained:
+                    self.__chains[OFFSET.unpack_from(data, 0)[0]] = cur_off
+
+        self.__checkpoint = checkpoint
+
+    def __read_dump_chains(self, cur_off):
+        # Load the channel chain heads stored in the channel dump at
+        # the offset 'cur_off'.
+        hdr = self._read_event_hdr(cur_off)
+        data = self._read_event_body(cur_off, hdr)
+        offset = TIMESTAMP.size
+        while offset < len(data):
+            channel_off, head = CHAIN.unpack_from(data, offset)
+            if head:
+                self.__chains[channel_off] = head
+            offset = decode_sample(data, offset + self.__sample_off,
+                                   self.__format)[3]
+
+    def __event_time(self, data):
+        # Return the sample timestamp of single event body 'data'.
+        return sample_timestamp(data, self.__sample_off, self.__format)
+
     def _scan_names(self):
         # Build name database in memory
         offset = self.__nameDB_off
         names = 0
+        self.__names.clear()
+        self.__names_by_offset.clear()
 
         while True:
             self._logfile.seek(offset)
@@ -1061,6 +1338,7 @@ class FileLoggerStorageManager(threading.Thread):
                 break
 
             self.__names[name] = offset
+            self.__names_by_offset[offset] = name
 
             names += 1
             offset += length + 1
@@ -1089,6 +1367,13 @@ class FileLoggerStorageManager(threading.Thread):
             ret = e
         op.do_completion_callback(ret)
 
+    def do_retrieve_history(self, op):
+        try:
+            ret = self._history(op.channel_name, op.start, op.end)
+        except Exception, e:
+            ret = e
+        op.do_completion_callback(ret)
+
     def do_flush_operation(self, op):
         try:
             self.__tracer.warning("Writing %d items at time %.2f",
@@ -1109,24 +1394,50 @@ class FileLoggerStorageManager(threading.Thread):
 
         self._logfile.seek(offset)
 
-    def _retrieve_erb_event(self, event_header):
+    def _read_event_hdr(self, offset):
+        '''
+        Read the header of the event at the ERB offset 'offset'.
+
+        With a mapped ERB the header is parsed in place, otherwise the
+        file is positioned at the event body afterwards.
+        '''
+        if self.__map is None:
+            self._erb_seek(offset)
+            return read_event_hdr(self._logfile)
+
+        if offset >= self.__nameDB_off or offset < self.__erb_off:
+            raise RuntimeError(hex(offset))
+        return unpack_event_hdr(self.__map, offset)
+
+    def _read_event_body(self, offset, hdr, length=None):
         '''
-        Retrieves the event from the current ERB location as described by
+        Return the body of the event at 'offset' whose header 'hdr' was
+        just read by _read_event_hdr(), or only its first 'length' bytes.
+
+        With a mapped ERB this is a buffer on the map and not a copy.
+        '''
+        if length is None:
+            length = hdr.length - EVENT_HEADER_SIZE
+        if self.__map is None:
+            return self._logfile.read(length)
+        return buffer(self.__map, offset + EVENT_HEADER_SIZE, length)
+
+    def _retrieve_erb_event(self, event_header, offset):
+        '''
+        Retrieves the event at the ERB offset 'offset' as described by
         the given event header 'event_header'.
 
         This method is most useful when used after a call to the helper
-        method read_event_hdr()
+        method _read_event_hdr()
         '''
         if event_header.type == PAD_EVENT:
             raise NoEvent("pad event")
         ret_event = None
-        sio = StringIO.StringIO(self._logfile.read(event_header.length))
+        data = self._read_event_body(offset, event_header)
         if event_header.type in SINGLE_EVENT_MAP.values():
-            fmt_size = struct.calcsize(">I")
-            channel_off = struct.unpack(">I", sio.read(fmt_size))[0]
-            fmt_size = struct.calcsize(SAMPLE_FMT)
-            unit_off, timestamp = struct.unpack(SAMPLE_FMT, sio.read(fmt_size))
-            value = pickle.load(sio)
+            channel_off = OFFSET.unpack_from(data, 0)[0]
+            unit_off, timestamp, value, offset = decode_sample(
+                data, self.__sample_off, self.__format)
             channel_name = self._get_name_by_offset(channel_off)
             unit_name = self._get_name_by_offset(unit_off)
             sample = Sample(timestamp=timestamp, value=value, unit=unit_name)
@@ -1146,13 +1457,13 @@ class FileLoggerStorageManager(threading.Thread):
 
         elif event_header.type == CHANNEL_DUMP:
             channel_dict = {}
-            while sio.tell() < (event_header.length - EVENT_HEADER_SIZE - 1):
-                fmt_size = struct.calcsize(">I")
-                channel_off = struct.unpack(">I", sio.read(fmt_size))[0]
-                fmt_size = struct.calcsize(SAMPLE_FMT)
-                unit_off, timestamp = struct.unpack(SAMPLE_FMT,
-                                                    sio.read(fmt_size))
-                value = pickle.load(sio)
+            offset = 0
+            if self.__format != FORMAT_PICKLE:
+                offset = TIMESTAMP.size # skip the checkpoint
+            while offset < len(data):
+                channel_off = OFFSET.unpack_from(data, offset)[0]
+                unit_off, timestamp, value, offset = decode_sample(
+                    data, offset + self.__sample_off, self.__format)
                 channel_name = self._get_name_by_offset(channel_off)
                 unit_name = self._get_name_by_offset(unit_off)
                 channel_dict[channel_name] = Sample(
@@ -1164,7 +1475,6 @@ class FileLoggerStorageManager(threading.Thread):
         else:
             raise ValueError("unknown event type: 0x02x" % event_header.type)
 
-        sio.close()
         return ret_event
 
     def __closest_cdo_to(self, record_number, forward_retry):
@@ -1249,14 +1559,17 @@ class FileLoggerStorageManager(threading.Thread):
                 return True
         return False
 
-    def __seek_earliest_rec(self):
-        """Find the eariest record number in the logging storage system."""
-        cur_off, record_index = self.__cdorb[0]
+    def __seek_earliest(self):
+        """
+        Find the offset and number of the earliest record in the
+        logging storage system.
+        """
+        cur_off, record_index = self.__cdorb[0][:2]
+        earliest_off = cur_off
         prev_hdr = None
         while 1:
-            self._erb_seek(cur_off)
             try:
-                hdr = read_event_hdr(self._logfile)
+                hdr = self._read_event_hdr(cur_off)
             except Exception:
                 # If the log is in good shape, we just ran off the beginning
                 break
@@ -1265,10 +1578,138 @@ class FileLoggerStorageManager(threading.Thread):
             if self.__finished_chk_reverse(prev_hdr, hdr, cur_off):
                 break
             record_index = hdr.record
+            earliest_off = cur_off
             prev_hdr = hdr
             cur_off = self.__prev_offset(cur_off, hdr)
 
-        return record_index
+        return earliest_off, record_index
+
+    def __seek_earliest_rec(self):
+        """Find the eariest record number in the logging storage system."""
+        return self.__seek_earliest()[1]
+
+    def __walk_forward(self, cur_off):
+        # Yield (offset, header, body) for the single events on disk
+        # from the offset 'cur_off' on.  Pad events are stepped over so
+        # that the walk follows the ERB around its end; it stops at the
+        # first event older than the one before it.
+        prev_hdr = None
+        wrapped = False
+        while 1:
+            try:
+                hdr = self._read_event_hdr(cur_off)
+            except (NoEvent, BadEvent):
+                return
+            if hdr.type != PAD_EVENT:
+                if prev_hdr and prev_hdr.record >= hdr.record:
+                    return
+                if hdr.type in SINGLE_EVENT_TYPES:
+                    yield cur_off, hdr, self._read_event_body(cur_off, hdr)
+                prev_hdr = hdr
+            elif cur_off + hdr.length < self.__nameDB_off or wrapped:
+                # A pad before the end of the ERB ends the log
+                return
+            else:
+                wrapped = True
+            cur_off = self.__next_offset(cur_off, hdr)
+
+    def __seek_time(self, timestamp):
+        """
+        Find the number of the first record in the logging storage
+        system with a sample timestamp at or after 'timestamp'.
+        """
+        for cur_off, hdr, data in self.__walk_forward(
+                self.__time_start_offset(timestamp)):
+            if self.__event_time(data) >= timestamp:
+                return hdr.record
+
+        # Not on disk yet?
+        for record, op in self.__file_write_q:
+            if (type(op) in SINGLE_EVENT_MAP and
+                  op.sample.timestamp >= timestamp):
+                return record
+
+        raise NoEvent("no record at or after time %s" % timestamp)
+
+    def __time_start_offset(self, timestamp):
+        # Nothing logged ahead of a channel dump whose checkpoint is
+        # before 'timestamp' can be at or after it, so start at the last
+        # such dump:
+        sorted_cdorb = sorted(self.__cdorb, key=operator.itemgetter(1))
+        checkpoints = [ cdo[2] for cdo in sorted_cdorb ]
+        i = bisect.bisect_left(checkpoints, timestamp)
+        if i > 0:
+            return sorted_cdorb[i - 1][0]
+        return self.__seek_earliest()[0]
+
+    def _history(self, channel_name, start=None, end=None):
+        '''
+        Return the samples logged for 'channel_name' with timestamps
+        from 'start' up to but not including 'end' in the order they
+        were logged.
+
+        In version 3 volumes the chain of the channel is followed back
+        from its latest event, so the cost is proportional to the
+        samples of that channel.  Older volumes are walked forward
+        from the channel dump preceding 'start'.
+        '''
+        samples = []
+        name_off = self.__names.get(channel_name)
+
+        def wanted(timestamp):
+            return ((start is None or timestamp >= start) and
+                    (end is None or timestamp < end))
+
+        if name_off is not None and self.__chained:
+            cur_off = self.__chains.get(name_off, 0)
+            record = None
+            while self.__erb_off <= cur_off < self.__nameDB_off:
+                try:
+                    hdr = self._read_event_hdr(cur_off)
+                except (NoEvent, BadEvent):
+                    break
+                if (hdr.type not in SINGLE_EVENT_TYPES or
+                      (record is not None and hdr.record >= record)):
+                    break # overwritten
+                data = self._read_event_body(cur_off, hdr)
+                channel_off, prev_off = CHAIN.unpack_from(data, 0)
+                if channel_off != name_off:
+                    break # overwritten
+                unit_off, timestamp, value, _ = decode_sample(
+                    data, self.__sample_off, self.__format)
+                if start is not None and timestamp < start:
+                    break
+                if wanted(timestamp):
+                    samples.append(Sample(timestamp, value,
+                                          self._get_name_by_offset(unit_off)))
+                record = hdr.record
+                cur_off = prev_off
+            samples.reverse()
+
+        elif name_off is not None:
+            if start is None:
+                cur_off = self.__seek_earliest()[0]
+            else:
+                cur_off = self.__time_start_offset(start)
+            for cur_off, hdr, data in self.__walk_forward(cur_off):
+                if OFFSET.unpack_from(data, 0)[0] != name_off:
+                    continue
+                unit_off, timestamp, value, _ = decode_sample(
+                    data, self.__sample_off, self.__format)
+                if end is not None and timestamp >= end:
+                    break
+                if wanted(timestamp):
+                    samples.append(Sample(timestamp, value,
+                                          self._get_name_by_offset(unit_off)))
+
+        # Include what has not been written yet:
+        for record, op in self.__file_write_q:
+            if (type(op) in SINGLE_EVENT_MAP and
+                  op.channel_name == channel_name and
+                  wanted(op.sample.timestamp)):
+                samples.append(op.sample)
+
+        return samples
 
     def __seek_latest_rec(self):
         """Find the latest record number in the logging storage system."""
@@ -1278,12 +1719,11 @@ class FileLoggerStorageManager(threading.Thread):
             return self.__file_write_q[-1][0]
 
         # Otherwise, we must find the record number on disk:
-        cur_off, record_index = self.__cdorb[-1]
+        cur_off, record_index = self.__cdorb[-1][:2]
         prev_hdr = None
         while 1:
             print 'inside seek loop'
-            self._erb_seek(cur_off)
-            hdr = read_event_hdr(self._logfile)
+            hdr = self._read_event_hdr(cur_off)
             if self.__finished_chk_forward(prev_hdr, hdr, cur_off):
                 break
             record_index = hdr.record
@@ -1310,9 +1750,8 @@ class FileLoggerStorageManager(threading.Thread):
         cur_off = self.__ret_off
         i = 0
         while 1:
-            self._erb_seek(cur_off)
             try:
-                hdr = read_event_hdr(self._logfile)
+                hdr = self._read_event_hdr(cur_off)
             except BadEvent:
                 raise NoEvent("end of log on disk")
             if finished_chk(prev_hdr, hdr, cur_off):
@@ -1323,7 +1762,7 @@ class FileLoggerStorageManager(threading.Thread):
                 cur_off = next_offset(cur_off, hdr)
                 continue
 
-            event = self._retrieve_erb_event(hdr)
+            event = self._retrieve_erb_event(hdr, cur_off)
             if i > 0 or apply_first:
                 # only apply the first record if we have changed
                 # directions since the last operation:
@@ -1365,6 +1804,8 @@ class FileLoggerStorageManager(threading.Thread):
             record_index = self.__seek_latest_rec() + offset
         elif whence == LOG_SEEK_REC:
             record_index = record_index + offset
+        elif whence == LOG_SEEK_TIME:
+            record_index = self.__seek_time(record_index) + offset
         else:
             raise ValueError("unknown whence: %s" % whence)
 
@@ -1384,13 +1825,12 @@ class FileLoggerStorageManager(threading.Thread):
 
         # Step 3: if we have a cdorb entry, seek to and apply it:
         if cdo is not None:
-            self._erb_seek(cdo[0])
             try:
-                hdr = read_event_hdr(self._logfile)
+                hdr = self._read_event_hdr(cdo[0])
             except:
                 raise Exception("unable to seek to channel dump index offset")
             try:
-                event = self._retrieve_erb_event(hdr)
+                event = self._retrieve_erb_event(hdr, cdo[0])
             except:
                 raise Exception("unable to retrieve initial channel dump event")
             try:
@@ -1398,7 +1838,7 @@ class FileLoggerStorageManager(threading.Thread):
             except Exception, e:
                 raise Exception("unable to apply initial channel dump: %s" %
                                 str(e))
-            self.__ret_off, self.__ret_record = cdo
+            self.__ret_off, self.__ret_record = cdo[:2]
             self.__ret_last_prev = None
 
         # Step 4: Seek and apply events from disk:
@@ -1416,7 +1856,8 @@ class FileLoggerStorageManager(threading.Thread):
         # Step 5: NoEvent? For CUR, REC, & END try memory:
         if isinstance(seek_exc, NoEvent):
             try:
-                if whence in (LOG_SEEK_CUR, LOG_SEEK_REC, LOG_SEEK_END):
+                if whence in (LOG_SEEK_CUR, LOG_SEEK_REC, LOG_SEEK_END,
+                              LOG_SEEK_TIME):
                     self.__write_q_seek(record_index)
                 else:
                     raise seek_exc
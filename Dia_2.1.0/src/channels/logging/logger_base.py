@@ -51,6 +51,17 @@ class LoggerBase(SettingsBase):
     def get_name(self):
         return self.__name
 
+    def log_events(self, logging_events):
+        """\
+            Handle a list of new event notifications, in order.
+
+            Called by the LoggingManager when it dispatches events
+            asynchronously.  Calls log_event() for each event; loggers
+            which can handle a batch at once may override it.
+        """
+        for logging_event in logging_events:
+            self.log_event(logging_event)
+
     ## These functions must be implemented by the logger writer:
     def apply_settings(self):
         """\
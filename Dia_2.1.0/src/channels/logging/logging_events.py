@@ -90,6 +90,25 @@ class LoggingEventNewSample(LoggingEventBase):
     """New data published to a channel"""
     pass
 
+class LoggingEventNewSamples(LoggingEventBase):
+    """
+    New data published to several channels at once
+
+    Generated when a batch of updates ends, see
+    :meth:`~channels.channel_publisher.ChannelPublisher.begin_batch`.
+    The updated channels are in `channels`, `channel` is None.
+
+    """
+    def __init__(self, channels, record=None):
+        self.channels = channels
+        LoggingEventBase.__init__(self, channel=None, record=record)
+
+    def __repr__(self):
+        return "<%s record=%s channels=%s>" % (
+            self.__class__.__name__,
+            repr(self.record),
+            ', '.join([ channel.name() for channel in self.channels ]))
+
 class LoggingEventChannelNew(LoggingEventBase):
     """
     A new channel created in the
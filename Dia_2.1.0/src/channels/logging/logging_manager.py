@@ -27,9 +27,28 @@
 
 # imports
 import sys, traceback
+import threading
+from collections import deque
 
 from common.abstract_service_manager import AbstractServiceManager
-from channels.logging.logging_events import LoggingEventBase
+from channels.channel_publisher import ChannelSnapshot
+from channels.logging.logging_events import LoggingEventBase, \
+    LoggingEventNewSample, LoggingEventNewSamples, LoggingEventChannelNew, \
+    LoggingEventChannelRemove
+
+# constants
+
+# Logger dispatch modes, see LoggingManager:
+DISPATCH_SYNC = 'sync'   # loggers are called in the producer's thread
+DISPATCH_ASYNC = 'async' # each logger is called from its own thread
+
+DISPATCH_QUEUE_SIZE = 1024
+DISPATCH_BATCH_SIZE = 64
+DISPATCH_STOP_TIMEOUT = 10.0
+
+DEFAULTS = {'dispatch': DISPATCH_SYNC,
+            'dispatch_queue_size': DISPATCH_QUEUE_SIZE,
+            'dispatch_batch_size': DISPATCH_BATCH_SIZE}
 
 # classes
 class LoggingManager(AbstractServiceManager):
@@ -49,6 +68,22 @@ class LoggingManager(AbstractServiceManager):
     :class:`logger <channels.logging.logger_base.LoggerBase>`
     instances.
 
+    By default loggers are called synchronously, in the thread of the
+    driver producing the sample, so one slow logger delays the driver
+    and every other logger.  With `dispatch` set to ``async`` in an
+    optional ``logging:`` block at the top level of the settings file::
+
+        logging:
+            dispatch: async
+            dispatch_queue_size: 1024
+            dispatch_batch_size: 64
+
+    each logger is instead given a ring buffer of `dispatch_queue_size`
+    events and a thread of its own, which delivers the queued events in
+    lists of up to `dispatch_batch_size` through the logger's
+    `log_events` method.  When a ring buffer is full its oldest event
+    is dropped and counted, see :meth:`dispatch_stats`.
+
     """
 
     def __init__(self, core_services):
@@ -58,9 +93,116 @@ class LoggingManager(AbstractServiceManager):
         from core.tracing import get_tracer
         self.__tracer = get_tracer('LoggingManager')
 
+        # The loggers to dispatch to, as a tuple of logger instances
+        # or _LoggerQueues.  Rebuilt under self.__lock when instances
+        # change, so that dispatch need not lock or copy:
+        self.__lock = threading.RLock()
+        self.__targets = None
+        self.__queues = {} # logger name -> _LoggerQueue
+        self.__stopped = set() # names of loggers stopped by instance_stop
+
+        settings = _get_logging_dict(core_services)
+        try:
+            self.__dispatch = settings['dispatch']
+            if self.__dispatch not in (DISPATCH_SYNC, DISPATCH_ASYNC):
+                raise ValueError("dispatch must be '%s' or '%s'" %
+                                 (DISPATCH_SYNC, DISPATCH_ASYNC))
+            self.__queue_size = int(settings['dispatch_queue_size'])
+            self.__batch_size = int(settings['dispatch_batch_size'])
+            if self.__queue_size <= 0 or self.__batch_size <= 0:
+                raise ValueError("dispatch sizes must be positive")
+        except (TypeError, ValueError), e:
+            self.__tracer.error("%s, using defaults.", str(e))
+            self.__dispatch = DEFAULTS['dispatch']
+            self.__queue_size = DEFAULTS['dispatch_queue_size']
+            self.__batch_size = DEFAULTS['dispatch_batch_size']
+
         # Initialize our base class:
         AbstractServiceManager.__init__(self, core_services, ('loggers',))
 
+    def instance_new(self, classname, instancename):
+        ret = AbstractServiceManager.instance_new(self, classname,
+                                                  instancename)
+        self.__invalidate()
+        return ret
+
+    def instance_start(self, instancename):
+        self.__lock.acquire()
+        try:
+            self.__stopped.discard(instancename)
+            self.__targets = None
+        finally:
+            self.__lock.release()
+        return AbstractServiceManager.instance_start(self, instancename)
+
+    def instance_stop(self, instancename):
+        # Deliver what is queued for the logger before stopping it; it
+        # receives no further events until started again.
+        self.__lock.acquire()
+        try:
+            self.__stopped.add(instancename)
+            self.__targets = None
+            queue = self.__queues.pop(instancename, None)
+        finally:
+            self.__lock.release()
+        if queue is not None:
+            queue.stop(DISPATCH_STOP_TIMEOUT)
+
+        return AbstractServiceManager.instance_stop(self, instancename)
+
+    def instance_remove(self, instancename):
+        ret = AbstractServiceManager.instance_remove(self, instancename)
+        self.__lock.acquire()
+        try:
+            self.__stopped.discard(instancename)
+        finally:
+            self.__lock.release()
+        self.__invalidate()
+        return ret
+
+    def __invalidate(self):
+        self.__lock.acquire()
+        try:
+            self.__targets = None
+        finally:
+            self.__lock.release()
+
+    def __get_targets(self):
+        self.__lock.acquire()
+        try:
+            if self.__targets is not None:
+                return self.__targets
+
+            names = AbstractServiceManager.instance_list(self)
+            targets = []
+            for name in names:
+                logger_instance = AbstractServiceManager.instance_get(self,
+                                                                      name)
+                if self.__dispatch == DISPATCH_SYNC:
+                    targets.append(logger_instance)
+                    continue
+                if name in self.__stopped:
+                    continue
+                queue = self.__queues.get(name)
+                if queue is None or queue.logger is not logger_instance:
+                    if queue is not None:
+                        queue.stop()
+                    queue = _LoggerQueue(name, logger_instance,
+                                         self.__queue_size, self.__batch_size,
+                                         self.__tracer)
+                    self.__queues[name] = queue
+                targets.append(queue)
+
+            # Retire the queues of loggers no longer dispatched to:
+            for name in self.__queues.keys():
+                if self.__queues[name] not in targets:
+                    self.__queues.pop(name).stop()
+
+            self.__targets = tuple(targets)
+            return self.__targets
+        finally:
+            self.__lock.release()
+
     def dispatch_logging_event(self, logging_event):
         """
         Send `logging_event` to all configured loggers.
@@ -81,13 +223,186 @@ class LoggingManager(AbstractServiceManager):
         if not isinstance(logging_event, LoggingEventBase):
             raise TypeError, "LoggingManager: logging_event TypeError"
 
-        for name in AbstractServiceManager.instance_list(self):
-            logger_instance = AbstractServiceManager.instance_get(self, name)
+        targets = self.__targets
+        if targets is None:
+            targets = self.__get_targets()
+
+        snapshot = None
+        for target in targets:
+            if isinstance(target, _LoggerQueue):
+                # Queued events must carry the samples as they are now:
+                if snapshot is None:
+                    snapshot = _snapshot_event(logging_event)
+                target.put(snapshot)
+                continue
             try:
-                logger_instance.log_event(logging_event)
+                target.log_event(logging_event)
             except Exception, e:
                 self.__tracer.error("exception during log_event dispatch: %s",
                                     str(e))
                 self.__tracer.debug(traceback.format_exc())
 
+    def dispatch_stats(self):
+        """
+        Returns a dictionary describing the queue of each logger when
+        dispatching asynchronously.
+
+        The dictionary is keyed by logger instance name.  Each value is
+        a dictionary with the current `queue_depth`, the largest depth
+        seen `queue_max`, the number of events `delivered` in
+        `batches` calls to `log_events`, and the number of events
+        `dropped` because the queue was full.
+
+        """
+        self.__lock.acquire()
+        try:
+            queues = self.__queues.items()
+        finally:
+            self.__lock.release()
+
+        return dict([ (name, queue.stats()) for name, queue in queues ])
+
 # internal functions & classes
+
+def _get_logging_dict(core_services):
+    # Get the 'logging:' block from the settings, merged over the
+    # defaults.
+    settings = DEFAULTS.copy()
+    ret = core_services._settings_global_pending_registry.get('logging')
+    if isinstance(ret, dict):
+        settings.update(ret)
+    elif ret:
+        print ("LoggingManager: 'logging:' entry is badly formed, " +
+               "using defaults.")
+
+    return settings
+
+def _snapshot_event(logging_event):
+    # Return a copy of logging_event whose channels return the samples
+    # they hold now.
+    if isinstance(logging_event, LoggingEventNewSamples):
+        return LoggingEventNewSamples(
+            [ ChannelSnapshot(channel, channel.producer_get())
+              for channel in logging_event.channels ],
+            logging_event.record)
+    if isinstance(logging_event, (LoggingEventNewSample,
+                                  LoggingEventChannelNew,
+                                  LoggingEventChannelRemove)):
+        channel = logging_event.channel
+        return logging_event.__class__(
+            ChannelSnapshot(channel, channel.producer_get()),
+            logging_event.record)
+    return logging_event
+
+
+class _LoggerQueue(object):
+    # Queues logging events for one logger in a bounded ring buffer
+    # and delivers them, in batches, from a thread of its own.
+
+    def __init__(self, name, logger, queue_size, batch_size, tracer):
+        self.logger = logger
+        self.__queue_size = queue_size
+        self.__batch_size = batch_size
+        self.__tracer = tracer
+
+        self.__deliver = getattr(logger, 'log_events', None)
+        if self.__deliver is None:
+            self.__deliver = self.__deliver_each
+
+        self.__cond = threading.Condition(threading.Lock())
+        self.__queue = deque()
+        self.__stopping = False
+        self.__overflowing = False
+
+        self.__queue_max = 0
+        self.__delivered = 0
+        self.__batches = 0
+        self.__dropped = 0
+
+        self.__thread = threading.Thread(name="LoggingManager_%s" % name,
+                                         target=self.__run)
+        self.__thread.setDaemon(True)
+        self.__thread.start()
+
+    def put(self, logging_event):
+        # Runs in the producer's thread.
+        self.__cond.acquire()
+        try:
+            if self.__stopping:
+                return
+            queue = self.__queue
+            overflow = len(queue) >= self.__queue_size
+            if overflow:
+                queue.popleft()
+                self.__dropped += 1
+                if self.__overflowing:
+                    overflow = False # already reported
+                self.__overflowing = True
+            queue.append(logging_event)
+            if len(queue) > self.__queue_max:
+                self.__queue_max = len(queue)
+            if len(queue) == 1:
+                self.__cond.notify()
+        finally:
+            self.__cond.release()
+
+        if overflow:
+            self.__tracer.warning("queue for %s full, dropping oldest "
+                                  "events", self.__thread.getName())
+
+    def stop(self, timeout=None):
+        # Stop the thread once the queued events have been delivered.
+        self.__cond.acquire()
+        try:
+            self.__stopping = True
+            self.__cond.notify()
+        finally:
+            self.__cond.release()
+        if timeout is not None and \
+               self.__thread is not threading.currentThread():
+            self.__thread.join(timeout)
+
+    def stats(self):
+        self.__cond.acquire()
+        try:
+            return {
+                'queue_depth': len(self.__queue),
+                'queue_max': self.__queue_max,
+                'delivered': self.__delivered,
+                'batches': self.__batches,
+                'dropped': self.__dropped,
+            }
+        finally:
+            self.__cond.release()
+
+    def __deliver_each(self, logging_events):
+        for logging_event in logging_events:
+            self.logger.log_event(logging_event)
+
+    def __run(self):
+        queue = self.__queue
+        while True:
+            self.__cond.acquire()
+            try:
+                while not queue and not self.__stopping:
+                    self.__cond.wait()
+                if not queue:
+                    return
+                batch = [ queue.popleft() for i in
+                          xrange(min(len(queue), self.__batch_size)) ]
+                if not queue:
+                    self.__overflowing = False
+            finally:
+                self.__cond.release()
+
+            try:
+                self.__deliver(batch)
+            except Exception, e:
+                self.__tracer.error("exception during log_events dispatch: "
+                                    "%s", str(e))
+                self.__tracer.debug(traceback.format_exc())
+
+            self.__cond.acquire()
+            self.__delivered += len(batch)
+            self.__batches += 1
+            self.__cond.release()
@@ -38,7 +38,8 @@ from settings.settings_base import SettingsBase
 
 from channels.logging.logger_base import LoggerBase
 from channels.logging.logging_events import \
-    LoggingEventNewSample, LoggingEventChannelNew, LoggingEventChannelRemove
+    LoggingEventNewSample, LoggingEventNewSamples, LoggingEventChannelNew, \
+    LoggingEventChannelRemove
 from channels.logging.simple_logger.simple_logger_channel_dbi import \
     SimpleLoggerChannelDBI
 
@@ -71,6 +72,9 @@ class SimpleLogger(LoggerBase):
         if isinstance(logging_event, LoggingEventNewSample):
             self.__tracer.info("new sample %s)",
                 repr(logging_event.channel.get()))
+        elif isinstance(logging_event, LoggingEventNewSamples):
+            for channel in logging_event.channels:
+                self.__tracer.info("new sample %s)", repr(channel.get()))
         elif isinstance(logging_event, LoggingEventChannelNew):
             self.__tracer.info("new channel '%s'",
                 logging_event.channel.name())
@@ -0,0 +1,174 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, Digi International (Digi). All Rights Reserved.       #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice, and the following   #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+
+"""
+Deadband and rate-limit filtering of channel samples.
+
+A :class:`SampleFilter` decides whether a new
+:class:`~samples.sample.Sample` produced by a driver is different
+enough from the last published sample to be worth publishing.
+Samples which are filtered out never reach the
+:class:`~channels.channel_publisher.ChannelPublisher`, the loggers or
+any subscriber, and the channel keeps its previous value.
+
+Filters are attached to a
+:class:`~channels.channel_source_device_property.ChannelSourceDeviceProperty`
+either in the driver's property definition::
+
+    ChannelSourceDeviceProperty(name="temperature", type=float,
+        initial=Sample(timestamp=0, value=0.0, unit="F"),
+        perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP,
+        sample_filter=SampleFilter(deadband=0.5, max_silence=300))
+
+or from the settings of any device with the `sample_filters` setting,
+keyed by property name, where ``*`` applies to every property of the
+device::
+
+    settings:
+        sample_filters:
+            temperature:
+                deadband: 0.5
+                max_silence: 300
+            "*":
+                min_interval: 5
+
+"""
+
+# imports
+import digitime
+
+# constants
+FILTER_SETTINGS = ('deadband', 'deadband_percent', 'min_interval',
+                   'max_silence')
+
+# exception classes
+
+# interface functions
+
+def sample_filter_from_settings(settings):
+    """Create a :class:`SampleFilter` from a settings dictionary.
+
+    Raises ValueError for unknown keys.
+    """
+    for key in settings:
+        if key not in FILTER_SETTINGS:
+            raise ValueError("unknown sample filter setting '%s'" % key)
+
+    kwargs = {}
+    for key in settings:
+        kwargs[key] = float(settings[key])
+    return SampleFilter(**kwargs)
+
+# classes
+
+class SampleFilter(object):
+    """
+    Suppresses samples which do not carry new information.
+
+    Parameters, all optional and disabled when 0:
+
+    * `deadband` - publish only when the value moved by at least this
+      much since the last published sample
+    * `deadband_percent` - as `deadband`, as a percentage of the last
+      published value
+    * `min_interval` - publish at most once every `min_interval`
+      seconds
+    * `max_silence` - always publish if nothing was published for
+      `max_silence` seconds, as a heartbeat
+
+    The deadbands apply to int, long and float values.  For other
+    types, a configured deadband suppresses samples equal to the last
+    published one.  A change of unit is always published.
+
+    The number of samples published and suppressed are available as
+    `passed` and `suppressed`.
+    """
+
+    __slots__ = ['deadband', 'deadband_percent', 'min_interval',
+                 'max_silence', 'passed', 'suppressed', '_last_time']
+
+    def __init__(self, deadband=0, deadband_percent=0, min_interval=0,
+                 max_silence=0):
+        self.deadband = deadband
+        self.deadband_percent = deadband_percent
+        self.min_interval = min_interval
+        self.max_silence = max_silence
+
+        self.passed = 0
+        self.suppressed = 0
+        self._last_time = None
+
+    def __repr__(self):
+        return ('<SampleFilter deadband=%s deadband_percent=%s ' +
+                'min_interval=%s max_silence=%s>') % (self.deadband,
+                    self.deadband_percent, self.min_interval,
+                    self.max_silence)
+
+    def accept(self, last, sample):
+        """Return True if `sample` should be published.
+
+        `last` is the sample currently held by the channel.
+        """
+        now = digitime.real_clock()
+        if self._last_time is None or self.__changed(last, sample, now):
+            self._last_time = now
+            self.passed += 1
+            return True
+
+        self.suppressed += 1
+        return False
+
+    def __changed(self, last, sample, now):
+        elapsed = now - self._last_time
+        if self.max_silence and elapsed >= self.max_silence:
+            return True
+        if self.min_interval and elapsed < self.min_interval:
+            return False
+        if not (self.deadband or self.deadband_percent):
+            return True
+        if sample.unit != last.unit:
+            return True
+
+        new, old = sample.value, last.value
+        if not (_is_numeric(new) and _is_numeric(old)):
+            return new != old
+
+        delta = abs(new - old)
+        if self.deadband and delta < self.deadband:
+            return False
+        if (self.deadband_percent and
+            delta < abs(old) * self.deadband_percent / 100.0):
+            return False
+        return delta != 0
+
+# internal functions & classes
+
+def _is_numeric(value):
+    # bool is an int, but a deadband makes no sense for it.
+    return isinstance(value, (int, long, float)) and \
+        not isinstance(value, bool)
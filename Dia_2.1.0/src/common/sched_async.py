@@ -51,30 +51,132 @@ service in a manner similar to the below example::
     sched_handle = self.__core.get_service("scheduler")
     sched_handle.schedule_after(5.0, function_to_call, 'function', 'arguments')
 
+Two queue implementations are available and selected with the
+`backend` parameter:
+
+* ``heap`` - the default :py:class:`digi_sched.scheduler`.  Canceling
+  an event is O(n) in the number of scheduled events.
+* ``lazy`` - :py:class:`digi_sched.lazy_scheduler`.  Canceled events
+  are left in the queue as tombstones and discarded when they expire,
+  making a cancel O(1).  Recommended when many drivers frequently
+  cancel and re-schedule events.
+
+Periodic work should be registered with :meth:`SchedAsync.schedule_every`
+rather than by re-scheduling from within the action itself::
+
+    job = sched_handle.schedule_every(60.0, self.poll, align=True)
+    # ...
+    sched_handle.cancel(job)
+
+Actions which may block (sleeping, waiting on DDO or network I/O)
+should be scheduled with ``blocking=True``.  The timer still expires on
+the scheduler thread, but the action is handed to a small, bounded
+:py:class:`~common.worker_pool.WorkerPool` so that it cannot delay
+other scheduled events::
+
+    sched_handle.schedule_after(1.0, self.write_setpoint, 72,
+                                blocking=True)
+
+If the pool's queue is full, the action runs on the scheduler thread.
+
+To find out which actions delay the scheduler, instrumentation may be
+turned on with :meth:`SchedAsync.instrumentation_enable`.  Lateness and
+run-time histograms and the slowest callables are then available from
+:meth:`SchedAsync.instrumentation_stats`.  When instrumentation is off,
+events are scheduled exactly as before and no measurements are taken.
+
 """
 
 import digi_sched as sched
+import math
+import random
 import threading
-from copy import copy
+import traceback
+from common.worker_pool import WorkerPool, DEFAULT_THREADS, \
+    DEFAULT_QUEUE_SIZE
+from common.sched_stats import SchedStats
 from core.tracing import get_tracer
 
 # exception classes
 class SchedulerBadCallback(Exception):
     """Exception raised when a bad callback is passed to schedule_after"""
 
+class PeriodicJob(object):
+    """
+    Handle returned by :meth:`SchedAsync.schedule_every`.
+
+    Pass it to :meth:`SchedAsync.cancel` to stop the job.  The number
+    of ticks which were skipped because the scheduler fell behind is
+    available as `missed`.
+    """
+
+    __slots__ = ['action', 'args', 'blocking', 'cancelled', 'missed']
+
+    def __init__(self, action, args, blocking=False):
+        self.action = action
+        self.args = args
+        self.blocking = blocking
+        self.cancelled = False
+        self.missed = 0
+
+    def __repr__(self):
+        return '<PeriodicJob %s%s>' % (self.action,
+                                      self.cancelled and ' cancelled' or '')
+
+
+class _PeriodicGroup(object):
+    # All jobs sharing one interval and phase, fired by a single
+    # scheduler event.  Canceled jobs are pruned when the group fires.
+
+    def __init__(self, key, interval, next_time):
+        self.key = key
+        self.interval = interval
+        self.next_time = next_time
+        self.jobs = []
+
+    def advance(self, now):
+        """Move `next_time` to the first tick after `now`.
+
+        Returns the number of ticks which were skipped.
+        """
+        self.next_time += self.interval
+        if self.next_time > now:
+            return 0
+
+        missed = int(math.floor((now - self.next_time) / self.interval)) + 1
+        self.next_time += missed * self.interval
+        return missed
+
+
 class SchedAsync(threading.Thread):
     """
     Creates a new :class:`SchedAsync` instance.
 
     After the instance is created it must be started by calling the
     :meth:`start` function.
+
+    Parameters:
+
+    * `name` - name of the scheduler, used for tracing
+    * `core` - the :py:class:`~core.core_services.CoreServices` object,
+      used to request a shutdown if the scheduler thread dies
+    * `backend` - event queue implementation, see :py:mod:`digi_sched`
+    * `worker_threads` - size of the pool running ``blocking`` actions,
+      0 runs them on the scheduler thread
+    * `worker_queue_size` - maximum number of ``blocking`` actions
+      waiting for a worker thread
+    * `instrument` - if True, start with instrumentation enabled
     """
 
     PRIORITY_HIGH = 16
     PRIORITY_NORMAL = 8
     PRIORITY_LOW = 0
 
-    def __init__(self, name="scheduler", core=None):
+    DEFAULT_BACKEND = 'heap'
+
+    def __init__(self, name="scheduler", core=None, backend=DEFAULT_BACKEND,
+                 worker_threads=DEFAULT_THREADS,
+                 worker_queue_size=DEFAULT_QUEUE_SIZE, instrument=False):
         self.__name = name
         self.__core = core
 
@@ -83,7 +185,21 @@ class SchedAsync(threading.Thread):
         self.__semaphore = threading.Semaphore(0)
         self.__stop_flag = False
 
-        self.__sched = sched.scheduler()
+        if backend not in sched.BACKENDS:
+            raise ValueError("unknown scheduler backend '%s'" % (backend))
+        self.__sched = sched.BACKENDS[backend]()
+
+        self.__periodic_lock = threading.Lock()
+        self.__periodic_groups = {}
+
+        self.__pool = None
+        if worker_threads > 0:
+            self.__pool = WorkerPool(name + "_worker", worker_threads,
+                                     worker_queue_size)
+
+        self.__stats = None
+        if instrument:
+            self.__stats = SchedStats()
 
         threading.Thread.__init__(self)
         threading.Thread.setDaemon(self, True)
@@ -97,10 +213,85 @@ class SchedAsync(threading.Thread):
 
         return event
 
+    def __new_event_abs(self, time, priority, action, args):
+        if self.__stop_flag:
+            return None
+
+        event = self.__sched.enterabs(time, priority, action, args)
+        self.__semaphore.release()
+
+        return event
+
+    def __dispatch_blocking(self, action, args):
+        # Runs on the scheduler thread when a blocking event expires.
+        if self.__pool is not None and self.__pool.submit(action, args):
+            return
+
+        if self.__pool is not None:
+            self.__tracer.debug('worker pool full, running %s on the ' +
+                                'scheduler thread', action)
+        action(*args)
+
+    def __fire_periodic(self, group):
+        self.__periodic_lock.acquire()
+        try:
+            jobs = [ job for job in group.jobs if not job.cancelled ]
+            group.jobs = jobs
+            if not jobs:
+                if self.__periodic_groups.get(group.key) is group:
+                    del self.__periodic_groups[group.key]
+                return
+
+            # Re-arm from the ideal tick time rather than the current
+            # time so the period does not drift.  Ticks which have
+            # already passed are coalesced into this one.
+            tick = group.next_time
+            missed = group.advance(sched.timefunc())
+            if missed:
+                self.__tracer.debug('periodic %.3fs: coalesced %d missed ' +
+                                    'tick(s)', group.interval, missed)
+                for job in jobs:
+                    job.missed += missed
+
+            self.__new_event_abs(group.next_time, self.PRIORITY_NORMAL,
+                                 self.__fire_periodic, (group,))
+        finally:
+            self.__periodic_lock.release()
+
+        stats = self.__stats
+        for job in jobs:
+            if job.cancelled:
+                continue
+            action, args = job.action, job.args
+            if stats is not None:
+                action, args = stats.call, (tick, action, args)
+            try:
+                if job.blocking:
+                    self.__dispatch_blocking(action, args)
+                else:
+                    action(*args)
+            except Exception:
+                self.__tracer.error('Exception calling periodic %s ' +
+                                    'with args: \'%s\'.',
+                                    job.action, job.args)
+                self.__tracer.debug(traceback.format_exc())
+
     def __do_stop(self):
         self.__stop_flag = True
 
-        for event in copy(self.__sched.queue):
+        if self.__pool is not None:
+            self.__pool.stop()
+
+        self.__periodic_lock.acquire()
+        try:
+            for group in self.__periodic_groups.values():
+                for job in group.jobs:
+                    job.cancelled = True
+            self.__periodic_groups.clear()
+        finally:
+            self.__periodic_lock.release()
+
+        for event in self.__sched.pending():
             try:
                 self.__sched.cancel(event)
             except ValueError:
@@ -126,11 +317,16 @@ class SchedAsync(threading.Thread):
         """Cancel a given event given by `event_handle`.
 
         `event_handle` is the return value of an event scheduled by calling
-        :meth:`schedule_after`.
+        :meth:`schedule_after`, or a :class:`PeriodicJob` returned by
+        :meth:`schedule_every`.
 
         Attempting to cancel an event that is not scheduled will emit
         a tracer message and pass. (this is very common)
         """
+        if isinstance(event_handle, PeriodicJob):
+            event_handle.cancelled = True
+            return
+
         try:
             self.__sched.cancel(event_handle)
         except ValueError:
@@ -140,7 +336,7 @@ class SchedAsync(threading.Thread):
                                    'event')
 
 
-    def schedule_after(self, delay, action, *args):
+    def schedule_after(self, delay, action, *args, **kwargs):
         """Schedule an event.
 
         Returns an event handle.
@@ -150,13 +346,135 @@ class SchedAsync(threading.Thread):
 
         Following `action` are optional parameters which will be passed
         to the `action` function when the scheduled event becomes active.
+
+        If the keyword argument `blocking` is True, `action` is run on
+        the scheduler's worker pool rather than the scheduler thread.
         """
+        blocking = kwargs.pop('blocking', False)
+        if kwargs:
+            raise TypeError("unexpected keyword argument(s): %s" %
+                            (', '.join(kwargs.keys())))
+
+        if not callable(action):
+            raise SchedulerBadCallback, "Scheduled action is not callable"
+
+        stats = self.__stats
+        if stats is not None:
+            time = sched.timefunc() + delay
+            action, args = stats.call, (time, action, args)
+            if blocking:
+                action, args = self.__dispatch_blocking, (action, args)
+            return self.__new_event_abs(time, self.PRIORITY_NORMAL,
+                                        action, args)
 
-        if callable(action):
+        if blocking:
             return self.__new_event(delay, self.PRIORITY_NORMAL,
-                                    action, args)
+                                    self.__dispatch_blocking, (action, args))
+        return self.__new_event(delay, self.PRIORITY_NORMAL, action, args)
+
+    def instrumentation_enable(self, enable=True):
+        """Turn lateness and run-time instrumentation on or off.
+
+        Only events scheduled while instrumentation is on are measured.
+        Turning instrumentation off discards the statistics gathered.
+        """
+        if enable:
+            if self.__stats is None:
+                self.__stats = SchedStats()
         else:
+            self.__stats = None
+
+    def instrumentation_stats(self):
+        """Return the :py:class:`~common.sched_stats.SchedStats` object
+        gathering statistics, or None if instrumentation is off.
+        """
+        return self.__stats
+
+    def worker_pool_stats(self):
+        """Return the counters of the worker pool running ``blocking``
+        actions, see :py:meth:`common.worker_pool.WorkerPool.stats`.
+
+        Returns None if the scheduler has no worker pool.
+        """
+        if self.__pool is None:
+            return None
+        return self.__pool.stats()
+
+    def schedule_every(self, interval, action, *args, **kwargs):
+        """Schedule `action` to be called every `interval` seconds.
+
+        Returns a :class:`PeriodicJob` handle which may be passed to
+        :meth:`cancel`.
+
+        Following `action` are optional parameters which will be passed
+        to the `action` function on every tick.  The following keyword
+        arguments are accepted:
+
+        * `align` - if True, ticks fall on multiples of `interval`
+          since the epoch (e.g. on the minute for an `interval` of 60).
+          Otherwise the first tick occurs no later than `interval`
+          seconds from now.
+        * `jitter` - if non-zero, ticks are offset by a random but
+          fixed amount of up to `jitter` seconds.  Use this to spread
+          out jobs which would otherwise all fire at once.
+        * `blocking` - if True, the action is run on the scheduler's
+          worker pool, see :meth:`schedule_after`.
+
+        Ticks are computed from the original schedule, so the period
+        does not drift with the run time of the action.  If the
+        scheduler falls behind, missed ticks are coalesced and the
+        action is only called once.
+
+        Jobs without `jitter` which share an `interval` and `align`
+        setting are fired from a single scheduler event.  The actions
+        run in the order they were registered.  Unless `blocking` is
+        set, actions should not block.
+        """
+        align = kwargs.pop('align', False)
+        jitter = kwargs.pop('jitter', 0.0)
+        blocking = kwargs.pop('blocking', False)
+        if kwargs:
+            raise TypeError("unexpected keyword argument(s): %s" %
+                            (', '.join(kwargs.keys())))
+
+        if not callable(action):
             raise SchedulerBadCallback, "Scheduled action is not callable"
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+
+        now = sched.timefunc()
+        if align:
+            next_time = (math.floor(now / interval) + 1) * interval
+        else:
+            next_time = now + interval
+
+        key = None
+        if jitter:
+            next_time += random.uniform(0, jitter)
+        else:
+            key = (interval, bool(align))
+
+        job = PeriodicJob(action, args, blocking)
+
+        self.__periodic_lock.acquire()
+        try:
+            if self.__stop_flag:
+                return None
+
+            group = self.__periodic_groups.get(key)
+            if group is None:
+                group = _PeriodicGroup(key, interval, next_time)
+                if key is not None:
+                    self.__periodic_groups[key] = group
+                group.jobs.append(job)
+                self.__new_event_abs(next_time, self.PRIORITY_NORMAL,
+                                     self.__fire_periodic, (group,))
+            else:
+                group.jobs.append(job)
+        finally:
+            self.__periodic_lock.release()
+
+        return job
 
         
     def run(self):
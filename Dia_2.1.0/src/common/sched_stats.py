@@ -0,0 +1,201 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+
+"""
+Lateness and run-time instrumentation for the scheduler.
+
+A :class:`SchedStats` object records, for every action it runs, how
+late the action started relative to its scheduled time and how long
+it ran.  Both are kept as histograms with fixed bucket boundaries, and
+per-callable totals are kept so the slowest actions can be identified
+by name.
+
+See :py:meth:`common.sched_async.SchedAsync.instrumentation_enable`.
+
+"""
+
+# imports
+import threading
+import time
+import traceback
+
+from core.tracing import get_tracer
+
+# constants
+
+# Upper bounds, in seconds, of the histogram buckets.  A final bucket
+# collects everything above the last bound.
+BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0)
+
+# exception classes
+
+# interface functions
+
+def callable_name(action):
+    """Return a qualified, human readable name for `action`.
+
+    Bound methods are named ``module.Class.method``, functions
+    ``module.function``.
+    """
+    im_self = getattr(action, 'im_self', None)
+    if im_self is not None:
+        cls = im_self.__class__
+        return "%s.%s.%s" % (cls.__module__, cls.__name__,
+                             action.im_func.__name__)
+
+    name = getattr(action, '__name__', None)
+    if name is None:
+        # callable instance
+        cls = action.__class__
+        return "%s.%s" % (cls.__module__, cls.__name__)
+
+    return "%s.%s" % (getattr(action, '__module__', '?'), name)
+
+def bucket_labels():
+    """Return a label for each histogram bucket, e.g. '<=0.01'."""
+    return [ "<=%g" % b for b in BUCKETS ] + [ ">%g" % BUCKETS[-1] ]
+
+# classes
+
+class SchedStats(object):
+    """
+    Accumulates scheduler lateness and run-time statistics.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__tracer = get_tracer('SchedStats')
+        self.reset()
+
+    def reset(self):
+        """Discard all recorded statistics."""
+        self.__lock.acquire()
+        try:
+            self.__count = 0
+            self.__lateness = [0] * (len(BUCKETS) + 1)
+            self.__runtime = [0] * (len(BUCKETS) + 1)
+            self.__lateness_max = 0.0
+            self.__runtime_max = 0.0
+            # name -> [count, total run time, max run time]
+            self.__callables = {}
+        finally:
+            self.__lock.release()
+
+    def call(self, scheduled, action, args):
+        """Run `action` with `args`, recording its statistics.
+
+        `scheduled` is the time at which the action was due to run.
+        Exceptions raised by `action` are traced under its name, since
+        the caller only sees this method, and re-raised.
+        """
+        start = time.time()
+        try:
+            try:
+                action(*args)
+            except Exception:
+                self.__tracer.error('Exception calling %s with args: ' +
+                                    '\'%s\'.', callable_name(action), args)
+                self.__tracer.debug(traceback.format_exc())
+                raise
+        finally:
+            end = time.time()
+            self.record(action, start - scheduled, end - start)
+
+    def record(self, action, lateness, runtime):
+        """Record one run of `action`."""
+        if lateness < 0.0:
+            lateness = 0.0
+        name = callable_name(action)
+
+        self.__lock.acquire()
+        try:
+            self.__count += 1
+            self.__lateness[_bucket(lateness)] += 1
+            self.__runtime[_bucket(runtime)] += 1
+            if lateness > self.__lateness_max:
+                self.__lateness_max = lateness
+            if runtime > self.__runtime_max:
+                self.__runtime_max = runtime
+
+            entry = self.__callables.get(name)
+            if entry is None:
+                self.__callables[name] = [1, runtime, runtime]
+            else:
+                entry[0] += 1
+                entry[1] += runtime
+                if runtime > entry[2]:
+                    entry[2] = runtime
+        finally:
+            self.__lock.release()
+
+    def summary(self):
+        """Return a dictionary of the recorded statistics.
+
+        * `count` - number of actions recorded
+        * `lateness`, `runtime` - histograms, lists of counts matching
+          :func:`bucket_labels`
+        * `lateness_max`, `runtime_max` - largest values seen, in
+          seconds
+        """
+        self.__lock.acquire()
+        try:
+            return {
+                'count': self.__count,
+                'lateness': list(self.__lateness),
+                'runtime': list(self.__runtime),
+                'lateness_max': self.__lateness_max,
+                'runtime_max': self.__runtime_max,
+            }
+        finally:
+            self.__lock.release()
+
+    def slowest(self, n=10):
+        """Return the `n` callables with the longest single run.
+
+        Returns a list of (name, count, total, max) tuples, slowest
+        first.  Times are in seconds.
+        """
+        self.__lock.acquire()
+        try:
+            entries = [ (name, e[0], e[1], e[2])
+                        for name, e in self.__callables.iteritems() ]
+        finally:
+            self.__lock.release()
+
+        entries.sort(lambda a, b: cmp(b[3], a[3]))
+        return entries[:n]
+
+# internal functions & classes
+
+def _bucket(value):
+    i = 0
+    for bound in BUCKETS:
+        if value <= bound:
+            return i
+        i += 1
+    return i
@@ -0,0 +1,206 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+
+"""
+A small, bounded pool of worker threads.
+
+A :class:`WorkerPool` runs callables submitted to it on a fixed number
+of daemon threads.  Work is queued on a bounded queue; when the queue
+is full :meth:`WorkerPool.submit` returns False and the caller decides
+what to do with the work item.  Threads are only created when the
+first item is submitted, so an unused pool costs nothing.
+
+"""
+
+# imports
+import threading
+import time
+import traceback
+from Queue import Queue, Full
+
+from core.tracing import get_tracer
+
+# constants
+DEFAULT_THREADS = 2
+DEFAULT_QUEUE_SIZE = 64
+
+# exception classes
+
+# interface functions
+
+# classes
+
+class WorkerPool(object):
+    """
+    Creates a new :class:`WorkerPool` instance.
+
+    Parameters:
+
+    * `name` - name used for the worker threads and tracer
+    * `threads` - number of worker threads
+    * `queue_size` - maximum number of items waiting for a worker
+
+    """
+
+    def __init__(self, name, threads=DEFAULT_THREADS,
+                 queue_size=DEFAULT_QUEUE_SIZE):
+        self.__name = name
+        self.__threads = threads
+        self.__tracer = get_tracer(name)
+
+        self.__queue = Queue(queue_size)
+        self.__lock = threading.Lock()
+        self.__workers = []
+        self.__stopped = False
+
+        self.__submitted = 0
+        self.__completed = 0
+        self.__overflow = 0
+        self.__queue_max = 0
+        self.__wait_last = 0.0
+        self.__wait_max = 0.0
+
+    def __start_workers(self):
+        # Must be called with self.__lock held.
+        for i in xrange(self.__threads):
+            worker = threading.Thread(name="%s_%d" % (self.__name, i),
+                                      target=self.__run)
+            worker.setDaemon(True)
+            worker.start()
+            self.__workers.append(worker)
+
+    def submit(self, action, args=()):
+        """Queue `action` to be called with `args` on a worker thread.
+
+        Returns False, and counts an overflow, if the pool is stopped
+        or its queue is full.
+        """
+        self.__lock.acquire()
+        try:
+            if self.__stopped:
+                return False
+            if not self.__workers:
+                self.__start_workers()
+        finally:
+            self.__lock.release()
+
+        try:
+            self.__queue.put_nowait((time.time(), action, args))
+        except Full:
+            self.__lock.acquire()
+            self.__overflow += 1
+            self.__lock.release()
+            return False
+
+        depth = self.__queue.qsize()
+        self.__lock.acquire()
+        self.__submitted += 1
+        if depth > self.__queue_max:
+            self.__queue_max = depth
+        self.__lock.release()
+
+        return True
+
+    def stop(self):
+        """Stop all worker threads once the queued work has run.
+
+        Returns without waiting for the workers.
+        """
+        self.__lock.acquire()
+        try:
+            self.__stopped = True
+            workers = self.__workers
+        finally:
+            self.__lock.release()
+
+        if workers:
+            self.__wake_one()
+
+    def __wake_one(self):
+        # Wake a worker blocked on the empty queue so it sees the pool
+        # is stopped.  Each worker passes the wake-up on as it exits; a
+        # full queue needs none, the workers check after each item.
+        try:
+            self.__queue.put_nowait(None)
+        except Full:
+            pass
+
+    def stats(self):
+        """Return a dictionary of counters describing the pool.
+
+        * `threads` - number of worker threads
+        * `queue_depth` - items currently waiting for a worker
+        * `queue_max` - largest `queue_depth` seen
+        * `submitted`, `completed` - items accepted and finished
+        * `overflow` - items rejected because the queue was full
+        * `wait_last`, `wait_max` - seconds the last item, and the
+          slowest item, waited in the queue before starting
+        """
+        return {
+            'threads': self.__threads,
+            'queue_depth': self.__queue.qsize(),
+            'queue_max': self.__queue_max,
+            'submitted': self.__submitted,
+            'completed': self.__completed,
+            'overflow': self.__overflow,
+            'wait_last': self.__wait_last,
+            'wait_max': self.__wait_max,
+        }
+
+    def __run(self):
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                self.__wake_one()
+                break
+
+            queued, action, args = item
+            wait = time.time() - queued
+            self.__lock.acquire()
+            self.__wait_last = wait
+            if wait > self.__wait_max:
+                self.__wait_max = wait
+            self.__lock.release()
+
+            try:
+                action(*args)
+            except Exception:
+                self.__tracer.error('Exception calling %s with args: ' +
+                                    '\'%s\'.', action, args)
+                self.__tracer.debug(traceback.format_exc())
+
+            self.__lock.acquire()
+            self.__completed += 1
+            stopped = self.__stopped
+            self.__lock.release()
+
+            if stopped and self.__queue.empty():
+                self.__wake_one()
+                break
+
+# internal functions & classes
@@ -45,6 +45,7 @@ from channels.channel_manager import ChannelManager
 from presentations.presentation_manager import PresentationManager
 from services.service_manager import ServiceManager
 from core.scheduler import Scheduler
+from core.settings_writer import SettingsWriter
 
 from settings.settings_base import SettingsBase, Setting, REG_PENDING
 
@@ -140,6 +141,12 @@ class CoreServices(SettingsBase):
                 name='services', type=list, required=False, default_value=[]),
             Setting(
                 name='tracing', type=list, required=False, default_value=[]),
+            Setting(
+                name='scheduler', type=dict, required=False,
+                default_value={}),
+            Setting(
+                name='settings_writer', type=dict, required=False,
+                default_value={}),
         ]
         SettingsBase.__init__(self, binding=(), setting_defs=settings_list)
 
@@ -225,6 +232,10 @@ class CoreServices(SettingsBase):
         * :py:class:`scheduler <core.scheduler.Scheduler>` - Allows
           scheduling of events to be run in the future
 
+        * :py:class:`settings_writer
+          <core.settings_writer.SettingsWriter>` - Coalesces requests
+          to save the settings, see :py:meth:`request_save_settings`
+
         * :py:class:`service_manager
           <services.service_manager.ServiceManager>` - Allows run-time
           access to `ServiceBase` services running in the system.
@@ -352,9 +363,37 @@ in the core service.
         serializer_name = self.conditional_settings_serializer_load(
             self.__settings_filename)
 
-        flo = open(self.__settings_filename, 'w')
-        SettingsBase.save(self, flo, serializer_name, REG_PENDING)
-        flo.close()
+        # Write a new file and rename it over the old one, so that a
+        # failure part way through never leaves a truncated file:
+        tmp_filename = self.__settings_filename + '.tmp'
+        flo = open(tmp_filename, 'w')
+        try:
+            SettingsBase.save(self, flo, serializer_name, REG_PENDING)
+        finally:
+            flo.close()
+        try:
+            os.rename(tmp_filename, self.__settings_filename)
+        except OSError:
+            # platforms which will not rename over an existing file:
+            os.remove(self.__settings_filename)
+            os.rename(tmp_filename, self.__settings_filename)
+
+    def request_save_settings(self):
+        """
+        Ask for active settings to be committed to non-volatile storage.
+
+        Unlike :py:meth:`save_settings` this returns at once.  Requests
+        made close together are written out together by the
+        :py:class:`settings_writer <core.settings_writer.SettingsWriter>`
+        core service; callers which may change settings many times in a
+        row should use this method.
+        """
+        try:
+            writer = self.get_service('settings_writer')
+        except CoreServiceNotFound:
+            # not started yet:
+            return self.save_settings()
+        writer.request()
 
     def epoch(self, settings_flo):
         """After initialization, execution begins here.
@@ -382,6 +421,8 @@ in the core service.
             TracingManager(core_services=self)
             print "Core: Starting Scheduler..."
             Scheduler(core_services=self)
+            print "Core: Starting Settings Writer..."
+            SettingsWriter(core_services=self)
             print "Core: Starting Channel Manager..."
             ChannelManager(core_services=self)
             print "Core: Starting Device Driver Manager..."
@@ -434,6 +475,13 @@ in the core service.
         self.get_service('scheduler').stop()
         print "done."
 
+        # Write out any settings changes still waiting to be saved
+        try:
+            if self.get_service('settings_writer').flush():
+                print "Core: Saved pending settings changes."
+        except Exception, e:
+            print "Core: Unable to save pending settings: %s" % (str(e))
+
         # close all outputs
         # At this point, we shouldn't have any more messages...
         print "Core: Stopping tracing_manager...",
@@ -34,13 +34,39 @@
     will not perform blocking operations.  This is not enforced in the
     code.  Any blocking operations will degrade the performance of the
     entire system and cause delays in the execution of scheduled tasks
-    throughout. 
+    throughout.  Operations which must block should be scheduled with
+    ``blocking=True`` so they run on the scheduler's worker pool.
+
+    The scheduler may be tuned with an optional ``scheduler:`` block
+    at the top level of the settings file::
+
+        scheduler:
+            backend: lazy
+            worker_threads: 2
+            worker_queue_size: 64
+            instrument: False
+
+    * `backend` - the event queue implementation, ``heap`` (default)
+      or ``lazy``.  See :py:mod:`common.sched_async`.
+    * `worker_threads` - number of threads running actions scheduled
+      with ``blocking=True``.  0 runs them on the scheduler thread.
+    * `worker_queue_size` - number of ``blocking`` actions which may
+      wait for a worker thread.
+    * `instrument` - if True, record how late each action started and
+      how long it ran.  This may also be switched at run time from the
+      console with the ``scheduler_stats`` command.
 """
 
 # imports
 from common.sched_async import SchedAsync
+from common.worker_pool import DEFAULT_THREADS, DEFAULT_QUEUE_SIZE
+from common.types.boolean import Boolean
 
 # constants
+DEFAULTS = {'backend': SchedAsync.DEFAULT_BACKEND,
+            'worker_threads': DEFAULT_THREADS,
+            'worker_queue_size': DEFAULT_QUEUE_SIZE,
+            'instrument': False}
 
 # interface functions
 
@@ -75,9 +101,30 @@ class Scheduler(SchedAsync):
         # TODO: should we parameterize the service name?
         self.__core = core_services
         self.__core.set_service("scheduler", self)
-        SchedAsync.__init__(self, name="scheduler", core=core_services)
+        settings = _get_scheduler_dict(core_services)
+        try:
+            SchedAsync.__init__(self, name="scheduler", core=core_services,
+                    backend=settings['backend'],
+                    worker_threads=int(settings['worker_threads']),
+                    worker_queue_size=int(settings['worker_queue_size']),
+                    instrument=bool(Boolean(settings['instrument'])))
+        except (TypeError, ValueError), e:
+            print "Scheduler: %s, using defaults." % (str(e))
+            SchedAsync.__init__(self, name="scheduler", core=core_services)
 
         self.start()
 
 # internal functions & classes
 
+def _get_scheduler_dict(core_services):
+    # Get the 'scheduler:' block from the settings, merged over the
+    # defaults.
+    settings = DEFAULTS.copy()
+    ret = core_services._settings_global_pending_registry.get('scheduler')
+    if isinstance(ret, dict):
+        settings.update(ret)
+    elif ret:
+        print "Scheduler: 'scheduler:' entry is badly formed, using defaults."
+
+    return settings
+
@@ -0,0 +1,214 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+"""\
+    The settings writer saves the system settings behind the callers
+    which change them.
+
+    Saving settings serializes the whole settings tree and rewrites the
+    settings file.  Components which change settings often, such as
+    the XBee device manager adding each newly configured node to its
+    skip list, call
+    :py:meth:`~core.core_services.CoreServices.request_save_settings`
+    instead of saving directly.  Requests are coalesced and the file is
+    written once the requests have stopped for `delay` seconds, or at
+    most `max_delay` seconds after the first of them.  Pending requests
+    are written out when Dia shuts down.
+
+    The writer may be tuned with an optional ``settings_writer:`` block
+    at the top level of the settings file::
+
+        settings_writer:
+            delay: 10
+            max_delay: 60
+
+    * `delay` - seconds without a new request before the settings are
+      written.  0 writes on every request.
+    * `max_delay` - longest a request may wait for the write.
+"""
+
+# imports
+import threading
+
+import digitime
+
+# constants
+DEFAULTS = {'delay': 10.0,
+            'max_delay': 60.0}
+
+# interface functions
+
+# classes
+
+class SettingsWriter(object):
+    """\
+        Dia core service which coalesces requests to save the settings
+
+        Parameters:
+
+        * `core_services` - The
+          :py:class:`~core.core_services.CoreServices`
+          object of the system
+
+        The writer is created by the system and registered as the
+        ``settings_writer`` core service.  Writes are run on the
+        scheduler's worker pool.
+
+    """
+    def __init__(self, core_services):
+        self.__core = core_services
+        self.__core.set_service("settings_writer", self)
+
+        settings = _get_settings_writer_dict(core_services)
+        try:
+            self.__delay = float(settings['delay'])
+            self.__max_delay = float(settings['max_delay'])
+            if self.__delay < 0 or self.__max_delay < self.__delay:
+                raise ValueError("delay must be between 0 and max_delay")
+        except (TypeError, ValueError), e:
+            print "SettingsWriter: %s, using defaults." % (str(e))
+            self.__delay = DEFAULTS['delay']
+            self.__max_delay = DEFAULTS['max_delay']
+
+        self.__lock = threading.Lock()
+        self.__write_lock = threading.Lock()
+        # time of the first and of the latest pending request:
+        self.__first_request = None
+        self.__last_request = None
+        self.__event = None
+        self.__requests = 0
+        self.__writes = 0
+
+    def request(self):
+        """\
+        Ask for the settings to be saved.
+
+        Returns without waiting for the write.
+        """
+        if not self.__delay:
+            self.__lock.acquire()
+            try:
+                self.__requests += 1
+                self.__first_request = self.__last_request = digitime.time()
+            finally:
+                self.__lock.release()
+            self.flush()
+            return
+
+        self.__lock.acquire()
+        try:
+            now = digitime.time()
+            self.__requests += 1
+            self.__last_request = now
+            if self.__first_request is not None:
+                # A write is already scheduled; it will look at
+                # __last_request when it fires.
+                return
+            self.__first_request = now
+            self.__event = self.__schedule(self.__delay)
+        finally:
+            self.__lock.release()
+
+    def flush(self):
+        """\
+        Write the settings now if a save has been requested.
+
+        Returns True if the settings were written.
+        """
+        self.__lock.acquire()
+        try:
+            if self.__first_request is None:
+                return False
+            if self.__event is not None:
+                self.__core.get_service("scheduler").cancel(self.__event)
+            self.__first_request = self.__last_request = self.__event = None
+        finally:
+            self.__lock.release()
+
+        self.__write()
+        return True
+
+    def pending(self):
+        """Returns True if a requested save has not been written yet."""
+        return self.__first_request is not None
+
+    def stats(self):
+        """\
+        Returns a dictionary of the number of save `requests` and of
+        the number of `writes` they were coalesced into.
+        """
+        return {'requests': self.__requests, 'writes': self.__writes}
+
+    def __schedule(self, delay):
+        return self.__core.get_service("scheduler").schedule_after(
+            delay, self.__expire, blocking=True)
+
+    def __expire(self):
+        # Scheduled action: write unless requests are still arriving
+        # and the oldest of them can wait longer.
+        self.__lock.acquire()
+        try:
+            if self.__first_request is None:
+                # flushed in the meantime
+                return
+            now = digitime.time()
+            due = min(self.__last_request + self.__delay,
+                      self.__first_request + self.__max_delay)
+            if due > now:
+                self.__event = self.__schedule(due - now)
+                return
+            self.__first_request = self.__last_request = self.__event = None
+        finally:
+            self.__lock.release()
+
+        try:
+            self.__write()
+        except Exception, e:
+            print "SettingsWriter: unable to save settings: %s" % (str(e))
+
+    def __write(self):
+        self.__write_lock.acquire()
+        try:
+            self.__core.save_settings()
+            self.__writes += 1
+        finally:
+            self.__write_lock.release()
+
+# internal functions & classes
+
+def _get_settings_writer_dict(core_services):
+    # Get the 'settings_writer:' block from the settings, merged over
+    # the defaults.
+    settings = DEFAULTS.copy()
+    ret = core_services._settings_global_pending_registry.get(
+        'settings_writer')
+    if isinstance(ret, dict):
+        settings.update(ret)
+    elif ret:
+        print ("SettingsWriter: 'settings_writer:' entry is badly formed, " +
+               "using defaults.")
+
+    return settings
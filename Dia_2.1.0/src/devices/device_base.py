@@ -29,6 +29,7 @@
 from core.tracing import get_tracer
 from settings.settings_base import SettingsBase, Setting
 from channels.channel_source_device_property import ChannelSourceDeviceProperty
+from channels.sample_filter import sample_filter_from_settings
 import time
 from devices.xbee.common.addressing import *
 import traceback
@@ -63,6 +64,10 @@ class DeviceBase(SettingsBase):
     * *core_services*: The system
       :class:`~core.core_services.CoreServices` object.
 
+    Every device also accepts a `sample_filters` setting, mapping
+    property names (or ``*`` for all properties) to the parameters of
+    a :class:`~channels.sample_filter.SampleFilter`.
+
     """
 
     DEF_TRACE = '' # None - no change
@@ -78,6 +83,9 @@ class DeviceBase(SettingsBase):
             Setting(
                 name='trace', type=str, required=False,
                 default_value=self.DEF_TRACE),
+            Setting(
+                name='sample_filters', type=dict, required=False,
+                default_value={}),
         ]
         # Add our settings_list entries into the settings passed to us.
         settings = self.merge_settings(settings, settings_list)
@@ -222,6 +230,24 @@ class DeviceBase(SettingsBase):
         return self._name
 
 
+    def __apply_sample_filter(self, channel_source_device_property):
+        # a filter from the settings replaces one from the driver
+        filters = SettingsBase.get_setting(self, "sample_filters")
+        if not filters:
+            return
+
+        name = channel_source_device_property.name
+        filter_settings = filters.get(name, filters.get('*'))
+        if filter_settings is None:
+            return
+
+        try:
+            channel_source_device_property.sample_filter = \
+                sample_filter_from_settings(filter_settings)
+        except Exception, e:
+            self._tracer.warning("Ignoring bad sample filter for '%s': %s",
+                                 name, str(e))
+
     def __get_property_channel(self, name):
         """
         Returns channel designated by property *name*.
@@ -243,6 +269,8 @@ class DeviceBase(SettingsBase):
         Adds a channel to the set of device properties.
 
         """
+        self.__apply_sample_filter(channel_source_device_property)
+
         channel_db = \
             self._core.get_service("channel_manager").channel_database_get()
         channel_name = "%s.%s" % \
@@ -254,6 +282,20 @@ class DeviceBase(SettingsBase):
 
         return channel
 
+    def sample_filter_stats(self):
+        """
+        Returns a dictionary mapping the name of each filtered property
+        to a tuple of the samples (passed, suppressed) by its filter.
+
+        """
+        stats = { }
+        for name, channel in self.__properties.iteritems():
+            sample_filter = channel.sample_filter()
+            if sample_filter is not None:
+                stats[name] = (sample_filter.passed, sample_filter.suppressed)
+
+        return stats
+
     def property_get(self, name):
         """
         Returns the current :class:`~samples.sample.Sample` specified
@@ -275,6 +317,38 @@ class DeviceBase(SettingsBase):
         channel = self.__get_property_channel(name)
         return channel.producer_set(sample)
 
+    def property_set_many(self, samples):
+        """
+        Sets several properties at once and publishes them as a batch.
+
+        *samples* is a dictionary mapping property names to
+        :class:`~samples.sample.Sample` objects, or a sequence of
+        (name, sample) pairs to set them in order.
+
+        Every property is set before any subscriber is notified.
+        Subscribers registered with ``batch=True`` receive one callback
+        for the whole batch and loggers receive a single logging event,
+        see
+        :meth:`~channels.channel_publisher.ChannelPublisher.begin_batch`.
+
+        """
+        if hasattr(samples, 'iteritems'):
+            samples = samples.iteritems()
+
+        # Look every property up first so that an unknown name
+        # publishes nothing.
+        updates = [ (self.__get_property_channel(name), sample)
+                    for name, sample in samples ]
+
+        channel_publisher = self._core.get_service("channel_manager") \
+                                .channel_publisher_get()
+        channel_publisher.begin_batch()
+        try:
+            for channel, sample in updates:
+                channel.producer_set(sample)
+        finally:
+            channel_publisher.end_batch()
+
     
     def globe_get(self, name):
         """
@@ -0,0 +1,201 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+"""
+Scheduler statistics device.
+
+Publishes the counters of the core :py:class:`~core.scheduler.Scheduler`
+as channels so they can be logged, charted or uploaded like any other
+device data::
+
+    devices:
+      - name: sched
+        driver: devices.scheduler_device:SchedulerDevice
+        settings:
+            update_rate: 10.0
+
+"""
+
+# imports
+from devices.device_base import DeviceBase
+from settings.settings_base import SettingsBase, Setting
+from channels.channel_source_device_property import *
+from samples.sample import Sample
+
+# constants
+
+# exception classes
+
+# interface functions
+
+# classes
+
+class SchedulerDevice(DeviceBase):
+    """
+    Exposes scheduler worker pool counters as channels.
+
+    The channels are refreshed every `update_rate` seconds by a
+    periodic job on the scheduler itself, so this device does not
+    require a thread of its own.
+
+    If the `instrument` setting is True, scheduler instrumentation is
+    turned on when the device starts and the lateness and run-time
+    statistics are published as well.  The histogram channels hold the
+    count for each bucket of :py:func:`common.sched_stats.bucket_labels`
+    as a comma separated string.
+    """
+
+    def __init__(self, name, core_services):
+        self.__name = name
+        self.__core = core_services
+        self.__job = None
+
+        from core.tracing import get_tracer
+        self.__tracer = get_tracer(name)
+
+        ## Settings Table Definition:
+        settings_list = [
+            Setting(
+                name='update_rate', type=float, required=False,
+                default_value=10.0, verify_function=lambda x: x > 0.0),
+            Setting(
+                name='instrument', type=bool, required=False,
+                default_value=False),
+        ]
+
+        ## Channel Properties Definition:
+        property_list = [
+            ChannelSourceDeviceProperty(name="pool_queue_depth", type=int,
+                  initial=Sample(timestamp=0, value=0),
+                  perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP),
+            ChannelSourceDeviceProperty(name="pool_queue_max", type=int,
+                  initial=Sample(timestamp=0, value=0),
+                  perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP),
+            ChannelSourceDeviceProperty(name="pool_completed", type=int,
+                  initial=Sample(timestamp=0, value=0),
+                  perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP),
+            ChannelSourceDeviceProperty(name="pool_overflow", type=int,
+                  initial=Sample(timestamp=0, value=0),
+                  perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP),
+            ChannelSourceDeviceProperty(name="pool_wait", type=float,
+                  initial=Sample(timestamp=0, value=0.0, unit="sec"),
+                  perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP),
+            ChannelSourceDeviceProperty(name="pool_wait_max", type=float,
+                  initial=Sample(timestamp=0, value=0.0, unit="sec"),
+                  perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP),
+            ChannelSourceDeviceProperty(name="actions", type=int,
+                  initial=Sample(timestamp=0, value=0),
+                  perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP),
+            ChannelSourceDeviceProperty(name="lateness_max", type=float,
+                  initial=Sample(timestamp=0, value=0.0, unit="sec"),
+                  perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP),
+            ChannelSourceDeviceProperty(name="runtime_max", type=float,
+                  initial=Sample(timestamp=0, value=0.0, unit="sec"),
+                  perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP),
+            ChannelSourceDeviceProperty(name="lateness_histogram", type=str,
+                  initial=Sample(timestamp=0, value=""),
+                  perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP),
+            ChannelSourceDeviceProperty(name="runtime_histogram", type=str,
+                  initial=Sample(timestamp=0, value=""),
+                  perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP),
+            ChannelSourceDeviceProperty(name="slowest_action", type=str,
+                  initial=Sample(timestamp=0, value=""),
+                  perms_mask=DPROP_PERM_GET, options=DPROP_OPT_AUTOTIMESTAMP),
+        ]
+
+        ## Initialize the DeviceBase interface:
+        DeviceBase.__init__(self, self.__name, self.__core,
+                                settings_list, property_list)
+
+
+    ## Functions which must be implemented to conform to the DeviceBase
+    ## interface:
+
+    def apply_settings(self):
+
+        SettingsBase.merge_settings(self)
+        accepted, rejected, not_found = SettingsBase.verify_settings(self)
+        if len(rejected) or len(not_found):
+            self.__tracer.error("Settings rejected/not found: %s %s",
+                                rejected, not_found)
+
+        SettingsBase.commit_settings(self, accepted)
+
+        return (accepted, rejected, not_found)
+
+    def start(self):
+
+        sched = self.__core.get_service("scheduler")
+        if SettingsBase.get_setting(self, "instrument"):
+            sched.instrumentation_enable(True)
+        self.__job = sched.schedule_every(
+            SettingsBase.get_setting(self, "update_rate"), self.update)
+        return True
+
+    def stop(self):
+
+        if self.__job is not None:
+            self.__core.get_service("scheduler").cancel(self.__job)
+            self.__job = None
+        return True
+
+
+    ## Locally defined functions:
+    def update(self):
+        """Refresh the channels from the scheduler's counters."""
+
+        sched = self.__core.get_service("scheduler")
+
+        stats = sched.worker_pool_stats()
+        if stats is not None:
+            for stat in ['queue_depth', 'queue_max', 'completed',
+                         'overflow']:
+                self.property_set("pool_" + stat, Sample(0, stats[stat]))
+            self.property_set("pool_wait",
+                Sample(0, stats['wait_last'], unit="sec"))
+            self.property_set("pool_wait_max",
+                Sample(0, stats['wait_max'], unit="sec"))
+
+        stats = sched.instrumentation_stats()
+        if stats is not None:
+            summary = stats.summary()
+            self.property_set("actions", Sample(0, summary['count']))
+            self.property_set("lateness_max",
+                Sample(0, summary['lateness_max'], unit="sec"))
+            self.property_set("runtime_max",
+                Sample(0, summary['runtime_max'], unit="sec"))
+            self.property_set("lateness_histogram",
+                Sample(0, ",".join(map(str, summary['lateness']))))
+            self.property_set("runtime_histogram",
+                Sample(0, ",".join(map(str, summary['runtime']))))
+            slowest = stats.slowest(1)
+            if slowest:
+                self.property_set("slowest_action",
+                    Sample(0, "%s %.3fs" % (slowest[0][0], slowest[0][3])))
+
+
+# internal functions & classes
@@ -227,77 +227,80 @@ class ECM1240_Xbee(RobustXSerial):
         now = time.time()
 
         chns = SettingsBase.get_setting(self, "enable_channels")
+        samples = []
         if self._ecm._power[0] is not None:
-            self.property_set(self._ecm.get_chn_name_power(1),
-                Sample(now, self._ecm._power[0], 'W'))
-            self.property_set(self._ecm.get_chn_name_energy(1),
-                Sample(now, self._ecm._kwh[0], 'KWh'))
+            samples.append((self._ecm.get_chn_name_power(1),
+                Sample(now, self._ecm._power[0], 'W')))
+            samples.append((self._ecm.get_chn_name_energy(1),
+                Sample(now, self._ecm._kwh[0], 'KWh')))
             self.__tracer.info('CH1: Power:%0.2fW Current:%0.2f, Energy:%0.3fKWh',
                     self._ecm._power[0], self._ecm._current[0],
                     self._ecm._kwh[0])
 
         if self._ecm._power[1] is not None:
-            self.property_set(self._ecm.get_chn_name_power(2),
-                Sample(now, self._ecm._power[1], 'W'))
-            self.property_set(self._ecm.get_chn_name_energy(2),
-                Sample(now, self._ecm._kwh[1], 'KWh'))
+            samples.append((self._ecm.get_chn_name_power(2),
+                Sample(now, self._ecm._power[1], 'W')))
+            samples.append((self._ecm.get_chn_name_energy(2),
+                Sample(now, self._ecm._kwh[1], 'KWh')))
             self.__tracer.info('CH2: Power:%0.2fW Current:%0.2f, Energy:%0.3fKWh',
                     self._ecm._power[1], self._ecm._current[1],
                     self._ecm._kwh[1])
 
         if chns & self.ENB_CHN_CURRENT_CH1 and \
                 self._ecm._current[0] is not None:
-            self.property_set(self._ecm.get_chn_name_current(1),
-                Sample(now, self._ecm._current[0], 'A'))
+            samples.append((self._ecm.get_chn_name_current(1),
+                Sample(now, self._ecm._current[0], 'A')))
 
         if chns & self.ENB_CHN_CURRENT_CH2 and \
                 self._ecm._current[1] is not None:
-            self.property_set(self._ecm.get_chn_name_current(2),
-                Sample(now, self._ecm._current[1], 'A'))
+            samples.append((self._ecm.get_chn_name_current(2),
+                Sample(now, self._ecm._current[1], 'A')))
 
         if chns & self.ENB_CHN_VOLTAGE and \
                 self._ecm._voltage is not None:
-            self.property_set(self._ecm.get_chn_name_voltage(),
-                Sample(now, self._ecm._voltage, 'VAC'))
+            samples.append((self._ecm.get_chn_name_voltage(),
+                Sample(now, self._ecm._voltage, 'VAC')))
 
         if self._ecm._power[2] is not None:
-            self.property_set(self._ecm.get_chn_name_power(3),
-                Sample(now, self._ecm._power[2], 'W'))
-            self.property_set(self._ecm.get_chn_name_energy(3),
-                Sample(now, self._ecm._kwh[2], 'KWh'))
+            samples.append((self._ecm.get_chn_name_power(3),
+                Sample(now, self._ecm._power[2], 'W')))
+            samples.append((self._ecm.get_chn_name_energy(3),
+                Sample(now, self._ecm._kwh[2], 'KWh')))
             self.__tracer.info('AUX1: Power:%0.2fW Energy:%0.3fKWh',
                     self._ecm._power[2], self._ecm._kwh[2])
 
         if self._ecm._power[3] is not None:
-            self.property_set(self._ecm.get_chn_name_power(4),
-                Sample(now, self._ecm._power[3], 'W'))
-            self.property_set(self._ecm.get_chn_name_energy(4),
-                Sample(now, self._ecm._kwh[3], 'KWh'))
+            samples.append((self._ecm.get_chn_name_power(4),
+                Sample(now, self._ecm._power[3], 'W')))
+            samples.append((self._ecm.get_chn_name_energy(4),
+                Sample(now, self._ecm._kwh[3], 'KWh')))
             self.__tracer.info('AUX2: Power:%0.2fW Energy:%0.3fKWh',
                     self._ecm._power[3], self._ecm._kwh[3])
 
         if self._ecm._power[4] is not None:
-            self.property_set(self._ecm.get_chn_name_power(5),
-                Sample(now, self._ecm._power[4], 'W'))
-            self.property_set(self._ecm.get_chn_name_energy(5),
-                Sample(now, self._ecm._kwh[4], 'KWh'))
+            samples.append((self._ecm.get_chn_name_power(5),
+                Sample(now, self._ecm._power[4], 'W')))
+            samples.append((self._ecm.get_chn_name_energy(5),
+                Sample(now, self._ecm._kwh[4], 'KWh')))
             self.__tracer.info('AUX3: Power:%0.2fW Energy:%0.3fKWh',
                     self._ecm._power[4], self._ecm._kwh[4])
 
         if self._ecm._power[5] is not None:
-            self.property_set(self._ecm.get_chn_name_power(6),
-                Sample(now, self._ecm._power[5], 'W'))
-            self.property_set(self._ecm.get_chn_name_energy(6),
-                Sample(now, self._ecm._kwh[5], 'KWh'))
+            samples.append((self._ecm.get_chn_name_power(6),
+                Sample(now, self._ecm._power[5], 'W')))
+            samples.append((self._ecm.get_chn_name_energy(6),
+                Sample(now, self._ecm._kwh[5], 'KWh')))
             self.__tracer.info('AUX4: Power:%0.2fW Energy:%0.3fKWh',
                     self._ecm._power[5], self._ecm._kwh[5])
 
         if self._ecm._power[6] is not None:
-            self.property_set(self._ecm.get_chn_name_power(7),
-                Sample(now, self._ecm._power[6], 'W'))
-            self.property_set(self._ecm.get_chn_name_energy(7),
-                Sample(now, self._ecm._kwh[6], 'KWh'))
+            samples.append((self._ecm.get_chn_name_power(7),
+                Sample(now, self._ecm._power[6], 'W')))
+            samples.append((self._ecm.get_chn_name_energy(7),
+                Sample(now, self._ecm._kwh[6], 'KWh')))
             self.__tracer.info('AUX5: Power:%0.2fW Energy:%0.3fKWh',
                     self._ecm._power[6], self._ecm._kwh[6])
 
+        self.property_set_many(samples)
+
         return True
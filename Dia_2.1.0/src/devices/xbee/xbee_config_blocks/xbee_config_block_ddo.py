@@ -187,51 +187,68 @@ class XBeeConfigBlockDDO(AbstractXBeeConfigBlockDDO):
                                   'postponing configuration.', self._ext_addr)
             return False
 
+        ext_addr = AbstractXBeeConfigBlockDDO.ext_addr_get(self)
+        configurator = AbstractXBeeConfigBlockDDO.configurator_get(self)
+
+        # All pending sets are sent to the node in one round:
+        set_params = [(mnemonic, self.__pending_parameters[mnemonic][0])
+                      for mnemonic in self.__pending_parameters
+                      if self.__pending_parameters[mnemonic][1] == \
+                         DDO_SET_PARAM]
+        if set_params:
+            if self.__tracer.debug():
+                self.__tracer.debug("Apply_config: trying SET %s to '%s'",
+                    ', '.join(["'%s' = '%s'" % (mnemonic, format_hexrepr(value))
+                               for mnemonic, value in set_params]),
+                    ext_addr)
+            failures = configurator.ddo_set_params(ext_addr, set_params,
+                                                   retries=DDO_RETRY_ATTEMPTS)
+            if failures is False:
+                # The configurator is shutting down.
+                return False
+
+            failed = dict(failures)
+            error = None
+            for mnemonic, value in set_params:
+                if mnemonic in failed:
+                    self.__tracer.warning("Req to '%s' of '%s' failed (%s)",
+                                          ext_addr, mnemonic,
+                                          str(failed[mnemonic]))
+                    # If a callback on failure was specified, the caller
+                    # wants to know about the failure, and decide whether
+                    # it doesn't care if the DDO failed.  If it returns
+                    # True the failure is ignored; otherwise the exception
+                    # is raised like usual once the rest of the round has
+                    # been accounted for.
+                    callback = self.__pending_parameters[mnemonic][2]
+                    if callback != None and callback(mnemonic, value) == True:
+                        self.__tracer.warning('Ignore previous warning')
+                    else:
+                        if error is None:
+                            error = failed[mnemonic]
+                        continue
+
+                del(self.__pending_parameters[mnemonic])
+
+            if error is not None:
+                raise error
+
         pending_mnemonics = self.__pending_parameters.keys()
         for mnemonic in pending_mnemonics:
             value, method, callback = self.__pending_parameters[mnemonic]
             try:
-                if method == DDO_SET_PARAM:
-                    self.__tracer.debug("Apply_config: trying " +
-                                        "SET '%s' = '%s' to '%s'",
-                                        mnemonic,
-                                        format_hexrepr(value),
-                                        AbstractXBeeConfigBlockDDO.\
-                                        ext_addr_get(self))
-
-                    (AbstractXBeeConfigBlockDDO
-                       .configurator_get(self).ddo_set_param(
-                           AbstractXBeeConfigBlockDDO.ext_addr_get(self),
-                           mnemonic, value, retries=DDO_RETRY_ATTEMPTS))
-                else:
-                    # DDO_GET_PARAM
-                    self.__tracer.debug("Trying GET '%s' from '%s'",
-                                        mnemonic,
-                                        AbstractXBeeConfigBlockDDO.\
-                                        ext_addr_get(self))
-
-                    AbstractXBeeConfigBlockDDO\
-                       .configurator_get(self)\
-                         .ddo_get_param(
-                           AbstractXBeeConfigBlockDDO.ext_addr_get(self),
-                           mnemonic, retries=DDO_RETRY_ATTEMPTS,
-                           use_cache=False)
+                # DDO_GET_PARAM
+                self.__tracer.debug("Trying GET '%s' from '%s'",
+                                    mnemonic, ext_addr)
+
+                configurator.ddo_get_param(ext_addr, mnemonic,
+                                           retries=DDO_RETRY_ATTEMPTS,
+                                           use_cache=False)
             except Exception, e:
                 self.__tracer.warning("Req to '%s' of '%s' failed (%s)",
-                                      AbstractXBeeConfigBlockDDO.\
-                                      ext_addr_get(self),
-                                      mnemonic,
-                                      str(e))
-
-                # If a callback on failure was specified, the caller wants to
-                # know about the failure, and decide whether it doesn't care
-                # if the DDO failed.
-                # If the caller returns True in the callback, this means that
-                # the caller wants us to ignore the failure, and thus,
-                # we should NOT throw an exception.
-                # On the other hand, if there is no callback specified,
-                # of if the callback function returns False, then raise the
-                # exception like usual.
+                                      ext_addr, mnemonic, str(e))
+
+                # See the note on failure callbacks above.
                 if callback != None:
                     ret = callback(mnemonic, value)
                     if ret == True:
@@ -31,11 +31,43 @@ This module contains a caching sub-system used to store the values of
 network parameters to reduce the number of operations performed on the
 network.
 
+The cache may be backed by a file so that the values learned from
+remote nodes survive a restart of Dia.  Each value is stored with the
+time it was learned and is only trusted for the time-to-live of its
+parameter.
+
 """
 
-from devices.xbee.common.addressing import normalize_address, addresses_equal
+from devices.xbee.common.addressing import normalize_address, addresses_equal, \
+     tuple_to_address
 import sys, traceback
 import struct
+import threading
+import time
+import os
+
+# constants
+
+# Seconds a cached value is trusted for.  Parameters with a TTL of 0
+# are commands rather than values and are never written to the file.
+DEFAULT_PARAM_TTL = 24 * 60 * 60
+PARAM_TTLS = {
+    # hardware and firmware identity of the node:
+    'DD': 7 * 24 * 60 * 60,
+    'VR': 7 * 24 * 60 * 60,
+    'HV': 7 * 24 * 60 * 60,
+    # commands:
+    'AC': 0, 'WR': 0, 'FR': 0, 'RE': 0, 'ND': 0, 'DN': 0, 'CN': 0,
+}
+
+# cache file format:
+CACHE_FILE_MAGIC = 'XDPC'
+CACHE_FILE_VERSION = 1
+CACHE_FILE_HEADER = '>4sB'
+CACHE_FILE_HEADER_SIZE = struct.calcsize(CACHE_FILE_HEADER)
+# 64-bit address, mnemonic, time learned, value length:
+CACHE_FILE_RECORD = '>8s2sIB'
+CACHE_FILE_RECORD_SIZE = struct.calcsize(CACHE_FILE_RECORD)
 
 class XBeeDDOParamCacheMiss(KeyError):
     pass
@@ -49,9 +81,19 @@ class XBeeDDOParamCacheMissParamNotFound(XBeeDDOParamCacheMiss):
 
 class XBeeDDOParamCache:
     """XBee Digi Device Objects ("DDO") Parameter Cache"""
-    def __init__(self):
+    def __init__(self, param_ttls=None):
+        # format: { addr_extended: { 'XX': (value, time_learned), ... } }
         self.__ddo_param_cache = { }
-        
+        self.__param_ttls = PARAM_TTLS.copy()
+        if param_ttls:
+            self.__param_ttls.update(param_ttls)
+        self.__lock = threading.RLock()
+        self.__filename = None
+        self.__dirty = False
+        self.__hits = 0
+        self.__misses = 0
+        self.__expired = 0
+
     def cache_get(self, addr_extended, param):
         """\
         Retrieve a value from the cache.
@@ -60,29 +102,38 @@ class XBeeDDOParamCache:
                                                    cache.
         :raises XBeeDDOParamCacheMissParamNotFound: if the parameter does not
                                                     exist in the cache for the
-                                                    given node address.
+                                                    given node address, or
+                                                    its value has outlived
+                                                    the parameter's TTL.
         :param addr_extended: a valid XBee extended address string
         :param param: a two letter mnemonic string of a DDO parameter
         :retval: returns the cached parameter value as a string
         """
         addr_extended = normalize_address(addr_extended)
-        if addr_extended not in self.__ddo_param_cache:
-# TODO: change to trace message            
-#            print "CACHE MISS param '%s' addr '%s' reason: MOE" % (
-#                    param, addr_extended)
-            raise XBeeDDOParamCacheMissNodeNotFound
-        
-        if param not in self.__ddo_param_cache[addr_extended]:
-# TODO: change to trace message            
-#            print "CACHE MISS param '%s' addr '%s' reason: LARRY" % (
-#                    param, addr_extended)
-            raise XBeeDDOParamCacheMissParamNotFound
-
-# TODO: change to trace message
-#        print "CACHE HIT: '%s' = %s for '%s'" % (
-#                param, repr(self.__ddo_param_cache[addr_extended][param]), addr_extended)    
-        
-        return self.__ddo_param_cache[addr_extended][param]
+        param = param.upper()
+        self.__lock.acquire()
+        try:
+            if addr_extended not in self.__ddo_param_cache:
+                self.__misses += 1
+                raise XBeeDDOParamCacheMissNodeNotFound
+
+            node = self.__ddo_param_cache[addr_extended]
+            if param not in node:
+                self.__misses += 1
+                raise XBeeDDOParamCacheMissParamNotFound
+
+            value, learned = node[param]
+            if time.time() - learned > self.__ttl(param):
+                del(node[param])
+                self.__dirty = True
+                self.__expired += 1
+                self.__misses += 1
+                raise XBeeDDOParamCacheMissParamNotFound
+
+            self.__hits += 1
+            return value
+        finally:
+            self.__lock.release()
 
     def cache_set(self, addr_extended, param, value):
         """\
@@ -102,19 +153,22 @@ class XBeeDDOParamCache:
         """
         addr_extended = normalize_address(addr_extended)
         param = param.upper()
-        if addr_extended not in self.__ddo_param_cache:
-            self.__ddo_param_cache[addr_extended] = { }
-        
-        if value is None:
-            self.cache_invalidate(addr_extended, param)
-        else:
-            if isinstance(value, int):
-                value = struct.pack(">H", value)
-
-# TODO: change to become trace message
-#            print "CACHE STORE: cached '%s' = %s for '%s'" % (
-#                    param, repr(value), addr_extended)
-            self.__ddo_param_cache[addr_extended][param] = value
+        self.__lock.acquire()
+        try:
+            if addr_extended not in self.__ddo_param_cache:
+                self.__ddo_param_cache[addr_extended] = { }
+
+            if value is None:
+                self.cache_invalidate(addr_extended, param)
+            else:
+                if isinstance(value, int):
+                    value = struct.pack(">H", value)
+
+                self.__ddo_param_cache[addr_extended][param] = \
+                    (value, time.time())
+                self.__dirty = True
+        finally:
+            self.__lock.release()
         
     def cache_invalidate(self, addr_extended, param=None):
         """\
@@ -135,16 +189,163 @@ class XBeeDDOParamCache:
         """
         
         addr_extended = normalize_address(addr_extended)
-        param = param.upper()
-        if addr_extended not in self.__ddo_param_cache:
-            raise XBeeDDOParamCacheMissNodeNotFound
-        
-        if param is None:
-            del(self.__ddo_param_cache[addr_extended])
-            
-        if param not in self.__ddo_param_cache[addr_extended]:
-            # no-op
-            return
-        
-        del(self.__ddo_param_cache[addr_extended][param])
-  
+        self.__lock.acquire()
+        try:
+            if addr_extended not in self.__ddo_param_cache:
+                raise XBeeDDOParamCacheMissNodeNotFound
+
+            if param is None:
+                del(self.__ddo_param_cache[addr_extended])
+                self.__dirty = True
+                return
+
+            param = param.upper()
+            if param not in self.__ddo_param_cache[addr_extended]:
+                # no-op
+                return
+
+            del(self.__ddo_param_cache[addr_extended][param])
+            self.__dirty = True
+        finally:
+            self.__lock.release()
+
+    def stats(self):
+        """\
+        Return the cache's counters.
+
+        :retval: a dictionary of the number of 'hits', 'misses' and
+                 'expired' values since the cache was created, and the
+                 number of 'nodes' and 'entries' it currently holds
+        """
+        self.__lock.acquire()
+        try:
+            return {'hits': self.__hits,
+                    'misses': self.__misses,
+                    'expired': self.__expired,
+                    'nodes': len(self.__ddo_param_cache),
+                    'entries': sum([len(node) for node in \
+                                    self.__ddo_param_cache.values()])}
+        finally:
+            self.__lock.release()
+
+    def load(self, filename):
+        """\
+        Back the cache with `filename`.
+
+        Values stored in the file which have not outlived their TTL are
+        added to the cache; values already in the cache are kept.  A
+        missing file, or one written by an incompatible version, leaves
+        the cache as it is.  Later calls to :meth:`flush` write the
+        cache back to `filename`.
+
+        :param filename: path of the cache file
+        :retval: the number of values loaded
+        """
+        from core.tracing import get_tracer
+        tracer = get_tracer('XBeeDDOParamCache')
+
+        self.__lock.acquire()
+        try:
+            self.__filename = filename
+            try:
+                fd = open(filename, 'rb')
+            except IOError:
+                return 0
+            try:
+                data = fd.read()
+            finally:
+                fd.close()
+
+            try:
+                return self.__decode(data)
+            except Exception, e:
+                tracer.warning("Ignoring DDO cache file '%s': %s",
+                               filename, str(e))
+                return 0
+        finally:
+            self.__lock.release()
+
+    def flush(self):
+        """\
+        Write the cache to the file given to :meth:`load`, if anything
+        changed since it was last written.
+
+        Only values of remote nodes are written, and only for
+        parameters with a non-zero TTL.  The file is replaced
+        atomically.
+
+        :retval: True if the file was written
+        """
+        self.__lock.acquire()
+        try:
+            if self.__filename is None or not self.__dirty:
+                return False
+            data = self.__encode()
+            self.__dirty = False
+        finally:
+            self.__lock.release()
+
+        tmp_filename = self.__filename + '.tmp'
+        fd = open(tmp_filename, 'wb')
+        try:
+            fd.write(data)
+        finally:
+            fd.close()
+        try:
+            os.rename(tmp_filename, self.__filename)
+        except OSError:
+            # platforms which will not rename over an existing file:
+            os.remove(self.__filename)
+            os.rename(tmp_filename, self.__filename)
+        return True
+
+    def __ttl(self, param):
+        return self.__param_ttls.get(param, DEFAULT_PARAM_TTL)
+
+    def __encode(self):
+        records = [struct.pack(CACHE_FILE_HEADER, CACHE_FILE_MAGIC,
+                               CACHE_FILE_VERSION)]
+        for addr_extended, node in self.__ddo_param_cache.iteritems():
+            if addr_extended is None:
+                # the gateway's own radio
+                continue
+            raw_addr = ''.join([chr(int(b, 16)) for b in \
+                                addr_extended.strip('[]!').split(':')])
+            if len(raw_addr) != 8:
+                continue
+            for param, (value, learned) in node.iteritems():
+                if not self.__ttl(param) or len(value) > 255:
+                    continue
+                records.append(struct.pack(CACHE_FILE_RECORD, raw_addr,
+                                           param, int(learned),
+                                           len(value)))
+                records.append(value)
+        return ''.join(records)
+
+    def __decode(self, data):
+        magic, version = struct.unpack(CACHE_FILE_HEADER,
+                                       data[:CACHE_FILE_HEADER_SIZE])
+        if magic != CACHE_FILE_MAGIC or version != CACHE_FILE_VERSION:
+            raise ValueError("unknown format %r version %d" % (magic, version))
+
+        now = time.time()
+        loaded = 0
+        offset = CACHE_FILE_HEADER_SIZE
+        while offset < len(data):
+            raw_addr, param, learned, length = struct.unpack(
+                CACHE_FILE_RECORD,
+                data[offset:offset + CACHE_FILE_RECORD_SIZE])
+            offset += CACHE_FILE_RECORD_SIZE
+            value = data[offset:offset + length]
+            offset += length
+            if len(value) != length:
+                raise ValueError("truncated record")
+
+            if now - learned > self.__ttl(param):
+                continue
+            addr_extended = tuple_to_address((raw_addr,))
+            node = self.__ddo_param_cache.setdefault(addr_extended, { })
+            if param not in node:
+                node[param] = (value, learned)
+                loaded += 1
+        return loaded
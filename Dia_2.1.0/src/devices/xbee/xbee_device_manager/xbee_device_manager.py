@@ -58,6 +58,22 @@ BEHAVIOR_HAS_ATOMIC_DDO = 0x1
 
 DH_DL_REFRESH_INITIAL_WAIT = 40  # wait time in seconds before first write
 
+# transmit queue defaults, per endpoint:
+XMIT_QUEUE_SIZE = 64    # frames held while the socket would block
+XMIT_RATE = 0           # frames per second, 0 = unpaced
+XMIT_BURST = 8          # token bucket depth and frames sent per wakeup
+
+# transmit queue overflow policies:
+XMIT_OVERFLOW_REJECT = 'reject'             # raise to the caller
+XMIT_OVERFLOW_DROP_OLDEST = 'drop_oldest'   # discard the oldest frame
+XMIT_OVERFLOW_POLICIES = (XMIT_OVERFLOW_REJECT, XMIT_OVERFLOW_DROP_OLDEST)
+
+CONFIG_NODES = 4           # nodes configured at once by the pipeline
+CONFIG_RATE_WINDOW = 600   # seconds of completions behind config_rate
+CONFIG_RATE_INTERVAL = 30  # seconds between config_rate refreshes
+
+DDO_CACHE_FLUSH_INTERVAL = 60  # seconds between DDO cache file writes
+
 # These channels are shared between zigbee and digimesh.
 BINDPOINTS = {bindpoints.JOIN: {'endpoint': 0xe8,
                                 'profile_id': 0xc105,
@@ -82,6 +98,7 @@ from select import select
 import threading
 import digitime
 import types
+from collections import deque
 
 try:
     import xbee
@@ -99,11 +116,14 @@ from common.helpers.parse_duration import parse_time_duration
 
 from common.types.boolean import Boolean
 from devices.xbee.xbee_device_manager.xbee_device_manager_configurator \
-    import XBeeDeviceManagerConfigurator
+    import XBeeDeviceManagerConfigurator, \
+    XBeeDeviceManagerPipelinedConfigurator, RADIO_DDO_CAPACITY
 from devices.xbee.xbee_device_manager.xbee_device_state import XBeeDeviceState
 from devices.xbee.xbee_device_manager.xbee_ddo_param_cache \
     import XBeeDDOParamCache
 from devices.xbee.xbee_device_manager.xbee_device_manager_event_specs import *
+from devices.xbee.xbee_device_manager.xbee_rx_dispatch_index import \
+    XBeeRxDispatchIndex
 from devices.xbee.xbee_config_blocks.xbee_config_block_final_write import \
     XBeeConfigBlockFinalWrite
 from devices.xbee.xbee_config_blocks.xbee_config_block_wakeup import \
@@ -145,6 +165,14 @@ class XBeeDeviceManagerStateException(Exception):
     pass
 
 
+class XBeeDeviceManagerXmitQueueFull(Exception):
+    '''
+    Raised by xbee_device_xmit() when the endpoint's transmit queue
+    is full and the overflow policy is to reject new frames.
+    '''
+    pass
+
+
 class XBeeDeviceManagerBadBindpointException(Exception):
     '''
     Raised when an improperly formatted bindpoint is passed
@@ -166,15 +194,57 @@ class XBeeEndpoint(object):
     '''
         This class stores the data for a given XBee endpoint.
         This includes the file description of our socket,
-        the receive queue and a use reference count.
+        the transmit queue and a use reference count.
+
+        Transmits are paced by a token bucket holding up to
+        `xmit_burst` frames and refilled at `xmit_rate` frames per
+        second.  A rate of 0 leaves the endpoint unpaced.
 
     '''
-    __slots__ = ['reference_count', 'sd', 'xmit_q']
+    __slots__ = ['reference_count', 'sd', 'xmit_q', 'xmit_queue_size',
+                 'xmit_rate', 'xmit_burst', 'tokens', 'stamp',
+                 'sent', 'queued', 'dropped', 'rejected']
 
-    def __init__(self, sd):
+    def __init__(self, sd, xmit_queue_size=XMIT_QUEUE_SIZE,
+                 xmit_rate=XMIT_RATE, xmit_burst=XMIT_BURST):
         self.reference_count = 0
         self.sd = sd
-        self.xmit_q = []
+        self.xmit_q = deque()
+        self.xmit_queue_size = xmit_queue_size
+        self.xmit_rate = xmit_rate
+        self.xmit_burst = xmit_burst
+        self.tokens = float(xmit_burst)
+        self.stamp = digitime.time()
+        self.sent = 0
+        self.queued = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def xmit_wait(self, now):
+        '''
+        Refill the token bucket.  Returns 0 if a frame may be sent
+        now, otherwise the number of seconds until one may be.
+        '''
+        if not self.xmit_rate:
+            return 0
+        self.tokens = min(float(self.xmit_burst),
+                          self.tokens + (now - self.stamp) * self.xmit_rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.xmit_rate
+
+    def xmit_sent(self):
+        ''' Account for a frame written to the socket. '''
+        self.sent += 1
+        if self.xmit_rate:
+            self.tokens -= 1
+
+    def stats(self):
+        ''' Returns a dictionary of transmit counters. '''
+        return {'depth': len(self.xmit_q), 'sent': self.sent,
+                'queued': self.queued, 'dropped': self.dropped,
+                'rejected': self.rejected}
 
 
 class XBeeDeviceManager(DeviceBase, threading.Thread):
@@ -212,6 +282,36 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
         * **worker_threads:** Number of handles to manage background tasks in
           the Dia framework. Not required, 1 by default.
 
+        * **config_pipeline:** If True, nodes waiting for configuration are
+          queued and handed to the next free worker, most recently heard
+          first, instead of being rescheduled a sleep period later.
+          Not required, False by default.
+
+        * **config_nodes:** Number of nodes the pipeline configures at
+          once, at most 8. Not required, 4 by default.
+
+        * **ddo_cache_file:** File in which DDO parameter values learned
+          from remote nodes are kept across restarts, so a warm start
+          does not have to query every node again. Values are written
+          back at most once a minute and when the manager stops.
+          Not required, empty (no file) by default.
+
+        * **xmit_queue_size:** Number of frames each endpoint holds while
+          its socket cannot accept more. Not required, 64 by default.
+
+        * **xmit_rate:** Maximum frames per second sent from each
+          endpoint. Not required, 0 (unpaced) by default.
+
+        * **xmit_burst:** Number of frames an endpoint may send back to
+          back, and the most sent from it per pass of the I/O loop.
+          Not required, 8 by default.
+
+        * **xmit_overflow:** What xbee_device_xmit() does when an
+          endpoint's queue is full: 'reject' raises
+          XBeeDeviceManagerXmitQueueFull to the caller, 'drop_oldest'
+          discards the oldest queued frame to make room. Not required,
+          'reject' by default.
+
     '''
     MINIMUM_RESCHEDULE_TIME = 10
 
@@ -247,9 +347,19 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
         self.__xbee_device_states = {}
         self.__xbee_ddo_param_cache = XBeeDDOParamCache()
         self.__xbee_node_list = []
-        # Event specs are stored as tuples (spec, device_state):
-        self.__rx_event_spec_state_map = {False: []}
+        # RX event specs, indexed by the frame source they match:
+        self.__rx_dispatch = XBeeRxDispatchIndex()
         self.__xbee_endpoints = {}
+        # Select wait lists, rebuilt when endpoints come and go:
+        self.__read_list = None
+        # Endpoints with frames waiting to be sent:
+        self.__xmit_pending = {}
+        self.__xmit_pace_wait = None
+        # Completion times behind the config_rate channel:
+        self.__config_done_times = deque()
+        self.__config_done_count = 0
+        self.__config_rate = 0.0
+        self.__config_pipeline = False
         self.__xbee_module_type = None
         self.__behavior_flags = 0
 
@@ -304,6 +414,32 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
             Setting(
                 name="update_skiplist", type=Boolean, required=False,
                 default_value=Boolean(False)),
+            Setting(
+                name='config_pipeline', type=Boolean, required=False,
+                default_value=Boolean(False)),
+            Setting(
+                name='config_nodes', type=int, required=False,
+                default_value=CONFIG_NODES,
+                verify_function=lambda x: 1 <= x <= RADIO_DDO_CAPACITY),
+            Setting(
+                name='ddo_cache_file', type=str, required=False,
+                default_value=''),
+            Setting(
+                name='xmit_queue_size', type=int, required=False,
+                default_value=XMIT_QUEUE_SIZE,
+                verify_function=lambda x: x >= 1),
+            Setting(
+                name='xmit_rate', type=float, required=False,
+                default_value=float(XMIT_RATE),
+                verify_function=lambda x: x >= 0),
+            Setting(
+                name='xmit_burst', type=int, required=False,
+                default_value=XMIT_BURST,
+                verify_function=lambda x: x >= 1),
+            Setting(
+                name='xmit_overflow', type=str, required=False,
+                default_value=XMIT_OVERFLOW_REJECT,
+                verify_function=lambda x: x in XMIT_OVERFLOW_POLICIES),
 
             # valid settings are including:
             # - None/'none'/False/'false' = don't effect DH/DL at all
@@ -327,6 +463,21 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
                 verify_function=self.__verify_dh_dl_min),
         ])
 
+        ## Channel Properties Definition:
+        property_list.extend([
+            # commissioning throughput over the last CONFIG_RATE_WINDOW:
+            ChannelSourceDeviceProperty(
+                name='config_rate', type=float,
+                initial=Sample(timestamp=0, value=0.0, unit='nodes/min'),
+                perms_mask=DPROP_PERM_GET,
+                options=DPROP_OPT_AUTOTIMESTAMP),
+            ChannelSourceDeviceProperty(
+                name='config_done', type=int,
+                initial=Sample(timestamp=0, value=0, unit='nodes'),
+                perms_mask=DPROP_PERM_GET,
+                options=DPROP_OPT_AUTOTIMESTAMP),
+        ])
+
         ## Initialize the Devicebase interface:
         DeviceBase.__init__(self, name, core_services,
                                 settings_list, property_list)
@@ -357,8 +508,15 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
                                     " Check that no other programs are running"
                                     " or are set to run on the device. ") % (
                                         endpoint))
+                # A full socket must not block the caller: the frame
+                # is queued on the endpoint instead.
+                sd.setblocking(0)
 
-                self.__xbee_endpoints[endpoint] = XBeeEndpoint(sd)
+                self.__xbee_endpoints[endpoint] = XBeeEndpoint(sd,
+                    SettingsBase.get_setting(self, "xmit_queue_size"),
+                    SettingsBase.get_setting(self, "xmit_rate"),
+                    SettingsBase.get_setting(self, "xmit_burst"))
+                self.__read_list = None
 
             self.__xbee_endpoints[endpoint].reference_count += 1
             self._tracer.xbee("__endpoint_add(): reference_count now = %d",
@@ -380,6 +538,8 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
             if not self.__xbee_endpoints[endpoint].reference_count:
                 self.__xbee_endpoints[endpoint].sd.close()
                 del(self.__xbee_endpoints[endpoint])
+                self.__xmit_pending.pop(endpoint, None)
+                self.__read_list = None
         finally:
             self.__lock.release()
 
@@ -427,58 +587,46 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
 
     def __select_rx_cbs_for(self, buf, addr):
         self._tracer.xbee("__select_rx_cbs_for(%s, %s)", buf, addr)
-        self.__lock.acquire()
 
-        #We create a one time use list that contains all rx_events that
-        #at least match the mac address element.  This reduces the testing
-        #set drastically.
-
-        #All entries after hash comparison match the mac address element,
-        #So additional address checks are not performed.
-
-        proc_list = []
-        if addr[0] in self.__rx_event_spec_state_map:
-            proc_list = proc_list + self.__rx_event_spec_state_map[addr[0]]
-        proc_list += self.__rx_event_spec_state_map[False]
+        # The dispatch index resolves the frame's (mac, endpoint,
+        # profile, cluster) to the specs whose match test passes, and
+        # to the device states registered for this node (or for any
+        # node).  Only the device state checks are made per frame.
+        callbacks = []
+        self.__lock.acquire()
+        try:
+            states, entries = self.__rx_dispatch.lookup(addr)
 
-        for rx_event, state in proc_list:
             # Update the time we last heard from the node:
-            state.last_heard_from_set(digitime.time())
-            if not state.is_running():
-#                self._tracer.xbee("__select_rx_cbs_for(): cb not made, " +
-#                                    "device %s not running.",
-#                                    (str(rx_event.match_spec_get()[0])))
-#
-#                self._tracer.xbee("__select_rx_cbs_for(): device is in " +
-#                                    "state: %d", state._get_state())
-                continue
+            now = digitime.time()
+            for state in states:
+                state.last_heard_from_set(now)
+
+            for rx_event, state, config_only in entries:
+                if not state.is_running():
+                    continue
 
-            if isinstance(rx_event, XBeeDeviceManagerRxConfigEventSpec):
-                if not state.is_config_active():
+                if config_only and not state.is_config_active():
                     self._tracer.xbee('__select_rx_cbs_for(): cb ' \
                                     'not made, device %s not configured. ' \
                                     '(in state %s)',
                                     (str(rx_event.match_spec_get()[0])))
                     continue
 
-            if not rx_event.match_spec_test(addr, mac_prematch=True):
-                self._tracer.xbee('__select_rx_cbs_for(%s): cb not made,'\
-                                    ' test failed. (Spec was %s)',
-                                    str(addr),
-                                    str(rx_event.match_spec_get()))
-                continue
+                callbacks.append(rx_event.cb_get())
+        finally:
+            self.__lock.release()
 
+        # Driver callbacks are made without the lock held, so a slow
+        # driver does not stall spec registration or the xmit path.
+        for cb in callbacks:
             try:
-                rx_event.cb_get()(buf, addr)
+                cb(buf, addr)
             except Exception:
                 # exceptions in driver callbacks are non-fatal to us
                 self._tracer.error('Exception during rx callback for ' +
                                     'addr = %s',  str(addr))
                 self._tracer.debug(traceback.format_exc())
-                pass
-
-        self.__lock.release()
-        return
 
     def __convert_to_lower(self, a):
         if a == None:
@@ -537,6 +685,7 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
         self._tracer.calls("XBeeDeviceManager.stop()")
 
         self.__xbee_configurator.stop()
+        self.__ddo_param_cache_flush(reschedule=False)
 
         self.__stopevent.set()
         self.__unblock_inner_select()
@@ -558,23 +707,36 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
         helper for run()
 
         Returns (read_list, write_list, sd_to_endpoint_map)
+
+        Endpoints whose token bucket is empty are left out of the
+        write list; the time until the first of them may send again
+        is kept for the select() timeout.
         '''
         self.__lock.acquire()
-        # Build wait lists for select()
-        rl = [self._inner_sd]
-        rl += [self.__xbee_endpoints[ep].sd for ep in \
-               self.__xbee_endpoints]
-
-        wl = []
-        sd_to_endpoint_map = dict()
-        # While building wl, build the sd_to_endpoint map:
-        for ep in filter(lambda ep: len(self.__xbee_endpoints[ep].xmit_q),
-                    self.__xbee_endpoints):
-            sd = self.__xbee_endpoints[ep].sd
-            wl.append(sd)
-            sd_to_endpoint_map[sd] = ep
-        self.__lock.release()
-        return rl, wl, sd_to_endpoint_map
+        try:
+            if self.__read_list is None:
+                self.__read_list = [self._inner_sd] + \
+                    [self.__xbee_endpoints[ep].sd for ep in \
+                     self.__xbee_endpoints]
+
+            wl = []
+            sd_to_endpoint_map = dict()
+            pace_wait = None
+            if self.__xmit_pending:
+                now = digitime.time()
+                for ep, endpoint in self.__xmit_pending.iteritems():
+                    wait = endpoint.xmit_wait(now)
+                    if wait:
+                        if pace_wait is None or wait < pace_wait:
+                            pace_wait = wait
+                        continue
+                    wl.append(endpoint.sd)
+                    sd_to_endpoint_map[endpoint.sd] = ep
+            self.__xmit_pace_wait = pace_wait
+
+            return self.__read_list, wl, sd_to_endpoint_map
+        finally:
+            self.__lock.release()
 
     def _process_reads(self, rl):
         '''
@@ -610,21 +772,49 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
             if self.network_asleep():
                 return
 
-            # N.B: the entire xmit queue is not drained here
-            # for better interleaving of reads with writes.
-            self.__lock.acquire()
-            try:
-                ep = sd_to_endpoint_map[sd]
-                buf, addr = self.__xbee_endpoints[ep].xmit_q[0]
+            # N.B: up to a burst of frames is sent from each endpoint
+            # so that reads are still interleaved with writes.  Each
+            # frame is sent without the lock held and stays at the head
+            # of the queue until it is written, which keeps later
+            # frames behind it.
+            ep = sd_to_endpoint_map[sd]
+            sent = 0
+            while 1:
+                self.__lock.acquire()
+                try:
+                    endpoint = self.__xbee_endpoints.get(ep)
+                    if endpoint is None or sent >= endpoint.xmit_burst:
+                        break
+                    xmit_q = endpoint.xmit_q
+                    if not xmit_q or endpoint.xmit_wait(digitime.time()):
+                        break
+                    item = xmit_q[0]
+                finally:
+                    self.__lock.release()
+
+                buf, addr = item
                 try:
                     num_bytes = sd.sendto(buf, 0, addr)
-                    # print "XBeeDeviceManager: xmit wrote %d bytes" % \
-                    # (num_bytes)
                 except socket.error:
-                # xmit of message failed, will retry in select() loop
-                    continue
-                # xmit succeeded, de-queue message:
-                self.__xbee_endpoints[ep].xmit_q.pop(0)
+                    # xmit of message failed, will retry in select() loop
+                    break
+
+                # xmit succeeded, de-queue message unless the overflow
+                # policy has already dropped it:
+                self.__lock.acquire()
+                try:
+                    if xmit_q and xmit_q[0] is item:
+                        xmit_q.popleft()
+                    endpoint.xmit_sent()
+                finally:
+                    self.__lock.release()
+                sent += 1
+
+            self.__lock.acquire()
+            try:
+                endpoint = self.__xmit_pending.get(ep)
+                if endpoint is not None and not endpoint.xmit_q:
+                    del self.__xmit_pending[ep]
             finally:
                 self.__lock.release()
 
@@ -665,11 +855,28 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
 
         self._tracer.calls("XBeeDeviceManager.run()")
 
+        ddo_cache_file = SettingsBase.get_setting(self, "ddo_cache_file")
+        if ddo_cache_file:
+            loaded = self.__xbee_ddo_param_cache.load(ddo_cache_file)
+            self._tracer.info("loaded %d DDO values from '%s'",
+                              loaded, ddo_cache_file)
+            self.xbee_device_schedule_after(DDO_CACHE_FLUSH_INTERVAL,
+                                            self.__ddo_param_cache_flush)
+        self.xbee_device_schedule_after(CONFIG_RATE_INTERVAL,
+                                        self.__config_rate_tick)
+
         # TODO: dynamically determine how many parallel DDO requests may take
         #       place and give that number to the configurator.
-        self.__xbee_configurator = \
-            XBeeDeviceManagerConfigurator(self,
-                SettingsBase.get_setting(self, "worker_threads"))
+        self.__config_pipeline = bool(
+            SettingsBase.get_setting(self, "config_pipeline"))
+        if self.__config_pipeline:
+            self.__xbee_configurator = \
+                XBeeDeviceManagerPipelinedConfigurator(self,
+                    SettingsBase.get_setting(self, "config_nodes"))
+        else:
+            self.__xbee_configurator = \
+                XBeeDeviceManagerConfigurator(self,
+                    SettingsBase.get_setting(self, "worker_threads"))
 
         module_id, product_id = self._identify_xbee()
 
@@ -738,8 +945,14 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
                 rl, wl, endpoint_map = self._build_wait_lists()
                 self.wait_for_awake()
 
+                # Wake up in time for paced endpoints to send again:
+                timeout = self._select_timeout
+                if self.__xmit_pace_wait is not None and \
+                       (timeout is None or self.__xmit_pace_wait < timeout):
+                    timeout = self.__xmit_pace_wait
+
                 # Wait for there is work for us to perform:
-                rl, wl, _ = select(rl, wl, [], self._select_timeout)
+                rl, wl, _ = select(rl, wl, [], timeout)
 
                 if self._process_reads(rl):
                     # we got an internal unblock event
@@ -1062,22 +1275,16 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
         try:
             # Add the event spec, processed by spec type:
             if isinstance(event_spec, XBeeDeviceManagerRxEventSpec):
-                # RxEventSpecs get added to a special list in the manager:
+                # RxEventSpecs get added to the dispatch index:
                 spec = event_spec.match_spec_get()
-                norm_address = normalize_address(spec[0][0])
-
                 if spec[1][0] == False:
-                    self.__rx_event_spec_state_map[False].append(
-                        (event_spec, self.__xbee_device_states[instance]))
+                    address = False
                 else:
-                    if not self.__rx_event_spec_state_map.\
-                           has_key(norm_address):
-                        self.__rx_event_spec_state_map[norm_address] = []
-                    self.__rx_event_spec_state_map[norm_address].append(
-                            (event_spec, self.__xbee_device_states[instance]))
-
-#                self.__rx_event_spec_state_map.append(
-#                    (event_spec, self.__xbee_device_states[instance]))
+                    address = normalize_address(spec[0][0])
+                self.__rx_dispatch.add(address, event_spec,
+                    self.__xbee_device_states[instance],
+                    config_only=isinstance(event_spec,
+                                        XBeeDeviceManagerRxConfigEventSpec))
                 # The endpoint is registered and the ext_addr is added to the
                 # device state:
                 # (get_listen_endpoint is a function, because some protocols
@@ -1121,12 +1328,10 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
                 try:
                     spec = event_spec.match_spec_get()
                     if spec[1][0] == False:
-                        self.__rx_event_spec_state_map[False].remove(
-                                              (event_spec, state))
+                        address = False
                     else:
-                        norm_addr = normalize_address(spec[0][0])
-                        rmobj = (event_spec, state)
-                        self.__rx_event_spec_state_map[norm_addr].remove(rmobj)
+                        address = normalize_address(spec[0][0])
+                    self.__rx_dispatch.remove(address, event_spec, state)
                 except:
                     raise XBeeDeviceManagerEventSpecNotFound(
                         'event specification not found')
@@ -1295,29 +1500,96 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
         Transmit buf to addr using endpoint number src_ep.  Returns None.
 
         If the transmit can not complete immediately, the transmit
-        will be scheduled.
+        will be scheduled.  Frames are queued in order behind any
+        already waiting on the endpoint, and while the endpoint's
+        `xmit_rate` is used up.
+
+        When the endpoint's queue is full, the `xmit_overflow` setting
+        applies: with 'reject' an XBeeDeviceManagerXmitQueueFull
+        exception is raised and buf is not sent, with 'drop_oldest'
+        the oldest queued frame is discarded to make room.
 
         '''
+        self.__lock.acquire()
+        try:
+            if src_ep not in self.__xbee_endpoints:
+                raise XBeeDeviceManagerEndpointNotFound(
+                    "error during xmit, source endpoint 0x%02x not found." % \
+                        (src_ep))
 
-        if src_ep not in self.__xbee_endpoints:
-            raise XBeeDeviceManagerEndpointNotFound(
-                "error during xmit, source endpoint 0x%02x not found." % \
-                    (src_ep))
+            endpoint = self.__xbee_endpoints[src_ep]
+            send_now = (not endpoint.xmit_q and
+                        not endpoint.xmit_wait(digitime.time()))
+        finally:
+            self.__lock.release()
 
-        sd = self.__xbee_endpoints[src_ep].sd
+        # The socket is non-blocking, but it is still written without
+        # the lock held so that other drivers and the receive path are
+        # never held up behind a send:
+        if send_now:
+            try:
+                num_bytes = endpoint.sd.sendto(buf, 0, addr)
+            except socket.error, e:
+                if e[0] != errno.EWOULDBLOCK:
+                    raise e
+            else:
+                self.__lock.acquire()
+                try:
+                    endpoint.xmit_sent()
+                finally:
+                    self.__lock.release()
+                self._tracer.xbee('xmit wrote %d bytes' % num_bytes)
+                return
+
+        wake = False
+        self.__lock.acquire()
         try:
-            num_bytes = sd.sendto(buf, 0, addr)
-            self._tracer.xbee('xmit wrote %d bytes' % num_bytes)
-            return
-        except socket.error, e:
-            if e[0] == errno.EWOULDBLOCK:
-                pass
-            raise e
+            if self.__xbee_endpoints.get(src_ep) is not endpoint:
+                raise XBeeDeviceManagerEndpointNotFound(
+                    "error during xmit, source endpoint 0x%02x not found." % \
+                        (src_ep))
+
+            # Buffer transmission:
+            if len(endpoint.xmit_q) >= endpoint.xmit_queue_size:
+                if SettingsBase.get_setting(self, "xmit_overflow") == \
+                       XMIT_OVERFLOW_DROP_OLDEST:
+                    endpoint.xmit_q.popleft()
+                    endpoint.dropped += 1
+                    self._tracer.warning('xmit queue for endpoint 0x%02x ' \
+                                         'full, dropped oldest frame', src_ep)
+                else:
+                    endpoint.rejected += 1
+                    raise XBeeDeviceManagerXmitQueueFull(
+                        "xmit queue for endpoint 0x%02x full (%d frames)" % \
+                            (src_ep, len(endpoint.xmit_q)))
+            endpoint.xmit_q.append((buf, addr))
+            endpoint.queued += 1
+            if src_ep not in self.__xmit_pending:
+                self.__xmit_pending[src_ep] = endpoint
+                wake = True
+        finally:
+            self.__lock.release()
 
-        # Buffer transmission:
-        self.__xbee_endpoints[src_ep].xmit_q.append((buf, addr))
         # Indicate to I/O handling thread we have a new event:
-        self.__unblock_inner_select()
+        if wake:
+            self.__unblock_inner_select()
+
+    def xbee_device_xmit_stats(self):
+        '''
+        Returns a dictionary of transmit counters keyed by endpoint
+        number.
+
+        Each value holds the current queue 'depth' and the number of
+        frames 'sent', 'queued' for later sending, 'dropped' from a
+        full queue and 'rejected' because the queue was full.
+
+        '''
+        self.__lock.acquire()
+        try:
+            return dict([(ep, self.__xbee_endpoints[ep].stats())
+                         for ep in self.__xbee_endpoints])
+        finally:
+            self.__lock.release()
 
     def xbee_get_node_list(self, refresh=False, clear=False):
         '''
@@ -1498,8 +1770,15 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
                     pass
 
                 xbee_state.goto_config_scheduled()
-                wait_time = max(xbee_state.xbee_sleep_period_sec() * multiple,
-                                self.MINIMUM_RESCHEDULE_TIME)
+                sleep_period = xbee_state.xbee_sleep_period_sec()
+                wait_time = sleep_period * multiple
+                last_heard = xbee_state.last_heard_from_get()
+                if self.__config_pipeline and sleep_period and \
+                       last_heard is not None:
+                    # Aim for the node's next expected wake rather than
+                    # whole sleep periods from now:
+                    wait_time -= (digitime.time() - last_heard) % sleep_period
+                wait_time = max(wait_time, self.MINIMUM_RESCHEDULE_TIME)
                 xbee_state.configuration_sched_handle_set(
                     self.xbee_device_schedule_after(
                         wait_time,
@@ -1543,6 +1822,7 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
         self.__lock.acquire()
         try:
             xbee_state.goto_running()
+            self.__config_rate_update()
         finally:
             self.__lock.release()
 
@@ -1554,11 +1834,82 @@ class XBeeDeviceManager(DeviceBase, threading.Thread):
 
                 self.set_pending_setting("skip_config_addr_list", skiplist)
                 self.apply_settings()
-                self._core.save_settings()
+                self._core.request_save_settings()
             except Exception, e:
                 self._tracer.error("Failed to update " +
                                     "configuration file: %s", str(e))
 
+    def __config_rate_update(self):
+        '''
+        Account for a node reaching the running state and update the
+        config_rate and config_done channels.
+        '''
+        now = digitime.time()
+        self.__config_done_times.append(now)
+        self.__config_done_count += 1
+
+        self.__config_rate_refresh(now)
+        self.property_set('config_done',
+                          Sample(0, value=self.__config_done_count,
+                                 unit='nodes'))
+
+    def __config_rate_refresh(self, now):
+        '''
+        Drop completions older than CONFIG_RATE_WINDOW and update the
+        config_rate channel if the rate has changed.
+        '''
+        times = self.__config_done_times
+        while times and now - times[0] > CONFIG_RATE_WINDOW:
+            times.popleft()
+
+        rate = 0.0
+        if len(times) > 1 and now > times[0]:
+            rate = (len(times) - 1) * 60.0 / (now - times[0])
+        if rate != self.__config_rate:
+            self.__config_rate = rate
+            self.property_set('config_rate',
+                              Sample(0, value=rate, unit='nodes/min'))
+
+    def __config_rate_tick(self):
+        '''
+        Periodically refresh config_rate so that it decays once nodes
+        stop completing their configuration.
+        '''
+        self.__lock.acquire()
+        try:
+            try:
+                self.__config_rate_refresh(digitime.time())
+            except Exception, e:
+                self._tracer.error("Failed to update config_rate: %s",
+                                   str(e))
+        finally:
+            self.__lock.release()
+
+        if not self.__stopevent.isSet():
+            self.xbee_device_schedule_after(CONFIG_RATE_INTERVAL,
+                                            self.__config_rate_tick)
+
+    def xbee_device_ddo_param_cache_stats(self):
+        '''
+        Returns a dictionary of the DDO parameter cache's hit, miss and
+        expiry counters, and of how many nodes and values it holds.
+
+        '''
+        return self.__xbee_ddo_param_cache.stats()
+
+    def __ddo_param_cache_flush(self, reschedule=True):
+        '''
+        Write the DDO parameter cache back to its file if it changed.
+        '''
+        try:
+            self.__xbee_ddo_param_cache.flush()
+        except Exception, e:
+            self._tracer.error("Failed to write DDO cache file: %s", str(e))
+
+        if reschedule and not self.__stopevent.isSet():
+            self.xbee_device_schedule_after(DDO_CACHE_FLUSH_INTERVAL,
+                                            self.__ddo_param_cache_flush)
+
     def _xbee_device_ddo_param_cache_get(self, dest, param):
         '''Fetch a cached DDO value for a given destination.'''
         return self.__xbee_ddo_param_cache.cache_get(dest, param)
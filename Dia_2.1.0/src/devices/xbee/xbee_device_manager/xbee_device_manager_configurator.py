@@ -52,6 +52,10 @@ from core.tracing import get_tracer
 
 MAX_BLOCK = 5.0  # # of seconds to sit on a lock before checking conditions
 
+# Remote DDO requests the gateway radio can usefully have outstanding
+# at once; the pipelined configurator runs no more nodes than this.
+RADIO_DDO_CAPACITY = 8
+
 # classes
 class XBeeDeviceManagerConfigurator(object):
     '''
@@ -76,8 +80,7 @@ class XBeeDeviceManagerConfigurator(object):
 
         # Create an equal number of worker threads to the number of
         # allowed parallel DDO requests:
-        self.__workers = [XBeeDeviceManagerConfiguratorWorker() for i \
-                            in range(num_ddo_resources)]
+        self.__workers = self._create_workers(num_ddo_resources)
         self.__allworkers = copy(self.__workers)
 
         self.__tracer = get_tracer('XBeeDeviceManagerConfigurator')
@@ -131,32 +134,9 @@ class XBeeDeviceManagerConfigurator(object):
             if result is not None:
                 return result
 
-        if dest is not None:
-            if blocking:
-                # block until awake
-                while not self.__xbee_device_manager._awakeEvent.isSet():
-                    # kill signal
-                    if not self.__running:
-                        return False
-                    self.__xbee_device_manager._awakeEvent.wait(MAX_BLOCK)
-            else:
-                # in non-blocking, if the node is not awake, simply
-                # return False
-                if not self.__xbee_device_manager._awakeEvent.isSet():
-                    return False
-
-        blocked = self.__ddo_semaphore.acquire(blocking=blocking)
-        if not blocked:
-            # didn't want to block
+        if not self.__ddo_acquire(dest, blocking):
             return False
 
-        # HACK: wait for running network discovery call to finish
-        while not self.__xbee_device_manager.NETWORK_DISCOVER_HACK.isSet():
-            # killed
-            if not self.__running:
-                return False
-            self.__xbee_device_manager.NETWORK_DISCOVER_HACK.wait(MAX_BLOCK)
-
         try:
             result = retry_ddo_get_param(retries, dest, param, timeout)
             # Update the parameter cache:
@@ -190,32 +170,9 @@ class XBeeDeviceManagerConfigurator(object):
 
         result = None
 
-        if dest is not None:
-            if blocking:
-                # block until awake
-                while not self.__xbee_device_manager._awakeEvent.isSet():
-                    # kill signal
-                    if not self.__running:
-                        return False
-                    self.__xbee_device_manager._awakeEvent.wait(MAX_BLOCK)
-            else:
-                # in non-blocking, if the node is not awake, simply
-                # return False
-                if not self.__xbee_device_manager._awakeEvent.isSet():
-                    return False
-
-        blocked = self.__ddo_semaphore.acquire(blocking=blocking)
-        if not blocked:
-            # didn't want to block
+        if not self.__ddo_acquire(dest, blocking):
             return False
 
-        # HACK: wait for running network discovery call to finish
-        while not self.__xbee_device_manager.NETWORK_DISCOVER_HACK.isSet():
-            # killed
-            if not self.__running:
-                return False
-            self.__xbee_device_manager.NETWORK_DISCOVER_HACK.wait(MAX_BLOCK)
-
         behavior_flags = self.__xbee_device_manager._get_behavior_flags()
         try:
             if (behavior_flags & BEHAVIOR_HAS_ATOMIC_DDO):
@@ -241,6 +198,52 @@ class XBeeDeviceManagerConfigurator(object):
 
         return result
 
+    def ddo_set_params(self, dest, params, timeout=GLOBAL_DDO_TIMEOUT,
+                       retries=3, blocking=True):
+        """
+        Set a number of DDO parameters on a node in a single round.
+
+        `params` is a list of (mnemonic, value) tuples.  The network
+        is waited on and a DDO resource taken once for the whole list
+        rather than once per parameter.  Where the gateway supports
+        atomic DDO the values are queued on the node (apply=False) and
+        take effect together at the next applied AC or WR, such as the
+        one sent by XBeeConfigBlockFinalWrite.
+
+        The DDO parameter cache is updated for each parameter which
+        was set.
+
+        Returns a list of (mnemonic, exception) tuples for the
+        parameters which could not be set.
+
+        Returns False if blocking=False and the method would block.
+        """
+
+        if not self.__ddo_acquire(dest, blocking):
+            return False
+
+        behavior_flags = self.__xbee_device_manager._get_behavior_flags()
+        failures = []
+        try:
+            for param, value in params:
+                try:
+                    if (behavior_flags & BEHAVIOR_HAS_ATOMIC_DDO):
+                        retry_ddo_set_param(retries, dest, param, value,
+                                            timeout, apply=False)
+                    else:
+                        retry_ddo_set_param(retries, dest, param, value,
+                                            timeout)
+                except Exception, e:
+                    failures.append((param, e))
+                    continue
+
+                self.__xbee_device_manager._xbee_device_ddo_param_cache_set(
+                    dest, param, value)
+        finally:
+            self.__ddo_semaphore.release()
+
+        return failures
+
     def configure(self, xbee_state):
         # print ("XBeeDeviceManagerConfigurator: request to" +
         #                " configure node '%s'") % \
@@ -285,6 +288,42 @@ class XBeeDeviceManagerConfigurator(object):
         return self.__xbee_device_manager
 
     # Private API:
+    def _create_workers(self, count):
+        return [XBeeDeviceManagerConfiguratorWorker() for i in range(count)]
+
+    def __ddo_acquire(self, dest, blocking):
+        # Wait for the network to be awake and take a DDO resource.
+        # Returns False, holding nothing, if blocking=False and this
+        # would block or if the configurator is stopped.
+        if dest is not None:
+            if blocking:
+                # block until awake
+                while not self.__xbee_device_manager._awakeEvent.isSet():
+                    # kill signal
+                    if not self.__running:
+                        return False
+                    self.__xbee_device_manager._awakeEvent.wait(MAX_BLOCK)
+            else:
+                # in non-blocking, if the node is not awake, simply
+                # return False
+                if not self.__xbee_device_manager._awakeEvent.isSet():
+                    return False
+
+        blocked = self.__ddo_semaphore.acquire(blocking=blocking)
+        if not blocked:
+            # didn't want to block
+            return False
+
+        # HACK: wait for running network discovery call to finish
+        while not self.__xbee_device_manager.NETWORK_DISCOVER_HACK.isSet():
+            # killed
+            if not self.__running:
+                self.__ddo_semaphore.release()
+                return False
+            self.__xbee_device_manager.NETWORK_DISCOVER_HACK.wait(MAX_BLOCK)
+
+        return True
+
     def _configuration_done(self, by_worker, xbee_state):
         # Our worker has called us back, indicating that it has finished:
         self.__workers.append(by_worker)
@@ -394,3 +433,136 @@ class XBeeDeviceManagerConfiguratorWorker(threading.Thread):
 
             if complete_cb:
                 complete_cb(self, return_val)
+
+
+class XBeeDeviceManagerPipelinedConfigurator(XBeeDeviceManagerConfigurator):
+    '''
+    XBee Device Manager Configurator which queues nodes rather than
+    deferring them.
+
+    Nodes handed to configure() while every worker is busy wait in a
+    queue instead of being rescheduled a sleep period later.  Each
+    worker takes the queued node which was heard from most recently,
+    as it is the one most likely to be awake, and moves straight on to
+    the next node when it is done.
+
+    Keyword arguments:
+
+    * **xbee_device_manager:** the xbee device mananger instance
+    * **num_ddo_resources:** the number of nodes configured at once,
+      at most RADIO_DDO_CAPACITY
+    '''
+    def __init__(self, xbee_device_manager, num_ddo_resources=1):
+        self.__pending = []
+        self.__cond = threading.Condition()
+        self.__running = True
+
+        num_ddo_resources = max(1, min(num_ddo_resources,
+                                       RADIO_DDO_CAPACITY))
+        XBeeDeviceManagerConfigurator.__init__(self, xbee_device_manager,
+                                               num_ddo_resources)
+        self.__tracer = get_tracer('XBeeDeviceManagerPipelinedConfigurator')
+
+    def stop(self):
+        self.__cond.acquire()
+        try:
+            self.__running = False
+            self.__cond.notifyAll()
+        finally:
+            self.__cond.release()
+        XBeeDeviceManagerConfigurator.stop(self)
+
+    def configure(self, xbee_state):
+        xbee_device_manager = self.xbee_device_manager_get()
+        xbee_device_manager._state_lock()
+        try:
+            # Increment the number of config attempts in the state object:
+            config_attempts = xbee_state.config_attempts_get()
+            xbee_state.config_attempts_set(config_attempts + 1)
+
+            if xbee_state.is_config_active():
+                # Already queued or being configured by a worker.
+                return False
+
+            xbee_state.goto_config_active()
+        finally:
+            xbee_device_manager._state_unlock()
+
+        self.__cond.acquire()
+        try:
+            self.__pending.append(xbee_state)
+            self.__cond.notify()
+            self.__tracer.info("Queued node '%s' for configuration " +
+                               "(%d waiting)", xbee_state.ext_addr_get(),
+                               len(self.__pending))
+        finally:
+            self.__cond.release()
+
+    def pending_count(self):
+        """Returns the number of nodes waiting for a worker."""
+        return len(self.__pending)
+
+    # Private API:
+    def _create_workers(self, count):
+        return [XBeeDeviceManagerPipelineWorker(self) for i in range(count)]
+
+    def _next_node(self):
+        # Called by the workers.  Blocks until a node is queued and
+        # returns it, or returns None once the configurator is stopped.
+        self.__cond.acquire()
+        try:
+            while self.__running and not self.__pending:
+                self.__cond.wait(MAX_BLOCK)
+            if not self.__running:
+                return None
+
+            # The last heard time is updated by the receive path while
+            # nodes wait, so the queue is scanned rather than kept
+            # sorted:
+            best = 0
+            best_heard = self.__pending[0].last_heard_from_get()
+            for i in xrange(1, len(self.__pending)):
+                heard = self.__pending[i].last_heard_from_get()
+                if heard is not None and \
+                       (best_heard is None or heard > best_heard):
+                    best, best_heard = i, heard
+            return self.__pending.pop(best)
+        finally:
+            self.__cond.release()
+
+    def _configuration_done(self, by_worker, xbee_state):
+        self.xbee_device_manager_get().\
+                    _xbee_device_configuration_done(xbee_state)
+
+
+class XBeeDeviceManagerPipelineWorker(XBeeDeviceManagerConfiguratorWorker):
+    """
+    Worker thread for the XBeeDeviceManagerPipelinedConfigurator.
+
+    Rather than being handed one node at a time, the worker takes nodes
+    from its configurator's queue until the configurator is stopped.
+    """
+    def __init__(self, configurator):
+        XBeeDeviceManagerConfiguratorWorker.__init__(self)
+        self.__configurator = configurator
+        self.__tracer = get_tracer("XBeeDeviceManagerPipelineWorker")
+
+    def run(self):
+        while True:
+            xbee_state = self.__configurator._next_node()
+            if xbee_state is None:
+                break
+
+            try:
+                self.do_configure(xbee_state)
+                self.__configurator._configuration_done(self, xbee_state)
+            except Exception, e:
+                # The worker must outlive a failed node, or the pipeline
+                # loses a slot for good.
+                self.__tracer.error("Configuration of '%s' failed: %s",
+                                    xbee_state.ext_addr_get(), str(e))
+                # Hand the node back to the manager to be tried again,
+                # configure() refuses nodes left config_active:
+                if xbee_state.is_config_active():
+                    self.__configurator.xbee_device_manager_get().\
+                        _xbee_device_configuration_defer(xbee_state)
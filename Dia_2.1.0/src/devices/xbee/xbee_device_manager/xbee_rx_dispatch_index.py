@@ -0,0 +1,138 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+"""\
+XBee Device Manager RX Dispatch Index
+
+Resolves a received frame's address tuple to the RX event specs which
+should see it.
+
+"""
+
+# imports
+
+# constants
+
+# Number of resolved address tuples kept before the index is dropped
+# and rebuilt on demand.  Specs listening on any address can otherwise
+# add an entry for every node heard on the network.
+RX_DISPATCH_INDEX_MAX = 4096
+
+# exception classes
+
+# interface functions
+
+# classes
+
+class XBeeRxDispatchIndex(object):
+    """\
+        Event specs registered for RX dispatch, and an index of which
+        of them match a given source.
+
+        Specs are registered under a normalized extended address, or
+        under False if they match frames from any address.  The first
+        frame seen for an (address, endpoint, profile_id, cluster_id)
+        tuple runs the specs' match tests; the result is stored so that
+        later frames from the same source resolve with a single
+        dictionary lookup.  The index is dropped whenever a spec is
+        added or removed.
+
+        This class does no locking of its own; the device manager
+        serializes access to it.
+
+    """
+    def __init__(self, max_entries=RX_DISPATCH_INDEX_MAX):
+        self.__specs = {False: []}
+        self.__index = {}
+        self.__max_entries = max_entries
+
+    def add(self, address, rx_event, state, config_only=False):
+        """\
+            Register `rx_event`, owned by device `state`, under
+            `address`.
+
+            If `config_only` is True the spec's callback is only made
+            while the device is being configured.
+
+        """
+        self.__specs.setdefault(address, []).append(
+            (rx_event, state, config_only))
+        self.__index.clear()
+
+    def remove(self, address, rx_event, state):
+        """\
+            Remove a spec registered with add().
+
+            Raises KeyError if no such spec is registered.
+
+        """
+        specs = self.__specs.get(address, [])
+        for i in xrange(len(specs)):
+            if specs[i][0] is rx_event and specs[i][1] is state:
+                break
+        else:
+            raise KeyError(address)
+
+        del specs[i]
+        if not specs and address is not False:
+            del self.__specs[address]
+        self.__index.clear()
+
+    def lookup(self, addr):
+        """\
+            Resolve the source address tuple of a received frame.
+
+            Returns a tuple (states, entries).  `states` holds each
+            device state registered for the frame's address, or for
+            any address, once.  `entries` holds an (rx_event, state,
+            config_only) tuple for each spec whose match test passes.
+
+        """
+        key = addr[0:4]
+        try:
+            return self.__index[key]
+        except KeyError:
+            pass
+
+        candidates = self.__specs.get(addr[0], []) + self.__specs[False]
+
+        states = []
+        seen = {}
+        entries = []
+        for entry in candidates:
+            rx_event, state = entry[0], entry[1]
+            if id(state) not in seen:
+                seen[id(state)] = True
+                states.append(state)
+            if rx_event.match_spec_test(addr, mac_prematch=True):
+                entries.append(entry)
+
+        if len(self.__index) >= self.__max_entries:
+            self.__index.clear()
+        result = (tuple(states), tuple(entries))
+        self.__index[key] = result
+        return result
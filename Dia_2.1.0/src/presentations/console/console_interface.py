@@ -44,12 +44,13 @@ from common.helpers.format_channels import dump_channel_db_as_text, iso_date
 from common.helpers.format_logging_events import \
     format_logging_events_iterator
 from channels.channel_database_interface import \
-    LOG_SEEK_SET, LOG_SEEK_CUR, LOG_SEEK_END, LOG_SEEK_REC
+    LOG_SEEK_SET, LOG_SEEK_CUR, LOG_SEEK_END, LOG_SEEK_REC, LOG_SEEK_TIME
 from channels.channel import \
     PERM_GET, PERM_SET, PERM_REFRESH, \
     OPT_AUTOTIMESTAMP, OPT_DONOTLOG, OPT_DONOTDUMPDATA
 from core.core_services import CoreSettingsInvalidSerializer
 from common.dia_proc import get_drivers
+from common.sched_stats import bucket_labels
 
 
 # constants
@@ -225,9 +226,12 @@ Seek the current logger to position.
 * **end:** seek 'offset' recrods from the last record in the log
 * **rec:** seek to an absolute record number given by 'record_number'
   and then seek 'offset' records from that mark.
+* **time:** seek to the first record logged at or after the time
+  given by 'record_number' in seconds since the epoch and then seek
+  'offset' records from that mark.
          
 'record_number' is an absolute record number which only applies when
-'whence' is rec.
+'whence' is rec, or a time when 'whence' is time.
 
 Syntax::
 
@@ -268,6 +272,21 @@ Syntax::
         device_dump
 """,
 #---
+"scheduler_stats":
+"""
+    Report how late scheduled actions started and how long they ran,
+    along with the slowest actions by name.  Instrumentation must be
+    turned on first; it only measures events scheduled afterwards.
+
+    'on' and 'off' enable and disable instrumentation, 'reset' clears
+    the statistics gathered so far.  'count' limits the number of
+    slowest actions shown (default 10).
+
+    Syntax::
+
+        scheduler_stats [on|off|reset|count]
+""",
+#---
 "quit":
 """
 Disconnect from the CLI.
@@ -777,15 +796,20 @@ Syntax::
                 whence_map = { 'set': LOG_SEEK_SET,
                                'cur': LOG_SEEK_CUR,
                                'end': LOG_SEEK_END,
-                               'rec': LOG_SEEK_REC, }
+                               'rec': LOG_SEEK_REC,
+                               'time': LOG_SEEK_TIME, }
                 whence = whence_map[args[1].lower()]
             except:
                 self.write(
-                   "invalid whence '%s', must be set, cur, end, or rec\r\n" % (
+                   "invalid whence '%s', must be set, cur, end, rec, "
+                   "or time\r\n" % (
                         repr(args[1])))
         if len(args) > 2:
             try:
-                record_number = int(args[2])
+                if whence == LOG_SEEK_TIME:
+                    record_number = float(args[2])
+                else:
+                    record_number = int(args[2])
             except:
                 self.write("invalid record_number '%s', must be integer\r\n" % 
                         repr(args[2]))
@@ -812,7 +836,7 @@ Syntax::
                     pass
                 if arg_num == 2:
                     matches.extend(filter(lambda t: t.startswith(text),
-                                    ("set", "cur", "end", "rec")))
+                                    ("set", "cur", "end", "rec", "time")))
                 if arg_num == 3:
                     # record_number
                     pass
@@ -904,6 +928,64 @@ Syntax::
         for _ in name_device_pairs:
             self.write(_[0] + ": " + _[1] + '\r\n')
     
+    def do_scheduler_stats(self, arg):
+        try:
+            args = parse_line(arg)
+        except:
+            self.write("invalid syntax.\r\n")
+            return 0
+        if len(args) > 1:
+            self.write("invalid argument(s) specified.\r\n")
+            return 0
+
+        sched = self.__core.get_service("scheduler")
+        count = 10
+        if args:
+            if args[0] == 'on':
+                sched.instrumentation_enable(True)
+                self.write("\tScheduler instrumentation enabled.\r\n")
+                return 0
+            elif args[0] == 'off':
+                sched.instrumentation_enable(False)
+                self.write("\tScheduler instrumentation disabled.\r\n")
+                return 0
+
+            stats = sched.instrumentation_stats()
+            if args[0] == 'reset':
+                if stats is not None:
+                    stats.reset()
+                self.write("\tScheduler statistics reset.\r\n")
+                return 0
+            try:
+                count = int(args[0])
+            except ValueError:
+                self.write("invalid argument(s) specified.\r\n")
+                return 0
+
+        stats = sched.instrumentation_stats()
+        if stats is None:
+            self.write("\tScheduler instrumentation is disabled, use " +
+                       "'scheduler_stats on'.\r\n")
+            return 0
+
+        summary = stats.summary()
+        self.write("\r\n\t%d actions, max lateness %.3fs, " \
+                   "max run time %.3fs\r\n\r\n" % (summary['count'],
+                       summary['lateness_max'], summary['runtime_max']))
+        self.write("\t%-10s %10s %10s\r\n" % ("seconds", "late", "ran"))
+        for label, late, ran in zip(bucket_labels(), summary['lateness'],
+                                    summary['runtime']):
+            self.write("\t%-10s %10d %10d\r\n" % (label, late, ran))
+
+        self.write("\r\n\t%8s %10s %10s  %s\r\n" %
+                   ("count", "total", "max", "action"))
+        for name, calls, total, longest in stats.slowest(count):
+            self.write("\t%8d %9.3fs %9.3fs  %s\r\n" %
+                       (calls, total, longest, name))
+        self.write("\r\n")
+
+        return 0
+
     def do_quit(self, arg):
         return -1
 
@@ -40,6 +40,7 @@ from channels.channel_source_device_property import DPROP_PERM_GET
 import threading
 import digitime
 import cStringIO
+import fnmatch
 
 # Because the idigi_data module can be external to Dia, we should try/except
 # around it, just in case the user does not have the module for some reason.
@@ -98,7 +99,9 @@ class iDigi_DB(PresentationBase, threading.Thread):
          # filename: the name of the xml file we will push to iDigi, with
          #     a number appended to the end (cycling from 1 to file_count)
          # channels: is the list of channels the module is subscribed to.
-         #     If no channels are listed, all channels are subscribed to.
+         #     Entries may be patterns such as "zone1.*", which also
+         #     match channels created later.  If no channels are listed,
+         #     all channels are subscribed to.
          # compact_xml: (when set to True) will produce output XML with the
          #     information stored as attributes to the sample node instead of
          #     separately tagged, resulting in smaller XML output.
@@ -170,9 +173,12 @@ class iDigi_DB(PresentationBase, threading.Thread):
         if sample_threshold:
             if len(channels) > 0:
                 for channel in channels:
-                    cp.subscribe(channel, self.receive)
+                    if _is_pattern(channel):
+                        cp.subscribe_pattern(channel, self.receive)
+                    else:
+                        cp.subscribe(channel, self.receive)
             else:
-                cp.subscribe_to_all(self.receive)
+                cp.subscribe_pattern("*", self.receive)
 
         threading.Thread.start(self)
         self.apply_settings()
@@ -218,7 +224,7 @@ class iDigi_DB(PresentationBase, threading.Thread):
         if interval is None:
             interval = SettingsBase.get_setting(self, "interval")
         self.__last_upload_clock = 0
-        self.__last_upload_time = 0
+        self.__last_upload_sequence = 0
         while not self.__stopevent.isSet():
             try:
                 # 32 bit modulo math to account for an NDS bug :-(
@@ -261,9 +267,11 @@ class iDigi_DB(PresentationBase, threading.Thread):
         cm = self.__core.get_service("channel_manager")
         cdb = cm.channel_database_get()
 
-        channel_list = SettingsBase.get_setting(self, "channels")
-        if len(channel_list) == 0:
-            channel_list = cdb.channel_list()
+        # Only the channels updated since the last upload are sent
+        self.__last_upload_sequence, channel_list = cdb.changed_since(
+            self.__last_upload_sequence)
+        channel_list = _select_channels(channel_list,
+            SettingsBase.get_setting(self, "channels"))
 
         new_sample_count = 0
 
@@ -274,19 +282,14 @@ class iDigi_DB(PresentationBase, threading.Thread):
                     # skip ungettable things
                     continue
                 sample = channel.get()
-                if sample.timestamp >= self.__last_upload_time:
-                    self.__tracer.debug("Channel %s was updated since last " +
-                           "push", channel_name)
-                    new_sample_count += 1
-                    compact_xml = SettingsBase.get_setting(self, "compact_xml")
-                    if compact_xml:
-                        xml.write(self.__make_compact_xml(channel_name,
-                                                          sample))
-                    else:
-                        xml.write(self.__make_xml(channel_name, sample))
+                self.__tracer.debug("Channel %s was updated since last " +
+                       "push", channel_name)
+                new_sample_count += 1
+                if compact_xml:
+                    xml.write(self.__make_compact_xml(channel_name,
+                                                      sample))
                 else:
-                    self.__tracer.debug("Channel %s was not updated since " +
-                          "last push", channel_name)
+                    xml.write(self.__make_xml(channel_name, sample))
             except Exception, e:
                 # Failed to retrieve the data
                 self.__tracer.warning("Exception in getting sample data: %s",
@@ -299,7 +302,6 @@ class iDigi_DB(PresentationBase, threading.Thread):
             # Due to an NDS issue, clock may roll over, we'll just
             # keep track modulo 32-bit to allow for that.
             self.__last_upload_clock = int(digitime.real_clock()) & 0xffffffff
-            self.__last_upload_time = digitime.time()
 
             success = self.__send_to_idigi(xml.getvalue())
             if success == True:
@@ -371,3 +373,23 @@ class iDigi_DB(PresentationBase, threading.Thread):
             sample_value = sample_value.replace(ch, ENTITY_MAP[ch])
 
         return sample_value
+
+# internal functions & classes
+
+def _is_pattern(channel_name):
+    return '*' in channel_name or '?' in channel_name or '[' in channel_name
+
+def _select_channels(channel_names, channel_list):
+    # Returns the names in channel_names selected by the 'channels'
+    # setting.
+    if len(channel_list) == 0:
+        return channel_names
+
+    selected = []
+    for name in channel_names:
+        for entry in channel_list:
+            if entry == name or (_is_pattern(entry) and
+                                 fnmatch.fnmatch(name, entry)):
+                selected.append(name)
+                break
+    return selected
@@ -64,6 +64,10 @@ Channel Dump
 
     <channel_dump/>
 
+or, to dump the channels of a single device::
+
+    <channel_dump device="..."/>
+
 **Response** code::
 
     <channel_dump>
@@ -202,6 +206,7 @@ Logger Seek
 **Request** code::
 
     <logger_seek offset="0" whence="end" />
+    <logger_seek offset="0" whence="time" time="1262304000" />
 
 **Response** code::
 
@@ -258,7 +263,7 @@ from samples.sample import Sample
 from StringIO import StringIO
 from common.helpers.format_channels import iso_date
 from channels.channel_database_interface import \
-    LOG_SEEK_SET, LOG_SEEK_CUR, LOG_SEEK_END, LOG_SEEK_REC
+    LOG_SEEK_SET, LOG_SEEK_CUR, LOG_SEEK_END, LOG_SEEK_REC, LOG_SEEK_TIME
 from common.dia_proc import get_drivers
 
 # constants
@@ -449,7 +454,8 @@ class RCIHandler(PresentationBase):
 
         cdb = (self.__core.get_service("channel_manager")
                 .channel_database_get())
-        device_string.write(self.__generate_channel_database(cdb))
+        device_string.write(self.__generate_channel_database(
+                                cdb, attrs.get('device')))
 
         return device_string.getvalue()
 
@@ -854,6 +860,7 @@ class RCIHandler(PresentationBase):
         **Request** code::
 
             <logger_seek offset={num] whence={cur, set, end, rec} [record={num]>
+            <logger_seek offset={num} whence=time time={seconds}>
 
         **Response** code::
 
@@ -863,7 +870,8 @@ class RCIHandler(PresentationBase):
         whence_map = { 'set': LOG_SEEK_SET,
                        'cur': LOG_SEEK_CUR,
                        'end': LOG_SEEK_END,
-                       'rec': LOG_SEEK_REC, }
+                       'rec': LOG_SEEK_REC,
+                       'time': LOG_SEEK_TIME, }
 
         if self.__logger is None:
             return '<logger_seek>%s' % RCIHandler.ERR_UNSELECTED_LOGGER
@@ -879,13 +887,20 @@ class RCIHandler(PresentationBase):
 
         if whence not in whence_map:
             return ('<logger_seek name="%s"><error>Bad whence "%s", '
-                      'must be set, cur, end or rec</error>') % (
+                      'must be set, cur, end, rec or time</error>') % (
                 logger_name, str(whence))
 
-        try:
-            record_number = int(attrs['record_number'])
-        except KeyError:
-            record_number = 0
+        if whence == 'time':
+            try:
+                record_number = float(attrs['time'])
+            except KeyError:
+                return '<logger_seek name="%s">%s' % (
+                    logger_name, RCIHandler.ERR_MISSING_ATTRIBUTE)
+        else:
+            try:
+                record_number = int(attrs['record_number'])
+            except KeyError:
+                record_number = 0
 
         try:
             self.__logger_cdb.log_seek(offset,
@@ -958,45 +973,40 @@ class RCIHandler(PresentationBase):
         return "<shutdown>"
 
 
-    def __generate_channel_database(self, cdb):
-
-        channel_list = cdb.channel_list()
-        channel_list.sort()
+    def __generate_channel_database(self, cdb, device_name=None):
 
-        devices = {}
-
-        for entry in channel_list:
-            device, channel_name = entry.split('.')
-            channel = cdb.channel_get(entry)
-
-            if not devices.has_key(device):
-                devices[device] = []
-
-            try:
-                if (not (channel.perm_mask() & PERM_GET) or
-                    channel.options_mask() & OPT_DONOTDUMPDATA):
-                    raise Exception
-                sample = channel.get()
-                devices[device].append((channel_name,
-                                        sample.value,
-                                        sample.unit,
-                                        time.asctime(
-                                                     time.localtime
-                                                     (sample.timestamp)),
-                                        str(channel.type().__name__)))
-            except Exception, e:
-                devices[device].append((channel_name, "(N/A)", "", "", ""))
+        if device_name is None:
+            device_list = cdb.device_list()
+        else:
+            device_list = [ device_name ]
 
         device_string = StringIO()
 
-        for device in devices.keys():
+        for device in device_list:
+            channel_list = cdb.channels_of_device(device)
+            if not channel_list:
+                continue
+
             device_string.write('<device name="%s">' % device)
-            for channel in devices[device]:
-                value = self.__escape_entities(channel[1])
-                device_string.write('<channel name="%s" value="%s"'
-                    ' units="%s" timestamp="%s"'
-                    ' type="%s"/>' % (channel[0], value, channel[2],
-                                        channel[3], channel[4]))
+            for entry in channel_list:
+                channel_name = entry[len(device) + 1:]
+                channel = cdb.channel_get(entry)
+
+                try:
+                    if (not (channel.perm_mask() & PERM_GET) or
+                        channel.options_mask() & OPT_DONOTDUMPDATA):
+                        raise Exception
+                    sample = channel.get()
+                    value = self.__escape_entities(sample.value)
+                    device_string.write('<channel name="%s" value="%s"'
+                        ' units="%s" timestamp="%s"'
+                        ' type="%s"/>' % (channel_name, value, sample.unit,
+                                          time.asctime(time.localtime(
+                                              sample.timestamp)),
+                                          str(channel.type().__name__)))
+                except Exception, e:
+                    device_string.write('<channel name="%s" value="(N/A)"'
+                        ' units="" timestamp="" type=""/>' % channel_name)
             device_string.write('</device>')
 
         return device_string.getvalue()
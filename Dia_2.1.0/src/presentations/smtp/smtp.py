@@ -39,7 +39,7 @@ import socket
 from Queue import Queue
 from settings.settings_base import SettingsBase, Setting
 from presentations.presentation_base import PresentationBase
-from channels.channel_publisher import ChannelDoesNotExist
+from channels.channel_publisher import ChannelDoesNotExist, DISPATCH_EVERY
 from common.helpers.format_channels import dump_channel_db_as_text
 
 # constants
@@ -118,9 +118,10 @@ class SMTPHandler(PresentationBase, threading.Thread):
                 self.__tracer.error("The channel %s does not exist, it cannot be unsubscribed to", \
                             self.monitored_channel)
         
-        ## subscribe to monitored_channel         
+        ## subscribe to monitored_channel; queue_msg formats a dump of
+        ## the whole channel database, so keep it off the driver's thread
         self.monitored_channel = accepted['monitored_channel']
-        cp.subscribe(self.monitored_channel, self.queue_msg)
+        cp.subscribe(self.monitored_channel, self.queue_msg, DISPATCH_EVERY)
         
         SettingsBase.commit_settings(self, accepted)
         return (accepted, rejected, not_found)
@@ -270,9 +270,8 @@ class Web(PresentationBase, HTTPServer, threading.Thread):
         table = []
         cm = self.__core.get_service("channel_manager")
         cdb = cm.channel_database_get()
-        channel_list = cdb.channel_list()
-        channel_list.sort()
-        for channel_name in channel_list:
+        # channel_list() is already sorted
+        for channel_name in cdb.channel_list():
             sample = { 'channel_name': channel_name }
             try:
                 channel = cdb.channel_get(channel_name)
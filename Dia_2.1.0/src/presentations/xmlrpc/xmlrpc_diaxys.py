@@ -46,7 +46,7 @@ from presentations.presentation_base import PresentationBase
 from samples.sample import Sample
 from common.helpers.format_channels import iso_date
 from channels.channel_database_interface import \
-    LOG_SEEK_SET, LOG_SEEK_CUR, LOG_SEEK_END, LOG_SEEK_REC
+    LOG_SEEK_SET, LOG_SEEK_CUR, LOG_SEEK_END, LOG_SEEK_REC, LOG_SEEK_TIME
 from common.types.boolean import Boolean
 from common.dia_proc import get_drivers
 
@@ -140,10 +140,10 @@ class XMLRPCAPI:
 
     def channel_list(self, startswith=""):
         
-        channel_list = self.__cdb.channel_list()
         if len(startswith) > 0:
-            channel_list = filter(lambda li: li.startswith(startswith),
-                                  channel_list)
+            channel_list = self.__cdb.channel_list_prefix(startswith)
+        else:
+            channel_list = self.__cdb.channel_list()
 
         return channel_list
 
@@ -340,10 +340,11 @@ class XMLRPCAPI:
         whence_map = { 'set': LOG_SEEK_SET,
                        'cur': LOG_SEEK_CUR,
                        'end': LOG_SEEK_END,
-                       'rec': LOG_SEEK_REC, }
+                       'rec': LOG_SEEK_REC,
+                       'time': LOG_SEEK_TIME, }
         if whence not in whence_map:
             raise Exception, \
-                  "Error: Bad whence '%s', must be set, cur, end or rec" % (
+                  "Error: Bad whence '%s', must be set, cur, end, rec or time" % (
                      repr(whence))
         try:
             self.__logger_cdb.log_seek(offset,
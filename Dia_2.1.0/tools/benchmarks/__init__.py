@@ -0,0 +1,20 @@
+"""
+Off-device benchmarks for Dia core components.
+
+Each module may be run from the root of the source tree, for example::
+
+    python tools/benchmarks/sched_cancel.py
+
+"""
+
+import os
+import sys
+
+def setup_path():
+    """Add the Dia `lib` and `src` directories to the import path."""
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                        os.pardir, os.pardir))
+    for lib_path in ['lib', 'src']:
+        path = os.path.join(root, lib_path)
+        if path not in sys.path:
+            sys.path.insert(0, path)
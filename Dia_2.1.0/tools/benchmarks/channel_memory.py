@@ -0,0 +1,186 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+
+
+"""\
+Benchmark the memory used by channels in the channel database.
+
+Builds a database of 5,000 channels, each backed by a
+ChannelSourceDeviceProperty and registered with the ChannelPublisher
+as the ChannelDatabase does, and reports the bytes used per channel.
+The same database is then built from copies of the previous Channel
+and ChannelSourceDeviceProperty classes, which kept an instance
+dictionary, a callback list and a lock per channel, so the two can be
+compared.
+
+Sizes are measured with sys.getsizeof() over every object reachable
+from the database, counting shared objects once, so Python 2.6 or
+later is required.
+
+Usage: python tools/benchmarks/channel_memory.py [channels]
+"""
+
+# imports
+import os
+import sys
+import threading
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                os.pardir))
+from tools.benchmarks import setup_path
+setup_path()
+
+from channels.channel import Channel
+from channels.channel_publisher import ChannelPublisher
+from channels.channel_source import ChannelSource
+from channels.channel_source_device_property import \
+    ChannelSourceDeviceProperty, DPROP_PERM_GET, DPROP_OPT_AUTOTIMESTAMP
+from samples.sample import Sample
+
+# constants
+CHANNEL_COUNT = 5000
+PROPERTIES_PER_DEVICE = 10
+
+# Never descended into when measuring, they are shared by the code
+_SHARED_TYPES = (type, types.ClassType, types.ModuleType,
+                 types.FunctionType, types.BuiltinFunctionType)
+
+# internal functions & classes
+
+class _OldChannel:
+    # The Channel class before slots and callback tuples.
+
+    def __init__(self, name, channel_source):
+        self.__name = name
+        self.__channel_source = channel_source
+        self.__new_sample_cbs = [ ]
+
+    def name(self):
+        return self.__name
+
+    def add_new_sample_cb(self, f):
+        if not f in self.__new_sample_cbs:
+            self.__new_sample_cbs.append(f)
+
+class _OldProperty(ChannelSource):
+    # The ChannelSourceDeviceProperty class before it dropped the
+    # duplicated slots and the lock per property.
+    __slots__ = ['name', 'type', 'perms_mask', 'options', 'device_set_cb',
+                 'device_refresh_cb', '__rlock', '__sample']
+
+    def __init__(self, name, type, initial, perms_mask, options):
+        self.name = name
+        self.type = type
+        self.perms_mask = perms_mask
+        self.options = options
+        self.device_set_cb = lambda s: None
+        self.device_refresh_cb = lambda: None
+        self.__rlock = threading.RLock()
+        self.__sample = initial
+
+class _OldPublisher(object):
+    # Registered a new bound method with every channel.
+
+    def new_channel(self, channel):
+        channel.add_new_sample_cb(self.new_sample_cb)
+
+    def new_sample_cb(self, channel):
+        pass
+
+def _build(channel_class, property_class, publisher, channel_count):
+    channels = {}
+    for i in xrange(channel_count):
+        # Names as they arrive from the configuration, not literals
+        device = "device%d" % (i / PROPERTIES_PER_DEVICE)
+        prop = "property%d" % (i % PROPERTIES_PER_DEVICE)
+        source = property_class(name=prop, type=float,
+                                initial=Sample(0, 0.0, "F"),
+                                perms_mask=DPROP_PERM_GET,
+                                options=DPROP_OPT_AUTOTIMESTAMP)
+        channel = channel_class("%s.%s" % (device, prop), source)
+        channels[channel.name()] = channel
+        publisher.new_channel(channel)
+    return channels
+
+def _referents(obj):
+    if isinstance(obj, dict):
+        return obj.keys() + obj.values()
+    if isinstance(obj, (list, tuple)):
+        return obj
+    if isinstance(obj, types.MethodType):
+        return ()
+
+    referents = []
+    if hasattr(obj, '__dict__'):
+        referents.append(obj.__dict__)
+    for cls in type(obj).__mro__:
+        for slot in cls.__dict__.get('__slots__', ()):
+            if slot.startswith('__') and not slot.endswith('__'):
+                slot = '_%s%s' % (cls.__name__.lstrip('_'), slot)
+            try:
+                referents.append(getattr(obj, slot))
+            except AttributeError:
+                pass
+    return referents
+
+def deep_size(root, exclude=()):
+    seen = set([ id(obj) for obj in exclude ])
+    stack = [ root ]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SHARED_TYPES) or \
+           obj is None:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        stack.extend(_referents(obj))
+    return total
+
+def main(argv):
+    channel_count = CHANNEL_COUNT
+    if len(argv) > 1:
+        channel_count = int(argv[1])
+
+    results = []
+    for label, channel_class, property_class, publisher in [
+        ('previous', _OldChannel, _OldProperty, _OldPublisher()),
+        ('slotted', Channel, ChannelSourceDeviceProperty,
+         ChannelPublisher(None)) ]:
+        channels = _build(channel_class, property_class, publisher,
+                          channel_count)
+        size = deep_size(channels, exclude=[ publisher ])
+        results.append(size)
+        print "%-10s %10d bytes %8.1f bytes/channel" % \
+            (label, size, float(size) / channel_count)
+
+    print "saved %.1f%%" % (100.0 * (results[0] - results[1]) / results[0])
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,137 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+
+"""\
+Benchmark sample delivery through the ChannelPublisher.
+
+Builds 2,000 channels with 5 subscribers each and publishes 1,000,000
+samples round-robin across them.  The same workload is then run
+through a copy of the previous delivery path, which copied the whole
+listener table and the channel's listener set for every sample, so
+the two can be compared.  The ChannelPublisher figures also include
+the creation of a logging event for each sample.
+
+Usage: python tools/benchmarks/channel_publish.py [samples [channels]]
+"""
+
+# imports
+import os
+import sys
+import threading
+import time
+from copy import copy
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                os.pardir))
+from tools.benchmarks import setup_path
+setup_path()
+
+from channels.channel import Channel
+from channels.channel_publisher import ChannelPublisher
+from channels.channel_source_device_property import \
+    ChannelSourceDeviceProperty
+from samples.sample import Sample
+
+# constants
+SAMPLE_COUNT = 1000000
+CHANNEL_COUNT = 2000
+SUBSCRIBERS = 5
+
+# internal functions & classes
+
+class _CopyingPublisher(object):
+    # The delivery path of the publisher before the copy-on-write
+    # listener tables.
+
+    def __init__(self):
+        self.listeners = {}
+        self.rlock = threading.RLock()
+
+    def subscribe(self, channel_name, callback):
+        self.listeners.setdefault(channel_name, set()).add(callback)
+
+    def new_sample_cb(self, channel):
+        self.rlock.acquire()
+        try:
+            channel_listeners = copy(self.listeners)
+        finally:
+            self.rlock.release()
+        if channel.name() in channel_listeners:
+            for callback in copy(channel_listeners[channel.name()]):
+                callback(channel)
+
+class _Counter(object):
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, channel):
+        self.count += 1
+
+def _build(publisher, channel_count):
+    channels = []
+    subscribers = [ _Counter() for i in xrange(SUBSCRIBERS) ]
+    for i in xrange(channel_count):
+        name = "dev%d.prop%d" % (i / 10, i % 10)
+        source = ChannelSourceDeviceProperty(name="prop", type=int,
+                                             initial=Sample(0, 0))
+        channels.append(Channel(name, source))
+        for subscriber in subscribers:
+            publisher.subscribe(name, subscriber)
+    return channels, subscribers
+
+def bench(publisher, samples, channel_count):
+    channels, subscribers = _build(publisher, channel_count)
+    n = len(channels)
+    new_sample_cb = publisher.new_sample_cb
+
+    start = time.time()
+    for i in xrange(samples):
+        new_sample_cb(channels[i % n])
+    elapsed = time.time() - start
+
+    delivered = sum([ s.count for s in subscribers ])
+    return elapsed, delivered
+
+def main(argv):
+    samples = SAMPLE_COUNT
+    channel_count = CHANNEL_COUNT
+    if len(argv) > 1:
+        samples = int(argv[1])
+    if len(argv) > 2:
+        channel_count = int(argv[2])
+
+    print "%d samples, %d channels, %d subscribers per channel" % \
+        (samples, channel_count, SUBSCRIBERS)
+    for label, publisher in [('copy-on-write', ChannelPublisher(None)),
+                             ('copy-per-sample', _CopyingPublisher())]:
+        elapsed, delivered = bench(publisher, samples, channel_count)
+        print "%-16s %8.2fs %10.0f samples/s (%d deliveries)" % \
+            (label, elapsed, samples / elapsed, delivered)
+
+if __name__ == '__main__':
+    main(sys.argv)
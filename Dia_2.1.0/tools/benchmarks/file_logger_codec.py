@@ -0,0 +1,97 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+
+
+"""\
+Benchmark the FileLogger sample record formats.
+
+Encodes and decodes 200,000 samples with a mix of values typical for
+the thermostat drivers (ints, floats, bools and short strings) in the
+version 1 (pickled value, whole-second timestamp) and version 2
+(type-tagged value, millisecond timestamp) record formats, and reports
+the bytes per sample and the encode and decode rates of each.
+
+Usage: python tools/benchmarks/file_logger_codec.py [samples]
+"""
+
+# imports
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                os.pardir))
+from tools.benchmarks import setup_path
+setup_path()
+
+from channels.logging.file_logger.file_logger_codec import \
+    FORMAT_PICKLE, FORMAT_TAGGED, encode_sample, decode_sample
+from samples.sample import Sample
+
+# constants
+SAMPLE_COUNT = 200000
+
+# internal functions & classes
+
+def _samples(count):
+    values = [72, 68.5, True, "Cool", 0, 71.25, False, "Off", 1200,
+              "Heat"]
+    now = time.time()
+    return [ Sample(now + i * 0.25, values[i % len(values)], "F")
+             for i in xrange(count) ]
+
+def bench(samples, version):
+    start = time.time()
+    records = [ encode_sample(12, sample, version) for sample in samples ]
+    encode = time.time() - start
+
+    data = ''.join(records)
+    start = time.time()
+    offset = 0
+    end = len(data)
+    while offset < end:
+        offset = decode_sample(data, offset, version)[3]
+    decode = time.time() - start
+
+    return len(data), encode, decode
+
+def main(argv):
+    count = SAMPLE_COUNT
+    if len(argv) > 1:
+        count = int(argv[1])
+
+    samples = _samples(count)
+    print "%d samples" % count
+    for label, version in [('v1 pickle', FORMAT_PICKLE),
+                           ('v2 tagged', FORMAT_TAGGED)]:
+        nbytes, encode, decode = bench(samples, version)
+        print "%-10s %6.2f bytes/sample  encode %9.0f/s  decode %9.0f/s" % \
+            (label, float(nbytes) / count, count / encode, count / decode)
+
+if __name__ == '__main__':
+    main(sys.argv)
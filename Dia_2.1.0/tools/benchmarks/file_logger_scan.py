@@ -0,0 +1,148 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+
+
+
+"""\
+Benchmark the FileLogger startup scan.
+
+Fills a 50 MB event volume with samples round-robin across 100
+channels, with a channel dump every 128 samples as the FileLogger
+writes them, then times the startup scan of the volume (the ERB scan
+for channel dumps, the checkpoint and chain recovery and the nameDB
+scan) with the ERB read through a memory map and through buffered
+file reads.  The file is in the page cache for every run, so this
+measures the cost of parsing the volume rather than of the storage.
+
+Usage: python tools/benchmarks/file_logger_scan.py [volume_mb [channels]]
+"""
+
+# imports
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                os.pardir))
+from tools.benchmarks import setup_path
+setup_path()
+
+from channels.logging.file_logger.file_logger_channel_dbi import \
+    FileLoggerChannelDBI
+from channels.logging.file_logger.file_logger_storage_manager import \
+    FileLoggerStorageManager, VolumeInit, StoreChannelNew, StoreNewSample, \
+    StoreChannelDump
+from samples.sample import Sample
+
+# constants
+VOLUME_SIZE_MB = 50
+CHANNEL_COUNT = 100
+SAMPLE_INDEX_FREQUENCY = 128
+WRITE_Q_DEPTH = 512
+RUNS = 3
+
+# internal functions & classes
+
+class _Logger(object):
+    # The parts of the FileLogger used by the storage manager.
+
+    def __init__(self):
+        self.__dbi = FileLoggerChannelDBI(op_req_method=None)
+
+    def channel_database_get(self):
+        return self.__dbi
+
+    def get_setting(self, name):
+        return {'sample_index_frequency': SAMPLE_INDEX_FREQUENCY}[name]
+
+def fill(filename, volume_size, channel_count):
+    mgr = FileLoggerStorageManager("bench", None, _Logger(),
+                                   WRITE_Q_DEPTH, WRITE_Q_DEPTH)
+    mgr.do_volume_init(VolumeInit(filename, volume_size))
+
+    names = [ "dev%d.prop%d" % (i / 10, i % 10)
+              for i in xrange(channel_count) ]
+    last = { }
+    for name in names:
+        last[name] = Sample(0, 0, "C")
+        mgr.queue_write_event(StoreChannelNew(name, last[name]))
+
+    i = 0
+    while mgr.write_stats()['bytes'] < volume_size:
+        name = names[i % channel_count]
+        last[name] = Sample(i * 0.25, i * 0.5, "C")
+        mgr.queue_write_event(StoreNewSample(name, last[name]))
+        i += 1
+        if i % SAMPLE_INDEX_FREQUENCY == 0:
+            mgr.queue_write_event(StoreChannelDump(dict(last)))
+        if i % (WRITE_Q_DEPTH / 2) == 0:
+            mgr.empty_write_q()
+    mgr.empty_write_q()
+    mgr._logfile.close()
+    return i
+
+def bench(filename, volume_size, use_mmap):
+    best = None
+    for run in xrange(RUNS):
+        mgr = FileLoggerStorageManager("bench", None, _Logger(),
+                                       WRITE_Q_DEPTH, WRITE_Q_DEPTH,
+                                       use_mmap=use_mmap)
+        start = time.time()
+        mgr.logfile_startup(VolumeInit(filename, volume_size))
+        elapsed = time.time() - start
+        mgr._unmap_erb()
+        mgr._logfile.close()
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main(argv):
+    volume_mb = VOLUME_SIZE_MB
+    channel_count = CHANNEL_COUNT
+    if len(argv) > 1:
+        volume_mb = int(argv[1])
+    if len(argv) > 2:
+        channel_count = int(argv[2])
+
+    fd, filename = tempfile.mkstemp(suffix=".log")
+    os.close(fd)
+    os.remove(filename)
+    try:
+        samples = fill(filename, volume_mb * 1024 * 1024, channel_count)
+        print "%d MB event volume, %d channels, %d samples logged" % \
+            (volume_mb, channel_count, samples)
+        for label, use_mmap in [('file', False), ('mmap', True)]:
+            elapsed = bench(filename, volume_mb * 1024 * 1024, use_mmap)
+            print "%-5s startup scan %7.2fs %8.1f MB/s" % \
+                (label, elapsed, volume_mb / elapsed)
+    finally:
+        os.remove(filename)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,139 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+
+
+"""\
+Benchmark the FileLogger write path.
+
+Logs 100,000 samples round-robin across 500 channels through a
+FileLoggerStorageManager writing to a temporary file, committing the
+write queue whenever it holds a full batch.  This is run for several
+batch sizes; a batch size of one commits every sample on its own.
+For each run the samples/sec rate and the number of writes issued to
+the file system are reported.
+
+Usage: python tools/benchmarks/file_logger_write.py [samples [channels
+       [volume_k]]]
+"""
+
+# imports
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                os.pardir))
+from tools.benchmarks import setup_path
+setup_path()
+
+from channels.logging.file_logger.file_logger_channel_dbi import \
+    FileLoggerChannelDBI
+from channels.logging.file_logger.file_logger_storage_manager import \
+    FileLoggerStorageManager, VolumeInit, StoreChannelNew, StoreNewSample
+from samples.sample import Sample
+
+# constants
+SAMPLE_COUNT = 100000
+CHANNEL_COUNT = 500
+VOLUME_SIZE_K = 256
+WRITE_Q_DEPTH = 512
+BATCH_SIZES = (1, 100, 512)
+
+# internal functions & classes
+
+class _Logger(object):
+    # The parts of the FileLogger used by the storage manager.
+
+    def __init__(self):
+        self.__dbi = FileLoggerChannelDBI(op_req_method=None)
+
+    def channel_database_get(self):
+        return self.__dbi
+
+    def get_setting(self, name):
+        return {'sample_index_frequency': 128}[name]
+
+def bench(filename, samples, channel_count, volume_k, batch_size):
+    mgr = FileLoggerStorageManager("bench", None, _Logger(),
+                                   WRITE_Q_DEPTH, WRITE_Q_DEPTH, batch_size)
+    mgr.do_volume_init(VolumeInit(filename, volume_k * 1024))
+    stats = mgr.write_stats()
+
+    names = [ "dev%d.prop%d" % (i / 10, i % 10)
+              for i in xrange(channel_count) ]
+    queue = mgr.queue_write_event
+    ops = [ StoreChannelNew(name, Sample(0, 0, "C")) for name in names ]
+    for i in xrange(samples):
+        ops.append(StoreNewSample(names[i % channel_count],
+                                  Sample(i, i * 0.5, "C")))
+
+    start = time.time()
+    pending = 0
+    for op in ops:
+        queue(op)
+        pending += 1
+        if pending >= batch_size:
+            mgr.empty_write_q()
+            pending = 0
+    mgr.empty_write_q()
+    elapsed = time.time() - start
+
+    end_stats = mgr.write_stats()
+    mgr._logfile.close()
+    return (elapsed, end_stats['writes'] - stats['writes'],
+            end_stats['bytes'] - stats['bytes'])
+
+def main(argv):
+    samples = SAMPLE_COUNT
+    channel_count = CHANNEL_COUNT
+    volume_k = VOLUME_SIZE_K
+    if len(argv) > 1:
+        samples = int(argv[1])
+    if len(argv) > 2:
+        channel_count = int(argv[2])
+    if len(argv) > 3:
+        volume_k = int(argv[3])
+
+    print "%d samples, %d channels, %dk event volume" % \
+        (samples, channel_count, volume_k)
+    for batch_size in BATCH_SIZES:
+        fd, filename = tempfile.mkstemp(suffix=".log")
+        os.close(fd)
+        os.remove(filename)
+        try:
+            elapsed, writes, nbytes = bench(filename, samples,
+                                            channel_count, volume_k,
+                                            batch_size)
+        finally:
+            os.remove(filename)
+        print "batch %-4d %8.2fs %10.0f samples/s %8d writes %10d bytes" % \
+            (batch_size, elapsed, samples / elapsed, writes, nbytes)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,98 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+
+"""\
+Benchmark scheduling and canceling events on the scheduler backends.
+
+Schedules 100,000 events, re-schedules each of them once (cancel
+followed by a new `enter`, the pattern used by drivers which push back
+a poll or timeout) and finally cancels them all.
+
+Usage: python tools/benchmarks/sched_cancel.py [event_count [backend ...]]
+
+The ``heap`` backend is quadratic here; expect it to take tens of
+minutes at the default event count.
+"""
+
+# imports
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                os.pardir))
+from tools.benchmarks import setup_path
+setup_path()
+
+import digi_sched
+
+# constants
+EVENT_COUNT = 100000
+
+# internal functions & classes
+
+def _noop():
+    pass
+
+def bench(backend, count):
+    s = digi_sched.BACKENDS[backend]()
+
+    start = time.time()
+    events = [ s.enter(3600 + i, 8, _noop, ()) for i in xrange(count) ]
+    t_enter = time.time() - start
+
+    start = time.time()
+    for i in xrange(count):
+        s.cancel(events[i])
+        events[i] = s.enter(7200 + i, 8, _noop, ())
+    t_resched = time.time() - start
+
+    start = time.time()
+    for event in events:
+        s.cancel(event)
+    t_cancel = time.time() - start
+
+    return t_enter, t_resched, t_cancel
+
+def main(argv):
+    count = EVENT_COUNT
+    backends = sorted(digi_sched.BACKENDS.keys())
+    if len(argv) > 1:
+        count = int(argv[1])
+    if len(argv) > 2:
+        backends = argv[2:]
+
+    print "%-6s %10s %12s %10s  (%d events)" % \
+        ('', 'enter', 'reschedule', 'cancel', count)
+    for backend in backends:
+        t_enter, t_resched, t_cancel = bench(backend, count)
+        print "%-6s %9.3fs %11.3fs %9.3fs" % \
+            (backend, t_enter, t_resched, t_cancel)
+
+if __name__ == '__main__':
+    main(sys.argv)
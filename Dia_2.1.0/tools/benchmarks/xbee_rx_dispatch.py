@@ -0,0 +1,219 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+
+"""\
+Benchmark RX frame dispatch in the XBee device manager.
+
+Registers a serial and a sample listener for each of 500 nodes, plus
+two listeners for join notifications from any node, then resolves
+100,000 synthetic frames round-robin across the nodes.  The same
+workload is run through the dispatch index used by the device manager
+and through a copy of the previous path, which concatenated the
+per-address and wildcard spec lists and ran every spec's match test
+for each frame.
+
+The event spec and device state classes need the XBee socket
+extensions, so small stand-ins with the same match test are used.
+
+Usage: python tools/benchmarks/xbee_rx_dispatch.py [frames [nodes]]
+"""
+
+# imports
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                os.pardir))
+from tools.benchmarks import setup_path
+setup_path()
+
+from devices.xbee.xbee_device_manager.xbee_rx_dispatch_index import \
+    XBeeRxDispatchIndex
+
+# constants
+FRAME_COUNT = 100000
+NODE_COUNT = 500
+
+SERIAL = (0xe8, 0xc105, 0x11)
+SAMPLE = (0xe8, 0xc105, 0x92)
+JOIN = (0xe8, 0xc105, 0x95)
+
+# internal functions & classes
+
+class _RxSpec(object):
+    # XBeeDeviceManagerRxEventSpec.match_spec_test(), with a plain
+    # string compare standing in for addresses_equal().
+
+    def __init__(self, cb, match_spec, match_mask):
+        self._cb = cb
+        self._match_spec = match_spec
+        self._match_mask = match_mask
+
+    def cb_get(self):
+        return self._cb
+
+    def match_spec_test(self, candidate, mac_prematch=False):
+        if self._match_mask[0] and \
+               self._match_spec[0] != candidate[0].lower():
+            return False
+        spec = self._match_spec
+        mask = self._match_mask
+        if not ((not mask[1] or (candidate[1] == spec[1])) and
+                (not mask[2] or (candidate[2] == spec[2])) and
+                (not mask[3] or (candidate[3] == spec[3]))):
+            return False
+        return True
+
+class _State(object):
+    def __init__(self):
+        self.last_heard = None
+
+    def last_heard_from_set(self, timestamp):
+        self.last_heard = timestamp
+
+    def is_running(self):
+        return True
+
+    def is_config_active(self):
+        return False
+
+class _LinearDispatch(object):
+    # The dispatch path of the device manager before the index.
+
+    def __init__(self):
+        self.specs = {False: []}
+        self.lock = threading.RLock()
+
+    def add(self, address, rx_event, state, config_only=False):
+        self.specs.setdefault(address, []).append((rx_event, state))
+
+    def dispatch(self, buf, addr):
+        self.lock.acquire()
+        proc_list = []
+        if addr[0] in self.specs:
+            proc_list = proc_list + self.specs[addr[0]]
+        proc_list += self.specs[False]
+        for rx_event, state in proc_list:
+            state.last_heard_from_set(time.time())
+            if not state.is_running():
+                continue
+            if not rx_event.match_spec_test(addr, mac_prematch=True):
+                continue
+            rx_event.cb_get()(buf, addr)
+        self.lock.release()
+
+class _IndexedDispatch(object):
+    # The dispatch path of XBeeDeviceManager.__select_rx_cbs_for().
+
+    def __init__(self):
+        self.index = XBeeRxDispatchIndex()
+        self.lock = threading.RLock()
+        self.add = self.index.add
+
+    def dispatch(self, buf, addr):
+        callbacks = []
+        self.lock.acquire()
+        try:
+            states, entries = self.index.lookup(addr)
+            now = time.time()
+            for state in states:
+                state.last_heard_from_set(now)
+            for rx_event, state, config_only in entries:
+                if not state.is_running():
+                    continue
+                if config_only and not state.is_config_active():
+                    continue
+                callbacks.append(rx_event.cb_get())
+        finally:
+            self.lock.release()
+        for cb in callbacks:
+            cb(buf, addr)
+
+class _Counter(object):
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, buf, addr):
+        self.count += 1
+
+def _address(i):
+    return "[00:13:a2:00:40:%02x:%02x:%02x]!" % \
+        ((i >> 16) & 0xff, (i >> 8) & 0xff, i & 0xff)
+
+def _build(dispatcher, nodes):
+    counter = _Counter()
+    for i in xrange(nodes):
+        address = _address(i)
+        state = _State()
+        for bindpoint in (SERIAL, SAMPLE):
+            spec = _RxSpec(counter, (address,) + bindpoint,
+                           (True, True, True, True))
+            dispatcher.add(address, spec, state)
+    for i in xrange(2):
+        spec = _RxSpec(counter, (None,) + JOIN,
+                       (False, True, True, True))
+        dispatcher.add(False, spec, _State())
+    return counter
+
+def bench(dispatcher, frames, nodes):
+    counter = _build(dispatcher, nodes)
+    addrs = []
+    for i in xrange(nodes):
+        address = _address(i)
+        addrs.append((address,) + SAMPLE)
+        addrs.append((address,) + SERIAL)
+    n = len(addrs)
+    dispatch = dispatcher.dispatch
+    buf = '\x00' * 32
+
+    start = time.time()
+    for i in xrange(frames):
+        dispatch(buf, addrs[i % n])
+    elapsed = time.time() - start
+
+    return elapsed, counter.count
+
+def main(argv):
+    frames = FRAME_COUNT
+    nodes = NODE_COUNT
+    if len(argv) > 1:
+        frames = int(argv[1])
+    if len(argv) > 2:
+        nodes = int(argv[2])
+
+    print "%d frames from %d nodes" % (frames, nodes)
+    for label, dispatcher in [('indexed', _IndexedDispatch()),
+                              ('linear', _LinearDispatch())]:
+        elapsed, delivered = bench(dispatcher, frames, nodes)
+        print "%-8s %8.2fs %10.0f frames/s (%d callbacks)" % \
+            (label, elapsed, frames / elapsed, delivered)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,444 @@
+############################################################################
+#                                                                          #
+# Copyright (c)2008, 2009, Digi International (Digi). All Rights Reserved. #
+#                                                                          #
+# Permission to use, copy, modify, and distribute this software and its    #
+# documentation, without fee and without a signed licensing agreement, is  #
+# hereby granted, provided that the software is used on Digi products only #
+# and that the software contain this copyright notice,  and the following  #
+# two paragraphs appear in all copies, modifications, and distributions as #
+# well. Contact Product Management, Digi International, Inc., 11001 Bren   #
+# Road East, Minnetonka, MN, +1 952-912-3444, for commercial licensing     #
+# opportunities for non-Digi products.                                     #
+#                                                                          #
+# DIGI SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED   #
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A          #
+# PARTICULAR PURPOSE. THE SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, #
+# PROVIDED HEREUNDER IS PROVIDED "AS IS" AND WITHOUT WARRANTY OF ANY KIND. #
+# DIGI HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,         #
+# ENHANCEMENTS, OR MODIFICATIONS.                                          #
+#                                                                          #
+# IN NO EVENT SHALL DIGI BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT,      #
+# SPECIAL, INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS,   #
+# ARISING OUT OF THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF   #
+# DIGI HAS BEEN ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.                #
+#                                                                          #
+############################################################################
+
+
+"""\
+Export FileLogger volumes without running Dia.
+
+Reads a FileLogger volume (version 1 'FL', 2 'F2' or 3 'F3') in a
+single sequential pass over its event ring buffer and writes the
+channel events it holds in the order they were logged, either as CSV
+with the columns
+
+    record,timestamp,channel,event,value,unit
+
+or as a compact columnar file of per-channel blocks.  Memory use is
+bounded by the number of channels, not by the size of the volume.
+When the ring buffer has wrapped, the newer events at its start are
+staged in a temporary file until the older events behind them have
+been written.
+
+The columnar file is the magic 'FLC1' followed by blocks, each
+holding up to 4096 consecutive samples of one channel:
+
+    channel name (uint16 length, UTF-8)
+    unit (uint16 length, UTF-8)
+    value type ('d' float64 or 's' string)
+    sample count n (uint32)
+    n timestamps (float64)
+    n values (float64, or uint16 length and UTF-8 each)
+
+All numbers are big-endian.  Booleans are stored as 0 and 1, None as
+NaN.  Channel removals are not stored.  read_columnar() iterates over
+the blocks of such a file.
+
+Usage: python tools/file_logger_export.py [-f csv|columnar] [-o output]
+       volume
+"""
+
+# imports
+import os
+import sys
+import csv
+import getopt
+import shutil
+import struct
+import tempfile
+import time
+from array import array
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+for _path in ['lib', 'src']:
+    _path = os.path.join(_ROOT, _path)
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from channels.logging.file_logger.file_logger_codec import \
+    OFFSET, Struct, decode_sample
+from channels.logging.file_logger.file_logger_storage_manager import \
+    LOG_HDR_FMT, LOG_HDR_SIZE, MAGIC_FORMATS, MAGIC_CHAINED, EVENT_HEADER, \
+    EVENT_HEADER_SIZE, CHANNEL_NEW, CHANNEL_REMOVE, NEW_SAMPLE, MAX_TYPE, \
+    NoEvent, BadEvent, read_event_hdr
+
+# constants
+FORMAT_CSV = 'csv'
+FORMAT_COLUMNAR = 'columnar'
+
+CSV_COLUMNS = ('record', 'timestamp', 'channel', 'event', 'value', 'unit')
+EVENT_LABELS = {CHANNEL_NEW: 'new',
+                NEW_SAMPLE: 'sample',
+                CHANNEL_REMOVE: 'remove'}
+
+COLUMNAR_MAGIC = 'FLC1'
+BLOCK_SAMPLES = 4096
+TYPE_FLOAT = 'd'
+TYPE_STRING = 's'
+STR_MAX = 0xffff
+
+READ_CHUNK_SIZE = 1 << 20
+
+_LENGTH16 = Struct('>H')
+_COUNT = Struct('>I')
+_FLOAT64_SIZE = 8
+
+# exception classes
+
+class ExportError(Exception):
+    pass
+
+# interface functions
+
+def export(filename, output, format=FORMAT_CSV):
+    '''
+    Export the FileLogger volume 'filename' to the file object 'output'
+    in the given format.  Returns the number of events exported.
+    '''
+    reader = VolumeReader(filename)
+    try:
+        writer = WRITERS[format](output)
+
+        # The newer events at the start of a wrapped ring buffer are
+        # held back in a temporary file until the older ones are out:
+        spill = None
+        if reader.wrapped:
+            spill = tempfile.TemporaryFile()
+            writer.set_output(spill)
+
+        count = 0
+        last_record = None
+        for event in reader.events():
+            if (spill is not None and last_record is not None and
+                  event[0] < last_record):
+                writer.set_output(output)
+            last_record = event[0]
+            writer.write(*event)
+            count += 1
+        writer.set_output(output)
+
+        if spill is not None:
+            spill.seek(0)
+            shutil.copyfileobj(spill, output)
+            spill.close()
+    finally:
+        reader.close()
+
+    return count
+
+def read_columnar(fobj):
+    '''
+    Iterate over the blocks of the columnar export file 'fobj'.
+
+    Yields (channel, unit, timestamps, values) for each block; the
+    blocks of a channel are in the order its samples were logged.
+    '''
+    if fobj.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ExportError("not a columnar export file")
+
+    while True:
+        length = fobj.read(_LENGTH16.size)
+        if not length:
+            break
+        channel = fobj.read(_LENGTH16.unpack(length)[0]).decode('utf-8')
+        unit = _read_str(fobj).decode('utf-8')
+        vtype = fobj.read(1)
+        count = _COUNT.unpack(fobj.read(_COUNT.size))[0]
+        timestamps = _read_floats(fobj, count)
+        if vtype == TYPE_FLOAT:
+            values = _read_floats(fobj, count)
+        else:
+            values = [ _read_str(fobj).decode('utf-8')
+                       for i in xrange(count) ]
+        yield channel, unit, timestamps, values
+
+# classes
+
+class VolumeReader(object):
+    '''
+    Reads the channel events of a FileLogger volume in the order they
+    are stored in its event ring buffer.
+    '''
+
+    def __init__(self, filename):
+        self.__file = file(filename, "rb")
+
+        hdr = self.__file.read(LOG_HDR_SIZE)
+        if len(hdr) < LOG_HDR_SIZE:
+            raise ExportError("%s: not a FileLogger volume" % filename)
+        magic, self.__erb_off, self.__nameDB_off, name_length = \
+               struct.unpack(LOG_HDR_FMT, hdr)
+        if magic not in MAGIC_FORMATS:
+            raise ExportError("%s: not a FileLogger volume" % filename)
+
+        self.format = MAGIC_FORMATS[magic]
+        self.chained = magic in MAGIC_CHAINED
+        self.instance = self.__file.read(name_length)
+        self.names = self.__read_names()
+        self.wrapped = self.__read_wrapped()
+
+    def close(self):
+        self.__file.close()
+
+    def __read_names(self):
+        # The nameDB runs from its offset to the end of the file.
+        self.__file.seek(self.__nameDB_off)
+        data = self.__file.read()
+        names = { }
+        offset = 0
+        while offset < len(data):
+            length = ord(data[offset])
+            if not length:
+                break
+            names[self.__nameDB_off + offset] = \
+                data[offset + 1:offset + 1 + length]
+            offset += length + 1
+        return names
+
+    def __read_wrapped(self):
+        # Until the ring buffer wraps, the first event follows the pad
+        # the volume was created with at the same offset.
+        self.__file.seek(self.__erb_off)
+        try:
+            hdr = read_event_hdr(self.__file)
+        except (NoEvent, BadEvent):
+            return False
+        return hdr.previous != self.__erb_off
+
+    def events(self):
+        '''
+        Iterate over the ChannelNew, NewSample and ChannelRemove events
+        in ring buffer order, yielding tuples of (record, event type,
+        channel, timestamp, value, unit).
+        '''
+        f = self.__file
+        names = self.names
+        sample_off = EVENT_HEADER_SIZE + OFFSET.size
+        if self.chained:
+            sample_off += OFFSET.size # skip the channel chain offset
+        unpack_hdr = EVENT_HEADER.unpack_from
+        unpack_offset = OFFSET.unpack_from
+        fmt = self.format
+
+        # The ring buffer is read in chunks and the events are parsed
+        # in place; 'buf' holds the file from offset 'buf_off' on.
+        end = self.__nameDB_off
+        offset = self.__erb_off
+        f.seek(offset)
+        buf = ""
+        buf_off = offset
+        while offset + EVENT_HEADER_SIZE <= end:
+            pos = offset - buf_off
+            if pos + EVENT_HEADER_SIZE > len(buf):
+                buf = buf[pos:] + f.read(READ_CHUNK_SIZE)
+                buf_off, pos = offset, 0
+                if len(buf) < EVENT_HEADER_SIZE:
+                    break
+
+            event_type, record, length, previous = unpack_hdr(buf, pos)
+            if event_type == 0x0 or event_type == 0xffff:
+                # Hit the end of events in the ERB
+                break
+            if event_type >= MAX_TYPE or length < EVENT_HEADER_SIZE:
+                raise ExportError("0x%x: bad event header" % offset)
+
+            if event_type in EVENT_LABELS:
+                if pos + length > len(buf):
+                    buf = buf[pos:] + f.read(max(READ_CHUNK_SIZE, length))
+                    buf_off, pos = offset, 0
+                unit_off, timestamp, value, _ = decode_sample(
+                    buf, pos + sample_off, fmt)
+                try:
+                    channel = names[unpack_offset(
+                                        buf, pos + EVENT_HEADER_SIZE)[0]]
+                    unit = names[unit_off]
+                except KeyError:
+                    raise ExportError("0x%x: unknown name offset" % offset)
+                yield record, event_type, channel, timestamp, value, unit
+            elif pos + length > len(buf):
+                # Skip channel dumps and pads without reading them in;
+                # they repeat what the other events hold:
+                f.seek(offset + length)
+                buf = ""
+                buf_off = offset + length
+            offset += length
+
+
+class CsvWriter(object):
+    ''' writes exported events as CSV rows '''
+
+    def __init__(self, output):
+        self.__csv = csv.writer(output)
+        self.__csv.writerow(CSV_COLUMNS)
+
+    def set_output(self, output):
+        self.__csv = csv.writer(output)
+
+    def write(self, record, event_type, channel, timestamp, value, unit):
+        if isinstance(timestamp, float):
+            timestamp = "%.3f" % timestamp
+        if value is None:
+            value = ""
+        elif isinstance(value, float):
+            value = repr(value)
+        elif isinstance(value, unicode):
+            value = value.encode('utf-8')
+        self.__csv.writerow((record, timestamp, channel,
+                             EVENT_LABELS[event_type], value, unit))
+
+
+class ColumnarWriter(object):
+    ''' collects exported samples into per-channel columnar blocks '''
+
+    def __init__(self, output):
+        self.__output = output
+        self.__blocks = { } # channel -> (unit, type, timestamps, values)
+        output.write(COLUMNAR_MAGIC)
+
+    def set_output(self, output):
+        # Pending blocks belong to the output they were collected for:
+        for channel in self.__blocks.keys():
+            self.__write_block(channel)
+        self.__output = output
+
+    def write(self, record, event_type, channel, timestamp, value, unit):
+        if event_type == CHANNEL_REMOVE:
+            return
+
+        vtype, value = _column_value(value)
+        block = self.__blocks.get(channel)
+        if block is not None and (block[0] != unit or block[1] != vtype):
+            self.__write_block(channel)
+            block = None
+        if block is None:
+            if vtype == TYPE_FLOAT:
+                values = array('d')
+            else:
+                values = [ ]
+            block = (unit, vtype, array('d'), values)
+            self.__blocks[channel] = block
+
+        block[2].append(timestamp)
+        block[3].append(value)
+        if len(block[2]) >= BLOCK_SAMPLES:
+            self.__write_block(channel)
+
+    def __write_block(self, channel):
+        unit, vtype, timestamps, values = self.__blocks.pop(channel)
+        parts = [ _pack_str(channel), _pack_str(unit), vtype,
+                  _COUNT.pack(len(timestamps)), _pack_floats(timestamps) ]
+        if vtype == TYPE_FLOAT:
+            parts.append(_pack_floats(values))
+        else:
+            parts.extend([ _pack_str(value) for value in values ])
+        self.__output.write(''.join(parts))
+
+
+WRITERS = {FORMAT_CSV: CsvWriter,
+           FORMAT_COLUMNAR: ColumnarWriter}
+
+# internal functions & classes
+
+def _column_value(value):
+    if value is None:
+        return TYPE_FLOAT, float('nan')
+    if isinstance(value, (bool, int, long, float)):
+        return TYPE_FLOAT, float(value)
+    if isinstance(value, unicode):
+        return TYPE_STRING, value.encode('utf-8')
+    return TYPE_STRING, str(value)
+
+def _pack_str(value):
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    value = value[:STR_MAX]
+    return _LENGTH16.pack(len(value)) + value
+
+def _read_str(fobj):
+    length = _LENGTH16.unpack(fobj.read(_LENGTH16.size))[0]
+    return fobj.read(length)
+
+def _pack_floats(values):
+    if sys.byteorder == 'little':
+        values = array('d', values)
+        values.byteswap()
+    return values.tostring()
+
+def _read_floats(fobj, count):
+    values = array('d')
+    values.fromstring(fobj.read(count * _FLOAT64_SIZE))
+    if sys.byteorder == 'little':
+        values.byteswap()
+    return values
+
+def usage(code):
+    print __doc__
+    sys.exit(code)
+
+def main(argv):
+    try:
+        opts, args = getopt.getopt(argv[1:], "f:o:h",
+                                   ("format=", "output=", "help"))
+    except getopt.GetoptError:
+        usage(-1)
+
+    format = FORMAT_CSV
+    output = None
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage(0)
+        elif o in ("-f", "--format"):
+            if a not in WRITERS:
+                usage(-1)
+            format = a
+        elif o in ("-o", "--output"):
+            output = a
+
+    if len(args) != 1:
+        usage(-1)
+
+    if output is None:
+        fobj = sys.stdout
+    else:
+        fobj = file(output, "wb")
+
+    start = time.time()
+    try:
+        try:
+            count = export(args[0], fobj, format)
+        except (ExportError, EnvironmentError), e:
+            print >> sys.stderr, "error: %s" % str(e)
+            sys.exit(1)
+    finally:
+        if fobj is not sys.stdout:
+            fobj.close()
+    elapsed = max(time.time() - start, 1e-6)
+
+    size = os.path.getsize(args[0]) / (1024.0 * 1024.0)
+    print >> sys.stderr, "%d events from %.1f MB in %.2fs: %.0f events/s, " \
+        "%.1f MB/s" % (count, size, elapsed, count / elapsed, size / elapsed)
+
+if __name__ == '__main__':
+    main(sys.argv)
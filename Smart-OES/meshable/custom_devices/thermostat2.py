@@ -908,8 +908,8 @@ class XBeeSensor(XBeeBase):
  #       power_state = self.property_get("power_on").value
 
         # Update channels:
-        self.property_set("temp", Sample(0, temp, "F"))
-        self.property_set("red_light", Sample(0, red_light, "mv"))
+        self.property_set_many({"temp": Sample(0, temp, "F"),
+                                "red_light": Sample(0, red_light, "mv")})
  #       self.property_set("on", Sample(0, on, "mv"))
  #       self.property_set("down", Sample(0, down, "mv"))
         
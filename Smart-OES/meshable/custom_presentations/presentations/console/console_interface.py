@@ -65,7 +65,7 @@ from common.helpers.format_channels import dump_channel_db_as_text, iso_date
 from common.helpers.format_logging_events import \
     format_logging_events_iterator
 from channels.channel_database_interface import \
-    LOG_SEEK_SET, LOG_SEEK_CUR, LOG_SEEK_END, LOG_SEEK_REC
+    LOG_SEEK_SET, LOG_SEEK_CUR, LOG_SEEK_END, LOG_SEEK_REC, LOG_SEEK_TIME
 from channels.channel import \
     PERM_GET, PERM_SET, PERM_REFRESH, \
     OPT_AUTOTIMESTAMP, OPT_DONOTLOG, OPT_DONOTDUMPDATA
@@ -239,9 +239,12 @@ Seek the current logger to position.
 * **end:** seek 'offset' recrods from the last record in the log
 * **rec:** seek to an absolute record number given by 'record_number'
   and then seek 'offset' records from that mark.
+* **time:** seek to the first record logged at or after the time
+  given by 'record_number' in seconds since the epoch and then seek
+  'offset' records from that mark.
          
 'record_number' is an absolute record number which only applies when
-'whence' is rec.
+'whence' is rec, or a time when 'whence' is time.
 
 Syntax::
 
@@ -762,15 +765,20 @@ Syntax::
                 whence_map = { 'set': LOG_SEEK_SET,
                                'cur': LOG_SEEK_CUR,
                                'end': LOG_SEEK_END,
-                               'rec': LOG_SEEK_REC, }
+                               'rec': LOG_SEEK_REC,
+                               'time': LOG_SEEK_TIME, }
                 whence = whence_map[args[1].lower()]
             except:
                 self.write(
-                   "invalid whence '%s', must be set, cur, end, or rec\r\n" % (
+                   "invalid whence '%s', must be set, cur, end, rec, "
+                   "or time\r\n" % (
                         repr(args[1])))
         if len(args) > 2:
             try:
-                record_number = int(args[2])
+                if whence == LOG_SEEK_TIME:
+                    record_number = float(args[2])
+                else:
+                    record_number = int(args[2])
             except:
                 self.write("invalid record_number '%s', must be integer\r\n" % 
                         repr(args[2]))
@@ -797,7 +805,7 @@ Syntax::
                     pass
                 if arg_num == 2:
                     matches.extend(filter(lambda t: t.startswith(text),
-                                    ("set", "cur", "end", "rec")))
+                                    ("set", "cur", "end", "rec", "time")))
                 if arg_num == 3:
                     # record_number
                     pass
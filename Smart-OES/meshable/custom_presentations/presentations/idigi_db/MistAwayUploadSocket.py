@@ -305,7 +305,7 @@ class Uploader(PresentationBase, threading.Thread):
         dm = self.__core.get_service("device_driver_manager")
         self.__xbee_manager = dm.instance_get("xbee_device_manager")
         
-        self.__last_upload_time = 0
+        self.__last_upload_sequence = 0
         
         
         
@@ -456,7 +456,16 @@ class Uploader(PresentationBase, threading.Thread):
         self.cdb = cm.channel_database_get()
 
         channel_list = SettingsBase.get_setting(self, "channels")
-        if len(channel_list) == 0:
+        upload_sequence, changed = self.cdb.changed_since(
+            self.__last_upload_sequence)
+        if self.trigger == 0:
+            # only the channels updated since the last upload
+            if len(channel_list) == 0:
+                channel_list = changed
+            else:
+                changed = dict.fromkeys(changed)
+                channel_list = [ cn for cn in channel_list if cn in changed ]
+        elif len(channel_list) == 0:
             channel_list = self.cdb.channel_list()
 
         new_sample_count = 0
@@ -471,7 +480,7 @@ class Uploader(PresentationBase, threading.Thread):
                 #    print channel_name 
                  #   print sample.unit
                  #   print sample.value 
-                    if sample.timestamp >= self.__last_upload_time and sample.timestamp >= 1315351499.0 and sample.unit != "1":  
+                    if sample.timestamp >= 1315351499.0 and sample.unit != "1":  
                      #   print "idigi_db (%s): Channel %s was updated since last " \
                       #         "push" % (self.__name, channel_name)
                         new_sample_count += 1
@@ -514,7 +523,7 @@ class Uploader(PresentationBase, threading.Thread):
         if new_sample_count > 0:
             print "idigi_db (%s): Starting upload to HouseLynx" % (self.__name)
             try:
-                self.__last_upload_time = time.time()
+                self.__last_upload_sequence = upload_sequence
                 success = self.__send_to_idigi(xml.getvalue())
             except:
                 self.connected += 1
@@ -202,6 +202,7 @@ Logger Seek
 **Request** code::
 
     <logger_seek offset="0" whence="end" />
+    <logger_seek offset="0" whence="time" time="1262304000" />
 
 **Response** code::
 
@@ -250,7 +251,7 @@ from samples.sample import Sample
 from StringIO import StringIO
 from common.helpers.format_channels import iso_date
 from channels.channel_database_interface import \
-    LOG_SEEK_SET, LOG_SEEK_CUR, LOG_SEEK_END, LOG_SEEK_REC
+    LOG_SEEK_SET, LOG_SEEK_CUR, LOG_SEEK_END, LOG_SEEK_REC, LOG_SEEK_TIME
 from common.dia_proc import get_drivers
 from common.digi_device_info import get_device_id
 import websocket
@@ -882,6 +883,7 @@ class RCIHandler(PresentationBase):
         **Request** code::
 
             <logger_seek offset={num] whence={cur, set, end, rec} [record={num]>
+            <logger_seek offset={num} whence=time time={seconds}>
 
         **Response** code::
 
@@ -891,7 +893,8 @@ class RCIHandler(PresentationBase):
         whence_map = { 'set': LOG_SEEK_SET,
                        'cur': LOG_SEEK_CUR,
                        'end': LOG_SEEK_END,
-                       'rec': LOG_SEEK_REC, }
+                       'rec': LOG_SEEK_REC,
+                       'time': LOG_SEEK_TIME, }
 
         if self.__logger is None:
             return '<logger_seek>%s' % RCIHandler.ERR_UNSELECTED_LOGGER
@@ -907,13 +910,20 @@ class RCIHandler(PresentationBase):
 
         if whence not in whence_map:
             return ('<logger_seek name="%s"><error>Bad whence "%s", '
-                      'must be set, cur, end or rec</error>') % (
+                      'must be set, cur, end, rec or time</error>') % (
                 logger_name, str(whence))
 
-        try:
-            record_number = int(attrs['record_number'])
-        except KeyError:
-            record_number = 0
+        if whence == 'time':
+            try:
+                record_number = float(attrs['time'])
+            except KeyError:
+                return '<logger_seek name="%s">%s' % (
+                    logger_name, RCIHandler.ERR_MISSING_ATTRIBUTE)
+        else:
+            try:
+                record_number = int(attrs['record_number'])
+            except KeyError:
+                record_number = 0
 
         try:
             self.__logger_cdb.log_seek(offset,